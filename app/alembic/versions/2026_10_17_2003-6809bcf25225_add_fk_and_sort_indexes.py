@@ -0,0 +1,39 @@
+"""add fk and sort indexes
+
+Revision ID: 6809bcf25225
+Revises: bbe1ac690176
+Create Date: 2026-10-17 20:03:19.987961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6809bcf25225'
+down_revision: Union[str, Sequence[str], None] = 'bbe1ac690176'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the tables are large, build the indexes without locking writes
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_companies_user_id'), 'companies', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_company_comments_company_id_created_at', 'company_comments', ['company_id', sa.literal_column('created_at DESC'), sa.literal_column('id DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_contact_comments_contact_id_created_at', 'contact_comments', ['contact_id', sa.literal_column('created_at DESC'), sa.literal_column('id DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_contacts_company_id'), 'contacts', ['company_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_contacts_user_id'), 'contacts', ['user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_contacts_user_id'), table_name='contacts', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_contacts_company_id'), table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contact_comments_contact_id_created_at', table_name='contact_comments', postgresql_concurrently=True)
+        op.drop_index('ix_company_comments_company_id_created_at', table_name='company_comments', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_companies_user_id'), table_name='companies', postgresql_concurrently=True)
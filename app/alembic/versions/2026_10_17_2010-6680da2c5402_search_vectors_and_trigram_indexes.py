@@ -0,0 +1,66 @@
+"""search vectors and trigram indexes
+
+Revision ID: 6680da2c5402
+Revises: 6809bcf25225
+Create Date: 2026-10-17 20:10:35.095934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6680da2c5402'
+down_revision: Union[str, Sequence[str], None] = '6809bcf25225'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PG_TRGM = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+# array_to_string is STABLE, the wrapper is IMMUTABLE so it can be indexed
+PHONE_DIGITS_FUNCTION = """
+CREATE OR REPLACE FUNCTION phone_digits(phones text[]) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+$$ SELECT regexp_replace(array_to_string(phones, ' '), '[^0-9 ]', '', 'g') $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(PG_TRGM)
+    op.execute(PHONE_DIGITS_FUNCTION)
+    op.add_column('companies', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(inn, ''))", persisted=True), nullable=False))
+    op.add_column('contacts', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('simple', coalesce(last_name, '') || ' ' || coalesce(first_name, '') || ' ' || coalesce(middle_name, '') || ' ' || coalesce(email, ''))", persisted=True), nullable=False))
+
+    # GIN indexes of every row take long to build, CONCURRENTLY keeps the tables writable
+    with op.get_context().autocommit_block():
+        op.create_index('ix_companies_inn_trgm', 'companies', ['inn'], unique=False, postgresql_using='gin', postgresql_ops={'inn': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_companies_name_trgm', 'companies', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_companies_phone_digits_trgm', 'companies', [sa.literal_column('phone_digits(phone) gin_trgm_ops')], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_companies_search_vector', 'companies', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_contacts_email_trgm', 'contacts', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_contacts_first_name_trgm', 'contacts', ['first_name'], unique=False, postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_contacts_last_name_trgm', 'contacts', ['last_name'], unique=False, postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_contacts_phone_digits_trgm', 'contacts', [sa.literal_column('phone_digits(phone) gin_trgm_ops')], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_contacts_search_vector', 'contacts', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contacts_search_vector', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contacts_phone_digits_trgm', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contacts_last_name_trgm', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contacts_first_name_trgm', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contacts_email_trgm', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_companies_search_vector', table_name='companies', postgresql_concurrently=True)
+        op.drop_index('ix_companies_phone_digits_trgm', table_name='companies', postgresql_concurrently=True)
+        op.drop_index('ix_companies_name_trgm', table_name='companies', postgresql_concurrently=True)
+        op.drop_index('ix_companies_inn_trgm', table_name='companies', postgresql_concurrently=True)
+    op.drop_column('contacts', 'search_vector')
+    op.drop_column('companies', 'search_vector')
+    op.execute('DROP FUNCTION IF EXISTS phone_digits(text[])')
@@ -0,0 +1,37 @@
+"""filter and sort indexes
+
+Revision ID: cda2045258e2
+Revises: 6680da2c5402
+Create Date: 2026-10-17 20:14:02.118306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cda2045258e2'
+down_revision: Union[str, Sequence[str], None] = '6680da2c5402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # list endpoints keep writing while the filter indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_companies_area_activity', 'companies', ['area_activity'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_companies_created_at_id', 'companies', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_companies_revenue'), 'companies', ['revenue'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_contacts_created_at_id', 'contacts', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contacts_created_at_id', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_companies_revenue'), table_name='companies', postgresql_concurrently=True)
+        op.drop_index('ix_companies_created_at_id', table_name='companies', postgresql_concurrently=True)
+        op.drop_index('ix_companies_area_activity', table_name='companies', postgresql_concurrently=True)
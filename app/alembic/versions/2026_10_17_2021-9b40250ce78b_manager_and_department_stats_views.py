@@ -0,0 +1,58 @@
+"""manager and department stats views
+
+Revision ID: 9b40250ce78b
+Revises: cda2045258e2
+Create Date: 2026-10-17 20:21:14.305825
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b40250ce78b'
+down_revision: Union[str, Sequence[str], None] = 'cda2045258e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the rollups as of this revision, REFRESH CONCURRENTLY needs the unique indexes
+CREATE_VIEWS = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS manager_stats AS
+    SELECT users.id AS user_id, users.username,
+        coalesce(companies_per_user.companies, 0) AS companies,
+        coalesce(companies_per_user.total_revenue, 0) AS total_revenue,
+        coalesce(contacts_per_user.contacts, 0) AS contacts
+    FROM users
+    LEFT OUTER JOIN (
+        SELECT companies.user_id AS user_id, count(*) AS companies, sum(companies.revenue) AS total_revenue
+        FROM companies GROUP BY companies.user_id
+    ) AS companies_per_user ON companies_per_user.user_id = users.id
+    LEFT OUTER JOIN (
+        SELECT contacts.user_id AS user_id, count(*) AS contacts
+        FROM contacts GROUP BY contacts.user_id
+    ) AS contacts_per_user ON contacts_per_user.user_id = users.id
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_manager_stats_user_id ON manager_stats (user_id)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS department_stats AS
+    SELECT contacts.department, count(*) AS contacts
+    FROM contacts GROUP BY contacts.department
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_department_stats_department ON department_stats (department)",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in CREATE_VIEWS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS department_stats")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS manager_stats")
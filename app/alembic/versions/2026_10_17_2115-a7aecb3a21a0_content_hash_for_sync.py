@@ -0,0 +1,31 @@
+"""content hash for sync
+
+Revision ID: a7aecb3a21a0
+Revises: 9b40250ce78b
+Create Date: 2026-10-17 21:15:00.326409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7aecb3a21a0'
+down_revision: Union[str, Sequence[str], None] = '9b40250ce78b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable without a default, only the catalog changes
+    op.add_column('companies', sa.Column('content_hash', sa.String(length=32), nullable=True))
+    op.add_column('contacts', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('contacts', 'content_hash')
+    op.drop_column('companies', 'content_hash')
@@ -0,0 +1,48 @@
+"""jobs table
+
+Revision ID: e84dab991e5d
+Revises: a7aecb3a21a0
+Create Date: 2026-10-17 21:25:56.828825
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e84dab991e5d'
+down_revision: Union[str, Sequence[str], None] = 'a7aecb3a21a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', name='job_status_enum'), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('run_after', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sa.String(length=128), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_run_after_id', 'jobs', ['status', 'run_after', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_run_after_id', table_name='jobs')
+    op.drop_table('jobs')
+    sa.Enum(name='job_status_enum').drop(op.get_bind(), checkfirst=True)
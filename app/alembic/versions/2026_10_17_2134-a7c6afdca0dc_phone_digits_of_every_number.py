@@ -0,0 +1,51 @@
+"""phone digits of every number
+
+Revision ID: a7c6afdca0dc
+Revises: e84dab991e5d
+Create Date: 2026-10-17 21:34:02.208182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c6afdca0dc'
+down_revision: Union[str, Sequence[str], None] = 'e84dab991e5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PHONE_DIGITS_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION phone_digits(phones text[]) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+$$ SELECT array_to_string(ARRAY(SELECT regexp_replace(p, '\D', '', 'g') FROM unnest(phones) p), ' ') $$
+"""
+
+# the previous version kept the spaces inside a formatted number
+PREVIOUS_PHONE_DIGITS_FUNCTION = """
+CREATE OR REPLACE FUNCTION phone_digits(phones text[]) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+$$ SELECT regexp_replace(array_to_string(phones, ' '), '[^0-9 ]', '', 'g') $$
+"""
+
+PHONE_DIGITS_INDEXES = ('ix_companies_phone_digits_trgm', 'ix_contacts_phone_digits_trgm')
+
+
+def _replace_function(statement: str) -> None:
+    op.execute(statement)
+    # the expression indexes hold the values of the old function
+    with op.get_context().autocommit_block():
+        for name in PHONE_DIGITS_INDEXES:
+            op.execute(f'REINDEX INDEX CONCURRENTLY {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_function(PHONE_DIGITS_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_function(PREVIOUS_PHONE_DIGITS_FUNCTION)
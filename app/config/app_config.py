@@ -1,5 +1,8 @@
 __all__ = ["config"]
 
+import os
+import tempfile
+
 from pydantic import Field, ConfigDict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,11 +20,113 @@ class DatabaseConfig(BaseConfig):
     name: str
     port: str
 
+    pool_size: int = 10
+    max_overflow: int = 5
+    pool_timeout: float = 30.0
+    pool_recycle: int = 300
+    # pool_recycle already drops stale connections, pre-ping costs a round trip per checkout
+    pool_pre_ping: bool = False
+    statement_cache_size: int = 100
+    prepared_statement_cache_size: int = 100
+    # transaction pooling in pgbouncer, prepared statements can not be reused
+    pgbouncer: bool = False
+    command_timeout: float | None = 60.0
+    application_name: str = "crm-api"
+    # URL реплик для чтения, JSON-список
+    replica_urls: list[str] = Field(default_factory=list)
+    replica_check_interval: float = 5.0
+
     model_config = ConfigDict(env_prefix="DB_")
 
 
+class SecurityConfig(BaseConfig):
+    hash_workers: int = 4
+
+    model_config = ConfigDict(env_prefix="SECURITY_")
+
+
+class CacheConfig(BaseConfig):
+    backend: str = "memory"
+    maxsize: int = 10_000
+    ttl: float = 30.0
+    redis_url: str = "redis://localhost:6379/0"
+    local_ttl: float = 5.0
+
+    model_config = ConfigDict(env_prefix="CACHE_")
+
+
+class ApiConfig(BaseConfig):
+    fast_serialization: bool = False
+
+    model_config = ConfigDict(env_prefix="API_")
+
+
+class StatsConfig(BaseConfig):
+    materialized: bool = False
+    refresh_delay: float = 2.0
+
+    model_config = ConfigDict(env_prefix="STATS_")
+
+
+class MetricsConfig(BaseConfig):
+    enabled: bool = True
+
+    model_config = ConfigDict(env_prefix="METRICS_")
+
+
+class QueryDetectorConfig(BaseConfig):
+    mode: str = "off"
+    max_queries: int = 20
+    max_repeats: int = 5
+    slow_query_ms: float = 200.0
+
+    model_config = ConfigDict(env_prefix="QUERY_DETECTOR_")
+
+
+class LogConfig(BaseConfig):
+    level: str = "DEBUG"
+    file: str = "app/logs/app.log"
+    max_bytes: int = 1_000_000
+    backup_count: int = 5
+    console: bool = True
+    json_format: bool = False
+
+    model_config = ConfigDict(env_prefix="LOG_")
+
+
+class ImportConfig(BaseConfig):
+    # загруженные файлы и файлы отклонённых строк
+    directory: str = os.path.join(tempfile.gettempdir(), "crm-imports")
+    batch_size: int = 5000
+    workers: int = 2
+
+    model_config = ConfigDict(env_prefix="IMPORT_")
+
+
+class JobsConfig(BaseConfig):
+    # выключить на экземплярах, которые не должны выполнять задачи
+    enabled: bool = True
+    concurrency: int = 2
+    poll_interval: float = 1.0
+    max_attempts: int = 3
+    retry_delay: float = 5.0
+    # задача без heartbeat дольше lease возвращается в очередь
+    lease: float = 60.0
+
+    model_config = ConfigDict(env_prefix="JOBS_")
+
+
 class Config(BaseSettings):
     db: DatabaseConfig = Field(default_factory=DatabaseConfig)
+    security: SecurityConfig = Field(default_factory=SecurityConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    api: ApiConfig = Field(default_factory=ApiConfig)
+    stats: StatsConfig = Field(default_factory=StatsConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    query_detector: QueryDetectorConfig = Field(default_factory=QueryDetectorConfig)
+    log: LogConfig = Field(default_factory=LogConfig)
+    imports: ImportConfig = Field(default_factory=ImportConfig)
+    jobs: JobsConfig = Field(default_factory=JobsConfig)
 
     def get_db_url(self):
         return (
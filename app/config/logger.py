@@ -1,34 +1,120 @@
-__all__ = ["setup_log"]
+__all__ = ["setup_log", "start_logging", "stop_logging", "JsonFormatter", "RecordQueueHandler"]
 
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
 import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_log(name):
+import orjson
+
+from .app_config import LogConfig, config
+
+
+TEXT_FORMAT = '%(asctime)s | %(levelname)-8s | %(module)s:%(funcName)s:%(lineno)d - %(message)s'
+
+# Одна очередь и один поток-слушатель на процесс
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: QueueListener | None = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+class RecordQueueHandler(QueueHandler):
+    """Queues the record with its exception for the formatter of the listener
+
+    `QueueHandler.prepare` formats the record in the logging thread and
+    drops `exc_info`, so `JsonFormatter` would get the traceback inside
+    the message. The queue is in-process, the record needs no pickling.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # the arguments may change before the listener writes the record
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _handlers(log_config: LogConfig) -> list[logging.Handler]:
+    formatter = JsonFormatter() if log_config.json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+
+    # Обработчик для файла (с ротацией)
+    if log_config.file:
+        file_handler = RotatingFileHandler(
+            log_config.file,
+            maxBytes=log_config.max_bytes,
+            backupCount=log_config.backup_count,
+            encoding='utf-8',
+        )
+        handlers.append(file_handler)
+
+    # Обработчик для консоли
+    if log_config.console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        handlers.append(console_handler)
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def start_logging(log_config: LogConfig = config.log) -> QueueListener:
+    """Starts the listener thread that writes the records of all loggers
+
+    Loggers only put records into a queue, so the event loop never waits
+    for the disk, the console or the file rotation. Safe to call repeatedly.
+    """
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = QueueListener(
+                _queue, *_handlers(log_config), respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(stop_logging)
+        return _listener
+
+
+def stop_logging() -> None:
+    """Writes the queued records and stops the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def setup_log(name, log_config: LogConfig = config.log):
     # Создаем логгер
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(log_config.level.upper())
     logger.propagate = False
-    
-    # Форматтер
-    formatter = logging.Formatter(
-        '%(asctime)s | %(levelname)-8s | %(module)s:%(funcName)s:%(lineno)d - %(message)s'
-    )
-    
-    # Обработчик для файла (с ротацией)
-    file_handler = RotatingFileHandler(
-        'app/logs/app.log', maxBytes=1_000_000, backupCount=5, encoding='utf-8'
-    )
-    file_handler.setFormatter(formatter)
-    
-    # Обработчик для консоли
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    console_handler.setFormatter(formatter)
-    console_handler.encoding = 'utf-8'
-    
-    # Добавляем обработчики
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+    # Повторный вызов не добавляет второй обработчик
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        logger.addHandler(RecordQueueHandler(_queue))
+
+    start_logging(log_config)
+    return logger
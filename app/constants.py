@@ -5,6 +5,17 @@ __ALL__ = [
     "CompanyPostEnum",
     "DepartmentEnum",
     "AreaActivityEnum",
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "EXPORT_CHUNK_SIZE",
+    "BULK_CHUNK_SIZE",
+    "MAX_BULK_SIZE",
+    "SYNC_CHUNK_SIZE",
+    "MAX_SYNC_SIZE",
+    "DETAIL_COLLECTION_LIMIT",
+    "ExportFormatEnum",
+    "ImportKindEnum",
+    "JobStatusEnum",
 ]
 
 import enum
@@ -15,6 +26,15 @@ from sqlalchemy.orm import mapped_column
 
 UNIQ_STR_AN = Annotated[str, mapped_column(unique=True)]
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_CHUNK_SIZE = 1000
+BULK_CHUNK_SIZE = 500
+MAX_BULK_SIZE = 10_000
+SYNC_CHUNK_SIZE = 2000
+MAX_SYNC_SIZE = 50_000
+DETAIL_COLLECTION_LIMIT = 50
+
 
 class GenderEnum(str, enum.Enum):
     MALE = "Мужчина"
@@ -40,3 +60,20 @@ class DepartmentEnum(str, enum.Enum):
 
 class AreaActivityEnum(str, enum.Enum):
     pass
+
+
+class ExportFormatEnum(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ImportKindEnum(str, enum.Enum):
+    CONTACTS = "contacts"
+    COMPANIES = "companies"
+
+
+class JobStatusEnum(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
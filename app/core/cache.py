@@ -0,0 +1,378 @@
+__all__ = [
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "create_cache",
+    "cache",
+]
+
+import asyncio
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Hashable
+
+import orjson
+
+from app.config import config, setup_log
+from app.config.app_config import CacheConfig
+
+
+log = setup_log(__name__)
+
+Key = tuple[Hashable, ...]
+
+# deletes the lock only while it holds the token of the caller, an expired
+# lock may already belong to another worker
+RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class CacheBackend(ABC):
+    """Interface of the read cache in front of the DAOs
+
+    Keys are tuples, the first items of a key form its namespace, so a
+    group of keys can be dropped with `delete_prefix`. Values must be
+    JSON serializable, so they can be shared between processes.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Key, asyncio.Future] = {}
+        self.coalesced = 0
+        # bumped by every invalidation of the namespace (first item of the key),
+        # a load that started before it must not store its result
+        self._generations: defaultdict[Hashable, int] = defaultdict(int)
+        self._epoch = 0
+
+    @abstractmethod
+    async def get(self, key: Key) -> tuple[bool, Any]:
+        """Returns (True, value) on a hit and (False, None) on a miss"""
+
+    @abstractmethod
+    async def set(self, key: Key, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: Key) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: Key) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    async def start(self) -> None:
+        """Called on the application startup"""
+
+    async def stop(self) -> None:
+        """Called on the application shutdown"""
+
+    def _generation(self, key: Key) -> tuple[int, int]:
+        return self._epoch, self._generations[key[0]]
+
+    def _invalidated(self, prefix: Key) -> None:
+        """Marks the loads in flight of the namespace as stale, all of them for ()"""
+        if prefix:
+            self._generations[prefix[0]] += 1
+        else:
+            self._epoch += 1
+
+    async def _load(self, key: Key, loader: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generation(key)
+        value = await loader()
+        # a write invalidated the namespace while the loader was reading
+        if value is not None and self._generation(key) == generation:
+            await self.set(key, value)
+        return value
+
+    async def get_or_set(self, key: Key, loader: Callable[[], Awaitable[Any]], store: bool = True) -> Any:
+        """Returns the cached value or stores the result of `loader`
+
+        Concurrent misses of the same key wait for one call of the loader
+        instead of querying the database N times. None is never cached.
+        With `store=False` a miss returns the result of `loader` without
+        caching it, e.g. rows read from a replica that may miss a write.
+        """
+        hit, value = await self.get(key)
+        if hit:
+            return value
+        if not store:
+            return await loader()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except BaseException as e:
+            future.set_exception(e)
+            # nobody may be waiting, mark the exception as retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with a time to live for every entry
+
+        Args:
+            maxsize (int): max number of entries, 0 disables the cache
+            ttl (float): seconds an entry stays valid
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Key, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: Key) -> tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    async def set(self, key: Key, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: Key) -> None:
+        self._invalidated(key)
+        self._data.pop(key, None)
+
+    async def delete_prefix(self, prefix: Key) -> None:
+        self._invalidated(prefix)
+        size = len(prefix)
+        for key in [k for k in self._data if k[:size] == prefix]:
+            del self._data[key]
+
+    async def clear(self) -> None:
+        self._invalidated(())
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache shared by all workers through a Redis compatible server
+
+    Every worker keeps a short lived `MemoryCacheBackend` in front of Redis.
+    Invalidations are written to Redis and published to `channel`, every
+    worker drops them from its local cache when the message arrives.
+    A cold key is loaded by one worker at a time, the others wait for the
+    value under a lock with the `lock_timeout`.
+
+        Args:
+            client: `redis.asyncio.Redis` or any client with the same interface
+            local (MemoryCacheBackend): per process cache in front of Redis
+            ttl (float): seconds an entry stays valid in Redis
+            namespace (str): prefix of all keys and of the channel
+            lock_timeout (float): seconds a worker may load a cold key
+    """
+
+    def __init__(
+        self,
+        client,
+        local: MemoryCacheBackend,
+        ttl: float,
+        namespace: str = "dao-cache",
+        lock_timeout: float = 5.0,
+    ):
+        super().__init__()
+        self.client = client
+        self.local = local
+        self.ttl = ttl
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        self._listener: asyncio.Task | None = None
+
+    def _key(self, key: Key) -> str:
+        return ":".join([self.namespace, *map(str, key)])
+
+    def _index(self, key: Key) -> str:
+        """Set with all keys of the namespace (model, kind)"""
+        return ":".join([self.namespace, "index", *map(str, key[:2])])
+
+    async def get(self, key: Key) -> tuple[bool, Any]:
+        hit, value = await self.local.get(key)
+        if hit:
+            return hit, value
+        raw = await self.client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        value = orjson.loads(raw)
+        await self.local.set(key, value)
+        return True, value
+
+    async def set(self, key: Key, value: Any) -> None:
+        await self.local.set(key, value)
+        ttl = max(1, int(self.ttl))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), orjson.dumps(value), ex=ttl)
+            pipe.sadd(self._index(key), self._key(key))
+            pipe.expire(self._index(key), ttl)
+            await pipe.execute()
+
+    async def _load(self, key: Key, loader: Callable[[], Awaitable[Any]]) -> Any:
+        lock = self._key(("lock", *key))
+        token = secrets.token_hex(16)
+        deadline = time.monotonic() + self.lock_timeout
+        while not await self.client.set(lock, token, nx=True, px=int(self.lock_timeout * 1000)):
+            if time.monotonic() > deadline:
+                return await super()._load(key, loader)
+            await asyncio.sleep(0.02)
+            hit, value = await self.get(key)
+            if hit:
+                return value
+        try:
+            return await super()._load(key, loader)
+        finally:
+            await self.client.eval(RELEASE_LOCK, 1, lock, token)
+
+    async def _publish(self, op: str, key: Key) -> None:
+        await self.client.publish(self.channel, orjson.dumps({"op": op, "key": list(key)}))
+
+    async def delete(self, key: Key) -> None:
+        self._invalidated(key)
+        await self.local.delete(key)
+        await self.client.delete(self._key(key))
+        await self._publish("delete", key)
+
+    async def delete_prefix(self, prefix: Key) -> None:
+        self._invalidated(prefix)
+        await self.local.delete_prefix(prefix)
+        if len(prefix) >= 2:
+            index = self._index(prefix)
+            keys = [
+                k for k in await self.client.smembers(index)
+                if (k.decode() if isinstance(k, bytes) else k).startswith(self._key(prefix))
+            ]
+            if len(prefix) == 2:
+                keys.append(index)
+            if keys:
+                await self.client.delete(*keys)
+        else:
+            keys = [k async for k in self.client.scan_iter(match=f"{self._key(prefix)}:*")]
+            if keys:
+                await self.client.delete(*keys)
+        await self._publish("delete_prefix", prefix)
+
+    async def clear(self) -> None:
+        self._invalidated(())
+        await self.local.clear()
+        keys = [k async for k in self.client.scan_iter(match=f"{self.namespace}:*")]
+        if keys:
+            await self.client.delete(*keys)
+        await self._publish("clear", ())
+
+    async def _listen(self) -> None:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                event = orjson.loads(message["data"])
+                key = tuple(event["key"])
+                # loads of this worker started before the write of another one
+                self._invalidated(key)
+                if event["op"] == "delete":
+                    await self.local.delete(key)
+                elif event["op"] == "delete_prefix":
+                    await self.local.delete_prefix(key)
+                elif event["op"] == "clear":
+                    await self.local.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Cache invalidation listener stopped: {e}")
+        finally:
+            await pubsub.unsubscribe(self.channel)
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "local": self.local.stats(),
+        }
+
+
+def create_cache(cache_config: CacheConfig) -> CacheBackend:
+    """Builds the cache backend selected by CACHE_BACKEND"""
+    if cache_config.backend == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the `redis` package") from e
+        return RedisCacheBackend(
+            client=Redis.from_url(cache_config.redis_url),
+            local=MemoryCacheBackend(maxsize=cache_config.maxsize, ttl=cache_config.local_ttl),
+            ttl=cache_config.ttl,
+        )
+    return MemoryCacheBackend(maxsize=cache_config.maxsize, ttl=cache_config.ttl)
+
+
+cache = create_cache(config.cache)
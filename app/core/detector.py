@@ -0,0 +1,208 @@
+__all__ = [
+    "QueryBudgetExceeded",
+    "QueryLog",
+    "QueryDetector",
+    "QueryDetectorMiddleware",
+    "record_queries",
+    "statement_shape",
+    "create_detector",
+    "detector",
+]
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import config, setup_log
+from app.config.app_config import QueryDetectorConfig
+
+
+log = setup_log(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in the `raise` mode when a request breaks a query budget"""
+
+
+def statement_shape(statement: str) -> str:
+    """SQL with the parameters and IN lists collapsed, equal for every row of an N+1"""
+    shape = re.sub(r"\$\d+(::[\w\[\]]+)?|%\(\w+\)s|\?", "?", statement)
+    shape = re.sub(r"\bIN\s*\(\s*\?(\s*,\s*\?)*\s*\)", "IN (?...)", shape, flags=re.IGNORECASE)
+    return " ".join(shape.split())
+
+
+@dataclass
+class QueryLog:
+    """Statements executed in a scope with their duration in seconds"""
+    statements: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def add(self, statement: str, duration: float) -> None:
+        self.statements.append((statement, duration))
+
+    def repeated(self, min_count: int = 2) -> list[tuple[str, int]]:
+        """Shapes executed at least `min_count` times, the most frequent first"""
+        shapes = Counter(statement_shape(s) for s, _ in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= min_count]
+
+    def report(self, limit: int = 5) -> str:
+        total = sum(d for _, d in self.statements)
+        lines = [f"{self.count} statements, {total * 1000:.1f} ms"]
+        for shape, n in self.repeated()[:limit]:
+            lines.append(f"  {n}x {shape[:200]}")
+        return "\n".join(lines)
+
+
+_current_log: ContextVar[QueryLog | None] = ContextVar("current_query_log", default=None)
+
+
+class QueryDetector:
+    """Finds N+1 patterns and slow statements of a request
+
+    Every statement executed while a request is handled is counted. In the
+    `warn` mode a request over a budget is logged with its repeated
+    statement shapes, in the `raise` mode the statement that breaks the
+    budget fails with `QueryBudgetExceeded`. Slow statements outside a
+    request are logged in both modes.
+
+        Args:
+            mode (str): off, warn or raise
+            max_queries (int): statements allowed per request
+            max_repeats (int): executions allowed for one statement shape
+            slow_query_ms (float): duration of a slow statement
+    """
+
+    def __init__(self, mode: str, max_queries: int, max_repeats: int, slow_query_ms: float):
+        self.mode = mode
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.slow_query_ms = slow_query_ms
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("warn", "raise")
+
+    def violations(self, query_log: QueryLog) -> list[str]:
+        found = []
+        if query_log.count > self.max_queries:
+            found.append(f"{query_log.count} statements, budget {self.max_queries}")
+        for shape, n in query_log.repeated(self.max_repeats + 1):
+            found.append(f"{n}x the same statement, budget {self.max_repeats}: {shape[:200]}")
+        return found
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._detector_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._detector_start
+        query_log = _current_log.get()
+        if query_log is not None:
+            query_log.add(statement, duration)
+        # outside a request (lifespan, job runner) the statements are only logged
+        raising = query_log is not None and self.mode == "raise"
+        if duration * 1000 > self.slow_query_ms:
+            message = f"Slow statement {duration * 1000:.1f} ms: {statement_shape(statement)[:500]}"
+            if raising:
+                raise QueryBudgetExceeded(message)
+            log.warning(message)
+        if raising:
+            violations = self.violations(query_log)
+            if violations:
+                raise QueryBudgetExceeded("; ".join(violations))
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        if not event.contains(sync_engine, "after_cursor_execute", self._after_cursor_execute):
+            event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, "after_cursor_execute", self._after_cursor_execute):
+            event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @contextmanager
+    def track(self, name: str):
+        """Counts the statements of the block against the budgets
+
+        Args:
+            name (str): name of the request in the warnings
+
+        Yields:
+            QueryLog: statements executed in the block
+        """
+        query_log = QueryLog()
+        token = _current_log.set(query_log)
+        try:
+            yield query_log
+        finally:
+            _current_log.reset(token)
+        violations = self.violations(query_log)
+        if violations:
+            log.warning(f"{name}: {'; '.join(violations)}\n{query_log.report()}")
+
+
+class QueryDetectorMiddleware:
+    """ASGI middleware giving every request its own `QueryLog`
+
+        Args:
+            app: ASGI application
+            detector (QueryDetector): budgets of a request
+    """
+
+    def __init__(self, app, detector: "QueryDetector"):
+        self.app = app
+        self.detector = detector
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.detector.track(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+@contextmanager
+def record_queries(engine: AsyncEngine):
+    """Collects every statement executed by the engine inside the block"""
+    query_log = QueryLog()
+    starts = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        starts[id(context)] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        start = starts.pop(id(context), None)
+        if start is not None:
+            query_log.add(statement, time.perf_counter() - start)
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before)
+    event.listen(sync_engine, "after_cursor_execute", after)
+    try:
+        yield query_log
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before)
+        event.remove(sync_engine, "after_cursor_execute", after)
+
+
+def create_detector(detector_config: QueryDetectorConfig) -> QueryDetector:
+    return QueryDetector(
+        mode=detector_config.mode,
+        max_queries=detector_config.max_queries,
+        max_repeats=detector_config.max_repeats,
+        slow_query_ms=detector_config.slow_query_ms,
+    )
+
+
+detector = create_detector(config.query_detector)
@@ -0,0 +1,73 @@
+__all__ = ["export_response"]
+
+import csv
+import enum
+import io
+from typing import Any, AsyncIterator, Sequence
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.constants import ExportFormatEnum
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(_csv_value(v)) for v in value)
+    return value
+
+
+async def _ndjson_chunks(partitions: AsyncIterator[Sequence[dict]]) -> AsyncIterator[bytes]:
+    async for rows in partitions:
+        yield b"".join(
+            orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+        )
+
+
+async def _csv_chunks(
+    partitions: AsyncIterator[Sequence[dict]], fields: Sequence[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for rows in partitions:
+        writer.writerows([_csv_value(row[f]) for f in fields] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_response(
+    partitions: AsyncIterator[Sequence[dict]],
+    fields: Sequence[str],
+    format: ExportFormatEnum,
+    filename: str,
+) -> StreamingResponse:
+    """Wraps chunks of rows into a streaming NDJSON or CSV response
+
+    Args:
+        partitions (AsyncIterator[Sequence[dict]]): chunks of rows, e.g. `BaseDAO.stream_rows`
+        fields (Sequence[str]): exported fields, used for the CSV header
+        format (ExportFormatEnum): output format
+        filename (str): file name without extension for Content-Disposition
+
+    Returns:
+        StreamingResponse: response that writes every chunk as soon as it is read
+    """
+    if format == ExportFormatEnum.CSV:
+        body = _csv_chunks(partitions, fields)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = _ndjson_chunks(partitions)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format.value}"'
+        },
+    )
@@ -0,0 +1,345 @@
+__all__ = ["Importer", "importer", "validate_batch", "import_fields"]
+
+import asyncio
+import csv
+import enum
+import functools
+import json
+import multiprocessing
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+from fastapi import UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Column, Integer, MetaData, Table, Text, cast, exists, func, null, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.types import Enum
+
+from app.config import config, setup_log
+from app.config.app_config import ImportConfig
+from app.constants import ImportKindEnum
+from app.core.jobs import JobContext, PermanentJobError, runner
+from app.database.dao import BaseDAO, CompanyDAO, ContactDAO
+from app.models import Job
+from app.schemas import CompanyCreate, ContactCreate
+
+
+log = setup_log(__name__)
+
+IMPORTS: dict[ImportKindEnum, tuple[type[BaseDAO], type[BaseModel]]] = {
+    ImportKindEnum.CONTACTS: (ContactDAO, ContactCreate),
+    ImportKindEnum.COMPANIES: (CompanyDAO, CompanyCreate),
+}
+# separator of list values in a cell, the same as in the CSV export
+LIST_SEPARATOR = ";"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# share of the progress given to reading the file, the merge takes the rest
+MERGE_SHARE = 0.9
+
+
+@functools.cache
+def import_fields(kind: ImportKindEnum) -> tuple[str, ...]:
+    """Columns of the model filled from the file, in the order of the schema"""
+    dao, schema = IMPORTS[kind]
+    columns = dao.model.__table__.c
+    return tuple(name for name in schema.model_fields if name in columns)
+
+
+def _db_value(value: Any) -> Any:
+    """Value as PostgreSQL stores it, SQLAlchemy keeps the names of the enums"""
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, list):
+        return [_db_value(v) for v in value]
+    return value
+
+
+def validate_batch(kind: ImportKindEnum, rows: list[tuple[int, dict]]) -> tuple[list[tuple], list[tuple]]:
+    """Validates raw CSV rows against the create schema, runs in a worker process
+
+    Args:
+        kind (ImportKindEnum): imported model
+        rows (list[tuple[int, dict]]): line numbers and rows of `csv.DictReader`
+
+    Returns:
+        tuple[list[tuple], list[tuple]]: records of the staging table and
+    the rejected rows as (line, error, raw row)
+    """
+    dao, schema = IMPORTS[kind]
+    fields = import_fields(kind)
+    columns = dao.model.__table__.c
+    list_fields = {name for name in fields if isinstance(columns[name].type, ARRAY)}
+    records, rejected = [], []
+    for line, raw in rows:
+        values = {}
+        for key, value in raw.items():
+            # None keys are the cells beyond the header
+            if key is None or not value:
+                continue
+            values[key] = value.split(LIST_SEPARATOR) if key in list_fields else value
+        try:
+            item = schema.model_validate(values)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            rejected.append((line, error, raw))
+            continue
+        data = item.model_dump()
+        records.append((
+            line,
+            json.dumps(raw, ensure_ascii=False),
+            None,
+            *(_db_value(data[name]) for name in fields),
+        ))
+    return records, rejected
+
+
+def staging_table(kind: ImportKindEnum) -> Table:
+    """Temporary table of the valid rows, dropped with the transaction
+
+    Enums are kept as text, COPY would need their OIDs, and cast in the merge.
+    """
+    dao, _ = IMPORTS[kind]
+    columns = dao.model.__table__.c
+    staging_columns = []
+    for name in import_fields(kind):
+        type_ = columns[name].type
+        if isinstance(type_, ARRAY) and isinstance(type_.item_type, Enum):
+            type_ = ARRAY(Text)
+        elif isinstance(type_, Enum):
+            type_ = Text()
+        staging_columns.append(Column(name, type_))
+    return Table(
+        f"import_{dao.model.__tablename__}",
+        MetaData(),
+        Column("line", Integer, primary_key=True),
+        Column("source", Text),
+        Column("error", Text),
+        *staging_columns,
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+
+
+async def merge(connection: AsyncConnection, kind: ImportKindEnum, staging: Table) -> int:
+    """Marks the staged rows the table would refuse and inserts the others
+
+    Rows referring to missing parents, repeating the key of an earlier line
+    or of an existing record get an `error` instead of failing the insert.
+
+    Returns:
+        int: number of inserted rows
+    """
+    dao, _ = IMPORTS[kind]
+    table = dao.model.__table__
+    fields = import_fields(kind)
+    valid = staging.c.error.is_(None)
+    key = staging.c[dao.sync_key]
+    await connection.exec_driver_sql(f"ANALYZE {staging.name}")
+
+    for name in fields:
+        for foreign_key in table.c[name].foreign_keys:
+            await connection.execute(
+                update(staging)
+                .where(valid, staging.c[name].is_not(None), ~exists().where(foreign_key.column == staging.c[name]))
+                .values(error=f"Unknown {name}")
+            )
+    repeats = (
+        select(staging.c.line, func.row_number().over(partition_by=key, order_by=staging.c.line).label("n"))
+        .where(key.is_not(None))
+        .subquery()
+    )
+    await connection.execute(
+        update(staging)
+        .where(staging.c.line == repeats.c.line, repeats.c.n > 1)
+        .values(error=f"Duplicate {key.name} in the file")
+    )
+    await connection.execute(
+        update(staging)
+        .where(valid, exists().where(table.c[key.name] == key))
+        .values(error=f"Record with this {key.name} already exists")
+    )
+    result = await connection.execute(
+        insert(table)
+        .from_select(
+            fields,
+            select(*(cast(staging.c[name], table.c[name].type) for name in fields))
+            .where(valid)
+            .order_by(staging.c.line),
+        )
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount
+
+
+async def imported_parents(connection: AsyncConnection, kind: ImportKindEnum, staging: Table) -> list:
+    """Distinct foreign keys of the merged rows, the parents listing them in their details
+
+    The rows have a NULL `id`, nothing is cached for the new records yet.
+    """
+    dao, _ = IMPORTS[kind]
+    table = dao.model.__table__
+    keys = [staging.c[name] for name in import_fields(kind) if table.c[name].foreign_keys]
+    if not keys:
+        return []
+    result = await connection.execute(
+        select(null().label("id"), *keys).where(staging.c.error.is_(None)).distinct()
+    )
+    return result.all()
+
+
+class Importer:
+    """CSV imports of contacts and companies run as jobs of `runner`
+
+    The uploaded file is saved to `directory` and read in batches of
+    `batch_size` rows. Batches are validated in a pool of `workers`
+    processes while the previous results are copied with COPY into a
+    temporary staging table, then one transaction merges the staging
+    table into the model table. Invalid rows are written to a reject
+    file with their line number and error. The directory has to be
+    shared by the instances running the jobs.
+
+        Args:
+            import_config (ImportConfig): directory, batch size and worker processes
+    """
+
+    def __init__(self, import_config: ImportConfig):
+        self.directory = import_config.directory
+        self.batch_size = import_config.batch_size
+        self.workers = import_config.workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # fork would copy the event loop and the open connections of the app
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def rejects_path(self, job_id: int) -> str:
+        return os.path.join(self.directory, f"{job_id}.rejects.csv")
+
+    async def submit(self, session_db: AsyncSession, kind: ImportKindEnum, upload: UploadFile) -> Job:
+        """Saves the upload and enqueues its import"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{uuid.uuid4().hex}.csv")
+        with open(path, "wb") as f:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+        try:
+            return await runner.enqueue(
+                session_db, "import", {"kind": kind.value, "path": path, "filename": upload.filename}
+            )
+        except Exception:
+            os.remove(path)
+            raise
+
+    async def run(self, context: JobContext, kind: ImportKindEnum, path: str) -> dict:
+        dao, schema = IMPORTS[kind]
+        loop = asyncio.get_running_loop()
+        staging = staging_table(kind)
+        total_bytes = os.path.getsize(path) or 1
+        counts = {"rows": 0, "imported": 0, "rejected": 0}
+        with (
+            open(path, newline="", encoding="utf-8-sig") as f,
+            open(self.rejects_path(context.job_id), "w", newline="", encoding="utf-8") as rejects_file,
+        ):
+            reader = csv.DictReader(f)
+            header = await asyncio.to_thread(lambda: reader.fieldnames) or []
+            required = {name for name, info in schema.model_fields.items() if info.is_required()}
+            missing = required - set(header)
+            if missing:
+                raise PermanentJobError(f"Missing columns: {', '.join(sorted(missing))}")
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(["line", "error", *header])
+
+            def reject(line: int, error: str, raw: dict) -> None:
+                rejects.writerow([line, error, *(raw.get(name, "") for name in header)])
+                counts["rejected"] += 1
+
+            async with context.engine.connect() as connection:
+                await connection.run_sync(staging.create)
+                driver = (await connection.get_raw_connection()).driver_connection
+                copy = functools.partial(
+                    driver.copy_records_to_table, staging.name, columns=[c.name for c in staging.columns]
+                )
+                pending: deque[asyncio.Future] = deque()
+                try:
+                    while batch := await asyncio.to_thread(_read_batch, reader, self.batch_size):
+                        counts["rows"] += len(batch)
+                        pending.append(loop.run_in_executor(self.executor, validate_batch, kind, batch))
+                        # one batch is copied while the workers validate the next ones
+                        if len(pending) > self.workers:
+                            await self._copy(await pending.popleft(), copy, reject)
+                        # the file read is most of the time, the merge is the rest
+                        await context.progress(
+                            MERGE_SHARE * f.buffer.tell() / total_bytes, stage="reading", **counts
+                        )
+                    while pending:
+                        await self._copy(await pending.popleft(), copy, reject)
+                finally:
+                    for future in pending:
+                        future.cancel()
+
+                await context.progress(MERGE_SHARE, stage="merging", **counts)
+                counts["imported"] = await merge(connection, kind, staging)
+                parents = await imported_parents(connection, kind, staging)
+                refused = await connection.stream(
+                    select(staging.c.line, staging.c.error, staging.c.source)
+                    .where(staging.c.error.is_not(None))
+                    .order_by(staging.c.line)
+                )
+                async for line, error, source in refused:
+                    reject(line, error, json.loads(source))
+                await connection.commit()
+        await dao.invalidate_cache(parents, created=True)
+        log.info(
+            f"Import {context.job_id} of {kind.value}: {counts['imported']} imported, {counts['rejected']} rejected"
+        )
+        return counts
+
+    @staticmethod
+    async def _copy(result: tuple[list[tuple], list[tuple]], copy: Callable, reject: Callable) -> None:
+        records, rejected = result
+        if records:
+            await copy(records=records)
+        for line, error, raw in rejected:
+            reject(line, error, raw)
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def _read_batch(reader: csv.DictReader, size: int) -> list[tuple[int, dict]]:
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) == size:
+            break
+    return batch
+
+
+importer = Importer(config.imports)
+
+
+@runner.handler("import")
+async def run_import(context: JobContext, kind: str, path: str, filename: str | None = None) -> dict:
+    """Imports the uploaded file, keeps it for the retries of the job"""
+    done = False
+    try:
+        result = await importer.run(context, ImportKindEnum(kind), path)
+        done = True
+        return result
+    except Exception as e:
+        done = context.last_attempt or isinstance(e, PermanentJobError)
+        raise
+    finally:
+        if done:
+            os.remove(path)
@@ -0,0 +1,288 @@
+__all__ = ["JobContext", "JobRunner", "PermanentJobError", "runner"]
+
+import asyncio
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import config, setup_log
+from app.config.app_config import JobsConfig
+from app.constants import JobStatusEnum
+from app.database.database import engine
+from app.models import Job
+
+
+log = setup_log(__name__)
+
+# progress is written at most this often, the last update always
+PROGRESS_INTERVAL = 0.5
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when a retry can not succeed, e.g. invalid input"""
+
+
+class JobContext:
+    """What a handler knows about its job
+
+        Args:
+            runner (JobRunner): runner executing the job
+            job (Job): claimed row of the job
+    """
+
+    def __init__(self, runner: "JobRunner", job: Job):
+        self.runner = runner
+        self.job_id = job.id
+        self.worker = job.locked_by
+        self.attempt = job.attempts
+        self.last_attempt = job.attempts >= job.max_attempts
+        self._reported = 0.0
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self.runner.engine
+
+    def session(self) -> AsyncSession:
+        return self.runner.session()
+
+    async def progress(self, value: float, **details: Any) -> None:
+        """Stores the share of the work done and the counters shown with it"""
+        now = time.monotonic()
+        if value < 1 and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        async with self.session() as session_db:
+            await session_db.execute(
+                update(Job)
+                .where(Job.id == self.job_id, Job.locked_by == self.worker, Job.status == JobStatusEnum.RUNNING)
+                .values(progress=min(value, 1.0), result=details or None, locked_at=func.now())
+            )
+            await session_db.commit()
+
+
+Handler = Callable[..., Awaitable[dict | None]]
+
+
+class JobRunner:
+    """Queue of background jobs in the `jobs` table
+
+    Every instance of the app runs `concurrency` workers. A worker claims
+    the oldest due job with `SELECT ... FOR UPDATE SKIP LOCKED`, so the
+    instances share the queue without taking a job twice. A failed job is
+    retried `max_attempts` times with an exponential delay. A running job
+    refreshes `locked_at`, the job of a worker that died is returned to
+    the queue after `lease` seconds.
+
+        Args:
+            engine (AsyncEngine): engine of the primary database
+            jobs_config (JobsConfig): concurrency, polling, retries and lease
+    """
+
+    def __init__(self, engine: AsyncEngine, jobs_config: JobsConfig):
+        self.engine = engine
+        self.enabled = jobs_config.enabled
+        self.concurrency = jobs_config.concurrency
+        self.poll_interval = jobs_config.poll_interval
+        self.max_attempts = jobs_config.max_attempts
+        self.retry_delay = jobs_config.retry_delay
+        self.lease = jobs_config.lease
+        self.handlers: dict[str, Handler] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        """Registers `async def handler(context, **payload) -> dict | None` for `kind`"""
+        def register(handler: Handler) -> Handler:
+            self.handlers[kind] = handler
+            return handler
+        return register
+
+    def session(self) -> AsyncSession:
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    async def enqueue(
+        self, session_db: AsyncSession, kind: str, payload: dict | None = None, max_attempts: int | None = None
+    ) -> Job:
+        """Adds a job in the transaction of `session_db` and commits it"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind}")
+        job = Job(kind=kind, payload=payload or {}, max_attempts=max_attempts or self.max_attempts)
+        session_db.add(job)
+        await session_db.commit()
+        await session_db.refresh(job)
+        self._wakeup.set()
+        return job
+
+    async def _claim(self, worker: str) -> Job | None:
+        due = (
+            select(Job.id)
+            .where(
+                Job.status == JobStatusEnum.PENDING,
+                Job.run_after <= func.now(),
+                Job.kind.in_(list(self.handlers)),
+            )
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session() as session_db:
+            job = await session_db.scalar(
+                update(Job)
+                .where(Job.id == due)
+                .values(
+                    status=JobStatusEnum.RUNNING,
+                    attempts=Job.attempts + 1,
+                    locked_by=worker,
+                    locked_at=func.now(),
+                )
+                .returning(Job)
+            )
+            await session_db.commit()
+        return job
+
+    async def _set(self, job_id: int, worker: str, **values: Any) -> bool:
+        """Updates the job while `worker` holds its lease, False once it was reaped"""
+        async with self.session() as session_db:
+            result = await session_db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.locked_by == worker, Job.status == JobStatusEnum.RUNNING)
+                .values(**values)
+            )
+            await session_db.commit()
+        return bool(result.rowcount)
+
+    async def _store(self, job: Job, **values: Any) -> None:
+        if not await self._set(job.id, job.locked_by, **values):
+            log.warning(f"Outcome of job {job.id} {job.kind} is dropped, the lease of {job.locked_by} expired")
+
+    async def _heartbeat(self, job_id: int, worker: str) -> None:
+        # a missed beat is retried on the next one, the lease covers two of them
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if not await self._set(job_id, worker, locked_at=func.now()):
+                    log.warning(f"Lease of job {job_id} was taken from {worker}, heartbeat stopped")
+                    return
+            except Exception as e:
+                log.error(f"Heartbeat of job {job_id} failed: {e}")
+
+    async def reap(self) -> int:
+        """Returns the jobs of dead workers to the queue, fails them after the last attempt"""
+        expired = func.now() - timedelta(seconds=self.lease)
+        exhausted = Job.attempts >= Job.max_attempts
+        async with self.session() as session_db:
+            result = await session_db.execute(
+                update(Job)
+                .where(Job.status == JobStatusEnum.RUNNING, Job.locked_at < expired)
+                .values(
+                    status=case(
+                        (exhausted, literal(JobStatusEnum.FAILED, Job.status.type)),
+                        else_=literal(JobStatusEnum.PENDING, Job.status.type),
+                    ),
+                    error="Lease expired",
+                    locked_by=None,
+                    finished_at=case((exhausted, func.now())),
+                )
+            )
+            await session_db.commit()
+        if result.rowcount:
+            log.warning(f"Returned {result.rowcount} expired jobs to the queue")
+        return result.rowcount
+
+    async def run(self, job: Job) -> None:
+        """Executes the claimed job and stores its outcome"""
+        handler = self.handlers[job.kind]
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, job.locked_by))
+        try:
+            result = await handler(JobContext(self, job), **job.payload)
+        except asyncio.CancelledError:
+            # shutdown, the attempt does not count
+            try:
+                await self._store(
+                    job, status=JobStatusEnum.PENDING, attempts=Job.attempts - 1, locked_by=None
+                )
+            except Exception as e:
+                log.error(f"Job {job.id} {job.kind} was not returned to the queue: {e}")
+            raise
+        except Exception as e:
+            retry = not isinstance(e, PermanentJobError) and job.attempts < job.max_attempts
+            log.warning(f"Job {job.id} {job.kind} attempt {job.attempts} failed: {e!r}")
+            if retry:
+                delay = self.retry_delay * 2 ** (job.attempts - 1)
+                await self._store(
+                    job,
+                    status=JobStatusEnum.PENDING,
+                    error=str(e),
+                    locked_by=None,
+                    run_after=func.now() + timedelta(seconds=delay),
+                )
+            else:
+                await self._store(
+                    job, status=JobStatusEnum.FAILED, error=str(e), locked_by=None, finished_at=func.now()
+                )
+        else:
+            values = {"result": result} if result is not None else {}
+            await self._store(
+                job,
+                status=JobStatusEnum.DONE,
+                progress=1.0,
+                error=None,
+                locked_by=None,
+                finished_at=func.now(),
+                **values,
+            )
+            log.info(f"Job {job.id} {job.kind} done")
+        finally:
+            heartbeat.cancel()
+
+    async def _work(self, slot: int) -> None:
+        worker = f"{self.worker_id}:{slot}"
+        while True:
+            try:
+                job = await self._claim(worker)
+            except Exception as e:
+                log.error(f"Claim of a job failed: {e}")
+                job = None
+            if job is not None:
+                try:
+                    await self.run(job)
+                except Exception:
+                    # the outcome was not stored, the lease returns the job to the queue
+                    log.exception(f"Job {job.id} {job.kind} could not be completed")
+                continue
+            self._wakeup.clear()
+            try:
+                async with asyncio.timeout(self.poll_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def _reap_periodically(self) -> None:
+        while True:
+            try:
+                await self.reap()
+            except Exception as e:
+                log.error(f"Reap of expired jobs failed: {e}")
+            await asyncio.sleep(self.lease)
+
+    async def start(self) -> None:
+        if not self.enabled or self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work(slot)) for slot in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._reap_periodically()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+runner = JobRunner(engine, config.jobs)
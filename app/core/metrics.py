@@ -0,0 +1,245 @@
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "registry",
+    "MetricsMiddleware",
+    "instrument_engine",
+    "observe_pool_wait",
+    "current_request",
+]
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base of the metrics, a value per combination of the label values"""
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _labels(self.labelnames, key, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """Set of metrics rendered together in the Prometheus text format"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self.metrics.values()) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "Finished HTTP requests", ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to the last byte of the response", ("method", "route"),
+))
+REQUESTS_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests being handled", ("method",),
+))
+RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Size of the response body", ("method", "route"), SIZE_BUCKETS,
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed by one request", ("method", "route"), COUNT_BUCKETS,
+))
+REQUEST_DB_TIME = registry.register(Histogram(
+    "http_request_db_seconds", "Time one request spent in SQL statements", ("method", "route"),
+))
+QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Duration of a SQL statement",
+))
+POOL_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool, connecting included",
+))
+
+
+@dataclass
+class RequestStats:
+    """SQL activity of one request, filled by the engine events"""
+    queries: int = 0
+    db_time: float = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    # unmatched paths would give every scanner URL its own series
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, size and SQL usage per route
+
+    Routes are labelled by their template (`/api/users/{user_id}`),
+    streaming responses are measured until their last chunk is sent.
+
+        Args:
+            app: ASGI application
+            exclude (Sequence[str]): paths that are not measured
+    """
+
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec(method=method)
+            current_request.reset(token)
+            route = _route(scope)
+            REQUESTS.inc(method=method, route=route, status=str(status_code))
+            REQUEST_DURATION.observe(duration, method=method, route=route)
+            RESPONSE_SIZE.observe(size, method=method, route=route)
+            REQUEST_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_DB_TIME.observe(stats.db_time, method=method, route=route)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._metrics_start
+    QUERY_DURATION.observe(duration)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += duration
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attributes the statements executed by the engine to the current request"""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_pool_wait(seconds: float) -> None:
+    POOL_WAIT.observe(seconds)
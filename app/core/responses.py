@@ -0,0 +1,20 @@
+__all__ = ["render"]
+
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+
+from app.config import config
+
+
+def render(content: Any, status_code: int = 200) -> Any:
+    """Returns the content of a read endpoint
+
+    With API_FAST_SERIALIZATION the content is written by orjson as is and
+    the `response_model` of the route is not applied, so use it only for
+    data that already has the shape of the response schema, e.g. rows
+    selected by the schema columns or cached schema dumps.
+    """
+    if config.api.fast_serialization:
+        return ORJSONResponse(content, status_code=status_code)
+    return content
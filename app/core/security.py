@@ -1,12 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
 
+from app.config import config
+
 # Настройка контекста хеширования
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto"
 )
 
+# bcrypt releases the GIL while hashing, so a small thread pool is enough
+# to keep the event loop free and to bound the CPU spent on hashing
+hash_executor = ThreadPoolExecutor(
+    max_workers=config.security.hash_workers,
+    thread_name_prefix="password-hash",
+)
+
 def get_password_hash(password: str) -> str:
     """
     Generates a hash of the password.
@@ -33,4 +45,35 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except UnknownHashError:
-        return False
\ No newline at end of file
+        return False
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Generates a hash of the password in `hash_executor`
+    without blocking the event loop.
+    
+    Args:
+        password: The password is in its purest form
+        
+    Returns:
+        The hashed password
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Checks if the password matches its hash in `hash_executor`
+    without blocking the event loop.
+    
+    Args:
+        plain_password: The password is in its purest form
+        hashed_password: The hashed password from the DB
+        
+    Returns:
+        bool: True if the password is correct, False if not
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        hash_executor, verify_password, plain_password, hashed_password
+    )
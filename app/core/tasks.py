@@ -0,0 +1,31 @@
+__all__ = ["reassign_companies", "refresh_stats"]
+
+from sqlalchemy import func, select, text
+
+from app.core.jobs import JobContext, runner
+from app.database.dao import CompanyDAO
+from app.database.views import VIEWS
+from app.models import Company
+
+
+@runner.handler("reassign_companies")
+async def reassign_companies(context: JobContext, from_user_id: int, to_user_id: int) -> dict:
+    """Moves all companies of `from_user_id` to `to_user_id`"""
+    async with context.session() as session_db:
+        total = await session_db.scalar(select(func.count()).where(Company.user_id == from_user_id))
+        moved = 0
+        async for count in CompanyDAO.reassign(from_user_id, to_user_id, session_db):
+            moved += count
+            await context.progress(moved / max(total, 1), moved=moved, total=total)
+    return {"moved": moved}
+
+
+@runner.handler("refresh_stats")
+async def refresh_stats(context: JobContext) -> dict:
+    """Rebuilds every materialized rollup, e.g. after a bulk load"""
+    async with context.engine.connect() as connection:
+        for done, name in enumerate(VIEWS, 1):
+            await connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+            await connection.commit()
+            await context.progress(done / len(VIEWS), view=name)
+    return {"views": list(VIEWS)}
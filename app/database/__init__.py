@@ -1,3 +1,5 @@
-from .database import A_Session, Base, DB_URL, BaseComment, get_db
+from .database import A_Session, Base, DB_URL, BaseComment, get_db, engine_options, pool_stats
+from .routing import get_read_db, replicas
+from . import ddl
 
-__all__ = ["A_Session", "Base", "DB_URL", "BaseComment", "get_db"]
\ No newline at end of file
+__all__ = ["A_Session", "Base", "DB_URL", "BaseComment", "get_db", "engine_options", "pool_stats", "get_read_db", "replicas"]
\ No newline at end of file
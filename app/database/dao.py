@@ -1,16 +1,70 @@
+import asyncio
+from collections import defaultdict
 from dataclasses import dataclass
+import functools
+import hashlib
+import json
 import re
-from typing import TypeVar
+from typing import Any, AsyncIterator, Iterable, Mapping, TypeVar, get_args
 from pydantic import BaseModel
-from sqlalchemy import select, delete, update
-from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    Float,
+    String,
+    and_,
+    cast,
+    delete,
+    func,
+    inspect,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import InstrumentedAttribute, RelationshipProperty, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
+from app.constants import (
+    BULK_CHUNK_SIZE,
+    DEFAULT_PAGE_SIZE,
+    DETAIL_COLLECTION_LIMIT,
+    EXPORT_CHUNK_SIZE,
+    MAX_PAGE_SIZE,
+    SYNC_CHUNK_SIZE,
+)
 from app.database import Base
-from app.models import User, Company, Contact
-from app.config import setup_log
-from app.core.security import get_password_hash
+from app.database.filters import InvalidFilterError, compile_filters, compile_sort, keyset_after
+from app.database.loaders import Loaders
+from app.database.pagination import encode_cursor, decode_cursor
+from app.database.routing import replicas
+from app.database.views import (
+    department_stats,
+    department_stats_query,
+    manager_stats,
+    manager_stats_query,
+    rollups,
+)
+from app.models import User, Company, CompanyComment, Contact, ContactComment
+from app.schemas import (
+    CompanyCommentRead,
+    CompanyExpandedResponse,
+    CompanyFullResponse,
+    CompanyResponse,
+    ContactCommentRead,
+    ContactExpandedResponse,
+    ContactFullResponse,
+    ContactResponse,
+    UserFullResponse,
+    UserResponse,
+)
+from app.config import config, setup_log
+from app.core.cache import cache
+from app.core.security import get_password_hash_async
 
 
 log = setup_log(__name__)
@@ -18,14 +72,49 @@ log = setup_log(__name__)
 T = TypeVar("T", bound="Base")
 
 
+def content_hash(data: BaseModel) -> str:
+    """Digest of the schema values, equal for equal data whatever the key order"""
+    payload = json.dumps(data.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def _integrity_error_detail(e: IntegrityError) -> str:
+    detail_match = re.search(r'DETAIL:\s*(.*)', str(e.orig))
+    return detail_match.group(1) if detail_match else "Неизвестная ошибка уникальности"
+
+
 @dataclass
 class BaseDAO():
     """Base class for getting data from the database
 
         Args:
             model: (DeclarativeBase): SQLalchemy model. Default = None
+            cursor_columns: (tuple[str, ...]): columns of the keyset used for
+                pagination, the last one must be unique. Default = ("id",)
+            cursor_descending: (bool): pages go from the largest keyset
+                to the smallest, e.g. the newest first. Default = False
+            schema: (BaseModel): response schema of the list items, cached
+                pages are stored as this schema. Default = None
+            detail_schema: (BaseModel): response schema of `get_details`, only
+                the relations it serializes are loaded. Default = None
+            filter_fields: (tuple[str, ...]): columns the list may be filtered
+                by, keep them indexed. Default = ()
+            sort_fields: (tuple[str, ...]): columns the list may be sorted by,
+                `cursor_columns` are appended to make the order total. Default = ()
+            expand_schema: (BaseModel): list item schema with the many-to-one
+                relations `expand` may embed. Default = None
+            sync_key: (str): unique column `sync` upserts by, the model needs
+                a `content_hash` column. Default = None
     """
     model: Base = None
+    cursor_columns: tuple[str, ...] = ("id",)
+    cursor_descending: bool = False
+    schema: type[BaseModel] = None
+    detail_schema: type[BaseModel] = None
+    filter_fields: tuple[str, ...] = ()
+    sort_fields: tuple[str, ...] = ()
+    expand_schema: type[BaseModel] = None
+    sync_key: str = None
 
     @classmethod
     async def get_all(cls, session_db: AsyncSession) -> list[T]:
@@ -42,23 +131,352 @@ class BaseDAO():
         return result.unique().all()
 
     @classmethod
-    async def get_details(cls, id: int | str, session_db: AsyncSession) -> T:
-        """Retrieve instance of the model with all relations
+    async def get_page(
+        cls,
+        session_db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        filters: Mapping[str, Any] | None = None,
+        sort: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Retrieve one page of the model instances using keyset pagination.
+
+        Pages are served from the cache while no record of the model is written,
+        concurrent misses of the same page share one query. Pages read from
+        a replica are not stored, the replica may not have the last write yet.
+
+        Args:
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+            limit (int): page size, capped by MAX_PAGE_SIZE
+            cursor (str | None): `next_cursor` of the previous page
+            filters (Mapping[str, Any] | None): `field__operator` -> value
+        over `filter_fields`, see `compile_filters`
+            sort (str | None): comma separated `sort_fields`, `-` for descending
+
+        Raises:
+            InvalidCursorError: the cursor can not be decoded
+            InvalidFilterError: the filter or sort is not allowed
+
+        Returns:
+            tuple[list[dict], str | None]: items of the page dumped with `schema`
+        (plain rows with API_FAST_SERIALIZATION) and the cursor of the next
+        page. The cursor is None on the last page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = dict(filters or {})
+        # fail before the cache, a rejected filter must not reach the loader
+        cls._compile_query(filters, sort)
+
+        async def load_page() -> dict:
+            items, next_cursor = await cls._get_page(session_db, limit, cursor, filters, sort)
+            if not config.api.fast_serialization:
+                items = [cls.schema.model_validate(item).model_dump(mode="json") for item in items]
+            return {"items": items, "next_cursor": next_cursor}
+
+        key = (cls.model.__tablename__, "page", limit, cursor)
+        if filters or sort:
+            key += (tuple(sorted((k, str(v)) for k, v in filters.items())), sort)
+        page = await cache.get_or_set(key, load_page, store=not replicas.serves(session_db))
+        return page["items"], page["next_cursor"]
+
+    @classmethod
+    def columns_of(cls, fields: Iterable[str]) -> list[InstrumentedAttribute]:
+        """Mapped columns of the model named in `fields`, in the model order"""
+        fields = set(fields)
+        return [
+            getattr(cls.model, attr.key)
+            for attr in inspect(cls.model).column_attrs
+            if attr.key in fields
+        ]
+
+    @classmethod
+    def _compile_query(
+        cls,
+        filters: Mapping[str, Any],
+        sort: str | None,
+    ) -> tuple[list, list[tuple[InstrumentedAttribute, bool]]]:
+        """WHERE conditions and keyset order of a list request"""
+        conditions = compile_filters(
+            {c.key: c for c in cls.columns_of(cls.filter_fields)}, filters
+        )
+        order = compile_sort(
+            {c.key: c for c in cls.columns_of(cls.sort_fields)},
+            sort,
+            [getattr(cls.model, name) for name in cls.cursor_columns],
+            cls.cursor_descending,
+        )
+        return conditions, order
+
+    @classmethod
+    async def _get_page(
+        cls,
+        session_db: AsyncSession,
+        limit: int,
+        cursor: str | None,
+        filters: Mapping[str, Any] | None = None,
+        sort: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Selects plain rows of the schema columns, no ORM instances are built"""
+        conditions, order = cls._compile_query(filters or {}, sort)
+        keyset = [column for column, _ in order]
+        query = (
+            select(*cls.columns_of([*cls.schema.model_fields, *(c.key for c in keyset)]))
+            .where(*conditions)
+            .order_by(*(column.desc() if descending else column for column, descending in order))
+            .limit(limit + 1)
+        )
+        if cursor:
+            values = decode_cursor(cursor, [c.property.columns[0] for c in keyset])
+            query = query.where(keyset_after(order, values))
+
+        result = await session_db.execute(query)
+        rows = [row._asdict() for row in result.all()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][column.key] for column in keyset])
+        # keyset columns outside the schema are selected for the cursor only,
+        # the rows go out as they are with API_FAST_SERIALIZATION
+        fields = cls.schema.model_fields
+        return [{key: value for key, value in row.items() if key in fields} for row in rows], next_cursor
+
+    @classmethod
+    @functools.cache
+    def _expand_plan(cls) -> dict[str, tuple[str, type[Base], tuple[str, ...]]]:
+        """Relation -> (foreign key attribute, related model, fields of its schema)"""
+        if cls.expand_schema is None:
+            return {}
+        relationships = inspect(cls.model).relationships
+        plan = {}
+        for name, field in cls.expand_schema.model_fields.items():
+            relationship = relationships.get(name)
+            if relationship is None or relationship.uselist:
+                continue
+            schema = next(a for a in get_args(field.annotation) if isinstance(a, type) and issubclass(a, BaseModel))
+            local, _ = relationship.local_remote_pairs[0]
+            plan[name] = (
+                relationship.parent.get_property_by_column(local).key,
+                relationship.mapper.class_,
+                tuple(schema.model_fields),
+            )
+        return plan
+
+    @classmethod
+    async def expand(
+        cls,
+        items: list[dict],
+        expand: Iterable[str],
+        loaders: Loaders,
+    ) -> list[dict]:
+        """Embed the related rows named in `expand` into the list items
+
+        The related rows of all items are selected by one query per relation,
+        whatever the page size.
+
+        Args:
+            items (list[dict]): items of a page, see `get_page`
+            expand (Iterable[str]): relations of `expand_schema`
+            loaders (Loaders): data loaders of the request
+
+        Raises:
+            InvalidFilterError: the relation can not be expanded
+
+        Returns:
+            list[dict]: copies of the items with the relations added
+        """
+        plan = cls._expand_plan()
+        names = list(dict.fromkeys(name for name in expand if name))
+        unknown = [name for name in names if name not in plan]
+        if unknown:
+            raise InvalidFilterError(
+                f"Can not expand {', '.join(unknown)}, allowed: {', '.join(plan) or 'nothing'}"
+            )
+        if not names or not items:
+            return items
+
+        lookups = []
+        for name in names:
+            foreign_key, model, fields = plan[name]
+            lookups.append(loaders.of(model, fields).load_many([item[foreign_key] for item in items]))
+        related = await asyncio.gather(*lookups)
+        items = [dict(item) for item in items]
+        for name, rows in zip(names, related):
+            for item, row in zip(items, rows):
+                item[name] = row
+        return items
+
+    @classmethod
+    async def stream_rows(
+        cls,
+        fields: Iterable[str],
+        session_db: AsyncSession,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream all rows of the model table through a server-side cursor.
+
+        Only plain columns are selected, so neither ORM instances nor
+        relations are built. The session is closed once the stream is
+        exhausted, because the generator outlives the request dependency.
+
+        Args:
+            fields (Iterable[str]): names of the exported fields,
+        the ones that are not columns of the table are skipped
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+            chunk_size (int): rows fetched from the cursor at a time
+
+        Yields:
+            list[dict]: chunk of rows as mappings column -> value
+        """
+        try:
+            result = await session_db.stream(
+                select(*cls.columns_of(fields))
+                .order_by(cls.model.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for partition in result.mappings().partitions():
+                yield [dict(row) for row in partition]
+        finally:
+            await session_db.close()
+
+    @classmethod
+    @functools.cache
+    def _load_plan(cls) -> tuple[list, list[RelationshipProperty]]:
+        """Loader options and collections needed by `detail_schema`
+
+        Many-to-one relations are joined into the main query, collections are
+        loaded by separate limited queries in `_load_collection`.
+        """
+        relationships = inspect(cls.model).relationships
+        fields = cls.detail_schema.model_fields if cls.detail_schema else relationships.keys()
+        options, collections = [], []
+        for name in fields:
+            relationship = relationships.get(name)
+            if relationship is None:
+                continue
+            if relationship.uselist:
+                collections.append(relationship)
+            else:
+                options.append(joinedload(getattr(cls.model, name)))
+        return options, collections
+
+    @classmethod
+    async def _load_collection(
+        cls,
+        instance: T,
+        relationship: RelationshipProperty,
+        session_db: AsyncSession,
+        limit: int = DETAIL_COLLECTION_LIMIT,
+    ) -> None:
+        """Load at most `limit` items of a one-to-many relation of the instance
+
+        If the relation has more items, `<relation>_next_cursor` of the instance
+        is the keyset of the last loaded item in the relation order, the rest
+        is paged by the DAO of the related model from that cursor.
+        """
+        target = relationship.mapper.class_
+        order_by = relationship.order_by or relationship.mapper.primary_key
+        query = select(target).order_by(*order_by).limit(limit + 1)
+        for local, remote in relationship.local_remote_pairs:
+            query = query.where(remote == getattr(instance, local.key))
+
+        items = (await session_db.scalars(query)).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            keys = [
+                relationship.mapper.get_property_by_column(getattr(c, "element", c)).key
+                for c in order_by
+            ]
+            next_cursor = encode_cursor([getattr(items[-1], key) for key in keys])
+        setattr(instance, f"{relationship.key}_next_cursor", next_cursor)
+        set_committed_value(instance, relationship.key, items)
+        if relationship.back_populates:
+            for item in items:
+                set_committed_value(item, relationship.back_populates, instance)
+
+    @classmethod
+    async def get_details(cls, id: int | str, session_db: AsyncSession) -> dict | None:
+        """Retrieve instance of the model with the relations of `detail_schema`
 
         Args:
             id (int | str): ID instance of the model
             session_db (AsyncSession): The SQLAlchemy asynchronous session.
 
         Returns:
-            T: model instances with all relations
+            dict | None: instance dumped with `detail_schema`, collections are
+        limited by DETAIL_COLLECTION_LIMIT items. Served from the cache while
+        the instance and its relations are not written.
         """
+        async def load_details() -> dict | None:
+            instance = await cls._get_details(id, session_db)
+            if instance is None:
+                return None
+            return cls.detail_schema.model_validate(instance).model_dump(mode="json")
+
+        # a lagging replica may return the row before a write, that would be
+        # served from the cache after the write dropped it
+        return await cache.get_or_set(
+            (cls.model.__tablename__, "details", id), load_details, store=not replicas.serves(session_db)
+        )
+
+    @classmethod
+    async def _get_details(cls, id: int | str, session_db: AsyncSession) -> T:
+        options, collections = cls._load_plan()
         result = await session_db.scalars(
             select(cls.model)
             .where(cls.model.id == id)
-            .options(selectinload("*"))
+            .options(*options)
         )
-        return result.unique().one_or_none()
-    
+        instance = result.unique().one_or_none()
+        if instance is None:
+            return None
+        for relationship in collections:
+            await cls._load_collection(instance, relationship, session_db)
+        return instance
+
+    @classmethod
+    async def invalidate_cache(
+        cls,
+        records: Iterable = (),
+        created: bool = False,
+        reassigned: bool = False,
+        deleted: bool = False,
+    ) -> None:
+        """Drop cached pages and details affected by a write
+
+        Args:
+            records (Iterable): written rows, instances or rows with the table columns
+            created (bool): the records are new, so nothing refers to them yet
+            reassigned (bool): foreign keys of the records were changed,
+        the details of the previous parents are unknown and dropped entirely
+            deleted (bool): the records were deleted, the foreign keys of their
+        children were set to NULL or the children deleted with them
+        """
+        namespace = cls.model.__tablename__
+        rollups.schedule(namespace)
+        await cache.delete_prefix((namespace, "page"))
+        for record in records:
+            await cache.delete((namespace, "details", record.id))
+
+        for relationship in inspect(cls.model).relationships:
+            target = relationship.mapper.class_.__tablename__
+            if relationship.uselist:
+                # children embed this record in their details
+                if not created:
+                    await cache.delete_prefix((target, "details"))
+                # and list its id, ON DELETE changed their rows
+                if deleted:
+                    await cache.delete_prefix((target, "page"))
+            elif reassigned:
+                await cache.delete_prefix((target, "details"))
+            else:
+                # parents list this record in their details
+                for record in records:
+                    for local, _ in relationship.local_remote_pairs:
+                        parent_id = getattr(record, local.key)
+                        if parent_id is not None:
+                            await cache.delete((target, "details", parent_id))
+
     @classmethod
     async def create_new_record(cls, data: BaseModel, session_db: AsyncSession):
         """Created new object in the DB"""
@@ -67,6 +485,7 @@ class BaseDAO():
             session_db.add(model)
             await session_db.commit()
             await session_db.refresh(model)
+            await cls.invalidate_cache([model], created=True)
             return model
         except IntegrityError as e:
             log.debug(f"Error added {e}")
@@ -80,43 +499,212 @@ class BaseDAO():
                 "detail": " ".join(detail.split()[:-3])
             }
         
+    @classmethod
+    async def _prepare_rows(cls, data: list[BaseModel]) -> list[dict]:
+        """Converts schemas into rows of the model table"""
+        return [item.model_dump() for item in data]
+
+    @classmethod
+    async def bulk_create(cls, data: list[BaseModel], session_db: AsyncSession):
+        """Insert many records in one transaction.
+
+        Every chunk of BULK_CHUNK_SIZE rows is a single
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING *`, rows that violate
+        a unique constraint are skipped and reported instead of failing
+        the whole batch.
+
+        Args:
+            data (list[BaseModel]): schemas of the new records
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+
+        Returns:
+            tuple[list[T], list[dict]]: created instances and conflicts
+        with the index of the rejected row. A dict with the error is returned
+        if the batch violates any other constraint.
+        """
+        rows = await cls._prepare_rows(data)
+        unique_columns = [c.name for c in cls.model.__table__.columns if c.unique]
+        created, conflicts = [], []
+        try:
+            for start in range(0, len(rows), BULK_CHUNK_SIZE):
+                chunk = rows[start:start + BULK_CHUNK_SIZE]
+                result = await session_db.scalars(
+                    insert(cls.model)
+                    .values(chunk)
+                    .on_conflict_do_nothing()
+                    .returning(cls.model)
+                )
+                inserted = defaultdict(list)
+                for record in result.all():
+                    key = tuple(getattr(record, name) for name in unique_columns)
+                    inserted[key].append(record)
+                for index, row in enumerate(chunk, start=start):
+                    key = tuple(row[name] for name in unique_columns)
+                    if inserted[key]:
+                        created.append(inserted[key].pop(0))
+                        continue
+                    values = ", ".join(str(v) for v in key)
+                    conflicts.append({
+                        "index": index,
+                        "error": "duplicate_key",
+                        "detail": f"Key ({', '.join(unique_columns)})=({values}) already exists.",
+                    })
+            await session_db.commit()
+            await cls.invalidate_cache(created, created=True)
+        except IntegrityError as e:
+            await session_db.rollback()
+            log.debug(f"Error bulk insert {cls.__name__}: {e}")
+            return {
+                "error": "integrity_error",
+                "message": "Нарушение целостности данных",
+                "detail": _integrity_error_detail(e),
+            }
+        log.debug(f"Bulk insert {cls.__name__}: created={len(created)} conflicts={len(conflicts)}")
+        return created, conflicts
+
+    @classmethod
+    async def sync(cls, data: list[BaseModel], session_db: AsyncSession):
+        """Insert the new records and update the changed ones by `sync_key`
+
+        Rows are sent as an executemany `INSERT ... ON CONFLICT (sync_key)
+        DO UPDATE` limited to the rows with another `content_hash`, so rows
+        with unchanged data are neither written nor returned. Inserted
+        rows are told from updated ones by `xmax = 0`. A key repeated in the
+        request is applied once, with the values of its last row.
+
+        Args:
+            data (list[BaseModel]): schemas of the records
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+
+        Returns:
+            dict: created, updated, unchanged and duplicates counts, or
+        the error if the batch violates another constraint
+        """
+        rows = {}
+        for item in data:
+            row = item.model_dump()
+            row["content_hash"] = content_hash(item)
+            rows[row[cls.sync_key]] = row
+        rows = list(rows.values())
+        counts = {"created": 0, "updated": 0, "unchanged": 0, "duplicates": len(data) - len(rows)}
+        if not rows:
+            return counts
+
+        table = cls.model.__table__
+        statement = insert(cls.model)
+        statement = statement.on_conflict_do_update(
+            index_elements=[cls.sync_key],
+            set_={
+                **{key: statement.excluded[key] for key in rows[0] if key != cls.sync_key},
+                "updated_at": func.now(),
+            },
+            where=table.c.content_hash.is_distinct_from(statement.excluded.content_hash),
+        ).returning(
+            table.c.id,
+            *(c for c in table.columns if c.foreign_keys),
+            literal_column(f"{table.name}.xmax = 0").label("inserted"),
+        )
+        created, updated = [], []
+        try:
+            for start in range(0, len(rows), SYNC_CHUNK_SIZE):
+                # executemany, compiled once and sent as multi-row VALUES pages
+                result = await session_db.execute(statement, rows[start:start + SYNC_CHUNK_SIZE])
+                for record in result.all():
+                    (created if record.inserted else updated).append(record)
+            await session_db.commit()
+        except IntegrityError as e:
+            await session_db.rollback()
+            log.debug(f"Error sync {cls.__name__}: {e}")
+            return {
+                "error": "integrity_error",
+                "message": "Нарушение целостности данных",
+                "detail": _integrity_error_detail(e),
+            }
+        if created:
+            await cls.invalidate_cache(created, created=True)
+        if updated:
+            await cls.invalidate_cache(updated, reassigned=True)
+        counts["created"], counts["updated"] = len(created), len(updated)
+        counts["unchanged"] = len(rows) - len(created) - len(updated)
+        log.debug(f"Sync {cls.__name__}: {counts}")
+        return counts
+
     @classmethod
     async def delete_record(cls, id: int, session_db: AsyncSession) -> bool:
-        result = await session_db.execute(delete(cls.model).where(cls.model.id == id))
+        result = await session_db.execute(
+            delete(cls.model)
+            .where(cls.model.id == id)
+            .returning(*cls.model.__table__.columns)
+        )
+        deleted = result.all()
         await session_db.commit()
-        return result.rowcount > 0
+        await cls.invalidate_cache(deleted, deleted=True)
+        return len(deleted) > 0
     
     @classmethod
     async def update_record(cls, id: int, data: BaseModel, session_db: AsyncSession):
+        """Update the record with one `UPDATE ... RETURNING` statement
+
+        Args:
+            id (int): ID instance of the model
+            data (BaseModel): schema with the new values, None values are skipped
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+
+        Returns:
+            T | dict | None: fresh instance, None if the record does not exist,
+        dict with the error if the new values violate a constraint
+        """
         update_values = {k: v for k, v in data.model_dump().items() if v is not None}
+        if not update_values:
+            return await session_db.get(cls.model, id, populate_existing=True)
+        if "content_hash" in cls.model.__table__.c:
+            # the next sync must overwrite the manual change
+            update_values["content_hash"] = None
+        foreign_keys = {c.key for c in cls.model.__table__.columns if c.foreign_keys}
         try:
-            await session_db.execute(
+            result = await session_db.scalars(
                 update(cls.model)
                 .where(cls.model.id == id)
                 .values(update_values)
+                .returning(cls.model)
+                .execution_options(populate_existing=True)
             )
-            updated_obj = await session_db.get(cls.model, id)
+            updated_obj = result.one_or_none()
             await session_db.commit()
-            log.debug(f"Updating {cls.__name__} id={id} with values: {update_values}")
-            return updated_obj
-        except Exception as e:
-            log.error(f"Error updating: {e}")
-            return None
-        
+        except IntegrityError as e:
+            await session_db.rollback()
+            log.debug(f"Error updating {cls.__name__} id={id}: {e}")
+            return {
+                "error": "duplicate_key",
+                "message": "Нарушение уникальности данных",
+                "detail": _integrity_error_detail(e),
+            }
+        log.debug(f"Updating {cls.__name__} id={id} with values: {update_values}")
+        if updated_obj is not None:
+            await cls.invalidate_cache(
+                [updated_obj], reassigned=bool(foreign_keys & update_values.keys())
+            )
+        return updated_obj
+
 
 @dataclass
 class UserDAO(BaseDAO):
     model = User
+    schema = UserResponse
+    detail_schema = UserFullResponse
+    filter_fields = ("post", "created_at")
+    sort_fields = ("created_at",)
 
     @classmethod
     async def create_new_record(cls, data: BaseModel, session_db: AsyncSession):
         try:
             model = cls.model(**data.model_dump())
-            hashed_password = get_password_hash(data.password)
+            hashed_password = await get_password_hash_async(data.password)
             model.hash_password = hashed_password
             session_db.add(model)
             await session_db.commit()
             await session_db.refresh(model)
+            await cls.invalidate_cache([model], created=True)
             return model
         except IntegrityError as e:
             log.debug(f"Error added {e}")
@@ -130,50 +718,288 @@ class UserDAO(BaseDAO):
             }
 
     @classmethod
-    async def get_companies(cls, user_id: int, session_db: AsyncSession):
-        result = await session_db.scalars(select(Company).where(Company.user_id == user_id))
-        return result.unique().all()
+    async def _prepare_rows(cls, data: list[BaseModel]) -> list[dict]:
+        hashes = await asyncio.gather(
+            *(get_password_hash_async(item.password) for item in data)
+        )
+        rows = [item.model_dump() for item in data]
+        for row, hashed_password in zip(rows, hashes):
+            row["hash_password"] = hashed_password
+        return rows
 
     @classmethod
-    async def get_contacts(cls, user_id: int, session_db: AsyncSession):
-        result = await session_db.scalars(select(Contact).where(Contact.user_id == user_id))
-        return result.unique().all()
+    async def get_companies(
+        cls,
+        user_id: int,
+        session_db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        filters: Mapping[str, Any] | None = None,
+        sort: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Page of the companies of the user, see `BaseDAO.get_page`"""
+        filters = {**(filters or {}), "user_id": user_id}
+        return await CompanyDAO.get_page(session_db, limit, cursor, filters, sort)
 
-    # @classmethod
-    # async def get_info(cls, user_id: int, session_db: AsyncSession):
-    #     result = await session_db.scalars(select(User).where(User.id == user_id))
-    #     return result.unique().one_or_none()
+    @classmethod
+    async def get_contacts(
+        cls,
+        user_id: int,
+        session_db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        filters: Mapping[str, Any] | None = None,
+        sort: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Page of the contacts of the user, see `BaseDAO.get_page`"""
+        filters = {**(filters or {}), "user_id": user_id}
+        return await ContactDAO.get_page(session_db, limit, cursor, filters, sort)
 
 
 @dataclass
 class ContactDAO(BaseDAO):
     model = Contact
+    schema = ContactResponse
+    detail_schema = ContactFullResponse
+    filter_fields = ("user_id", "company_id", "post", "department", "created_at")
+    sort_fields = ("created_at",)
+    expand_schema = ContactExpandedResponse
+    sync_key = "email"
 
     @classmethod
-    async def get_user(cls, contact_id: int, session_db: AsyncSession):
-        result = await session_db.execute(
-            select(Contact)
-            .where(Contact.id == contact_id)
-            .options(selectinload(Contact.user))
-        )
-        contact = result.scalars().unique().one_or_none()
-        if contact:
-            return contact.user
-        return None
+    async def get_user(cls, contact_id: int, session_db: AsyncSession, loaders: Loaders | None = None):
+        """Responsible user of the contact, batched with the other lookups of the request"""
+        return await cls._get_related("user", contact_id, loaders or Loaders(session_db))
 
     @classmethod
-    async def get_company(cls, contact_id: int, session_db: AsyncSession):
-        result = await session_db.scalars(
-            select(Contact)
-            .where(Contact.id == contact_id)
-            .options(selectinload(Contact.company))
-        )
-        contact = result.unique().one_or_none()
-        if contact:
-            return contact.company
-        return None
+    async def get_company(cls, contact_id: int, session_db: AsyncSession, loaders: Loaders | None = None):
+        """Company of the contact, batched with the other lookups of the request"""
+        return await cls._get_related("company", contact_id, loaders or Loaders(session_db))
+
+    @classmethod
+    async def _get_related(cls, name: str, contact_id: int, loaders: Loaders) -> dict | None:
+        foreign_key, model, fields = cls._expand_plan()[name]
+        contact = await loaders.of(cls.model, ("id", foreign_key)).load(contact_id)
+        if contact is None:
+            return None
+        return await loaders.of(model, fields).load(contact[foreign_key])
+
+
+@dataclass
+class ContactCommentDAO(BaseDAO):
+    model = ContactComment
+    cursor_columns = ("created_at", "id")
+    cursor_descending = True
+    schema = ContactCommentRead
+    filter_fields = ("contact_id",)
+
+
+@dataclass
+class CompanyCommentDAO(BaseDAO):
+    model = CompanyComment
+    cursor_columns = ("created_at", "id")
+    cursor_descending = True
+    schema = CompanyCommentRead
+    filter_fields = ("company_id",)
+
 
 @dataclass
 class CompanyDAO(BaseDAO):
     model = Company
+    schema = CompanyResponse
+    detail_schema = CompanyFullResponse
+    filter_fields = ("revenue", "user_id", "area_activity", "created_at")
+    sort_fields = ("revenue", "created_at")
+    expand_schema = CompanyExpandedResponse
+    sync_key = "inn"
+
+    @classmethod
+    async def reassign(
+        cls,
+        from_user_id: int,
+        to_user_id: int,
+        session_db: AsyncSession,
+        batch_size: int = BULK_CHUNK_SIZE,
+    ) -> AsyncIterator[int]:
+        """Move the companies of one user to another in committed chunks
+
+        A chunk holds the locks of `batch_size` rows only and the work done
+        survives a failure, the next run picks up the companies left.
 
+        Args:
+            from_user_id (int): current owner
+            to_user_id (int): new owner
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+            batch_size (int): companies updated by one statement
+
+        Yields:
+            int: number of companies moved by the chunk
+        """
+        chunk = (
+            select(Company.id)
+            .where(Company.user_id == from_user_id)
+            .order_by(Company.id)
+            .limit(batch_size)
+        )
+        while True:
+            result = await session_db.execute(
+                update(Company)
+                .where(Company.id.in_(chunk))
+                # the next sync must overwrite the manual change
+                .values(user_id=to_user_id, content_hash=None)
+                .returning(Company.id)
+            )
+            moved = result.all()
+            await session_db.commit()
+            if not moved:
+                return
+            await cls.invalidate_cache(moved, reassigned=True)
+            yield len(moved)
+
+
+@dataclass
+class SearchDAO():
+    """Ranked full-text and trigram search over companies and contacts
+
+    Words of the query are matched by prefix against `search_vector`,
+    the whole query as a substring of names, INN and email through the
+    pg_trgm indexes and, if it has at least 3 digits, against the digits
+    of the phones.
+    """
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @classmethod
+    def _companies(cls, q: str, tsquery, digits: str):
+        pattern = f"%{cls._escape_like(q)}%"
+        conditions = [Company.name.ilike(pattern), Company.inn.like(pattern)]
+        rank = func.greatest(func.similarity(Company.name, q), func.similarity(Company.inn, q))
+        if tsquery is not None:
+            conditions.append(Company.search_vector.op("@@")(tsquery))
+            rank = rank + func.ts_rank(Company.search_vector, tsquery)
+        if digits:
+            conditions.append(func.phone_digits(Company.phone).like(f"%{digits}%"))
+        return select(
+            literal("company", String).label("kind"),
+            Company.id.label("id"),
+            Company.name.label("title"),
+            Company.inn.label("subtitle"),
+            cast(rank, Float).label("rank"),
+        ).where(or_(*conditions))
+
+    @classmethod
+    def _contacts(cls, q: str, tsquery, digits: str):
+        pattern = f"%{cls._escape_like(q)}%"
+        conditions = [
+            Contact.last_name.ilike(pattern),
+            Contact.first_name.ilike(pattern),
+            Contact.email.ilike(pattern),
+        ]
+        rank = func.greatest(
+            func.similarity(Contact.last_name, q),
+            func.similarity(Contact.first_name, q),
+            func.similarity(Contact.email, q),
+        )
+        if tsquery is not None:
+            conditions.append(Contact.search_vector.op("@@")(tsquery))
+            rank = rank + func.ts_rank(Contact.search_vector, tsquery)
+        if digits:
+            conditions.append(func.phone_digits(Contact.phone).like(f"%{digits}%"))
+        return select(
+            literal("contact", String).label("kind"),
+            Contact.id.label("id"),
+            func.concat_ws(" ", Contact.last_name, Contact.first_name, Contact.middle_name).label("title"),
+            Contact.email.label("subtitle"),
+            cast(rank, Float).label("rank"),
+        ).where(or_(*conditions))
+
+    @classmethod
+    async def search(
+        cls,
+        q: str,
+        session_db: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Search companies and contacts, the best matches first
+
+        Args:
+            q (str): part of a name, INN, email or phone
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+            limit (int): page size, capped by MAX_PAGE_SIZE
+            cursor (str | None): `next_cursor` of the previous page
+
+        Raises:
+            InvalidCursorError: the cursor can not be decoded
+
+        Returns:
+            tuple[list[dict], str | None]: matches with kind, id, title,
+        subtitle and rank, the cursor of the next page or None
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        q = q.strip()
+        words = re.findall(r"\w+", q)
+        tsquery = (
+            func.to_tsquery("simple", " & ".join(f"{w}:*" for w in words)) if words else None
+        )
+        digits = re.sub(r"\D", "", q)
+        digits = digits if len(digits) >= 3 else ""
+
+        matches = union_all(
+            cls._companies(q, tsquery, digits), cls._contacts(q, tsquery, digits)
+        ).subquery("matches")
+        keyset = [matches.c.rank, matches.c.kind, matches.c.id]
+        query = (
+            select(matches)
+            .order_by(matches.c.rank.desc(), matches.c.kind, matches.c.id)
+            .limit(limit + 1)
+        )
+        if cursor:
+            rank, kind, id = decode_cursor(cursor, keyset)
+            query = query.where(or_(
+                matches.c.rank < rank,
+                and_(matches.c.rank == rank, tuple_(matches.c.kind, matches.c.id) > tuple_(kind, id)),
+            ))
+
+        result = await session_db.execute(query)
+        items = [row._asdict() for row in result.all()]
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        last = items[-1]
+        return items, encode_cursor([last["rank"], last["kind"], last["id"]])
+
+
+@dataclass
+class StatsDAO():
+    """Aggregates for the dashboards computed by GROUP BY in Postgres
+
+    With STATS_MATERIALIZED the rows are read from the materialized views
+    refreshed by `rollups` after writes, at most `refresh_delay` seconds stale.
+    """
+
+    @classmethod
+    async def _rows(cls, view, query, session_db: AsyncSession) -> list[dict]:
+        source = select(view) if rollups.enabled else query
+        result = await session_db.execute(source.order_by(source.selected_columns[0]))
+        return [row._asdict() for row in result.all()]
+
+    @classmethod
+    async def managers(cls, session_db: AsyncSession) -> list[dict]:
+        """Companies, their total revenue and contacts of every user
+
+        Returns:
+            list[dict]: user_id, username, companies, total_revenue, contacts
+        """
+        return await cls._rows(manager_stats, manager_stats_query, session_db)
+
+    @classmethod
+    async def departments(cls, session_db: AsyncSession) -> list[dict]:
+        """Number of contacts in every department, None for contacts without it
+
+        Returns:
+            list[dict]: department, contacts
+        """
+        return await cls._rows(department_stats, department_stats_query, session_db)
@@ -1,22 +1,76 @@
-__all__ = ["A_Session", "Base", "BaseComment"]
+__all__ = ["A_Session", "Base", "BaseComment", "engine_options", "pool_stats"]
+import time
+from uuid import uuid4
 from datetime import datetime
+from fastapi import Request
 from sqlalchemy import Integer, Text, func
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import config
+from app.config.app_config import DatabaseConfig
+from app.core.metrics import observe_pool_wait
 
 DB_URL = config.get_db_url()
 
-engine = create_async_engine(
-    DB_URL,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=30,
-    pool_recycle=300,
-    pool_pre_ping=True,
-    echo=False,
-)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool reporting how long every checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_pool_wait(time.perf_counter() - start)
+
+
+def engine_options(db_config: DatabaseConfig) -> dict:
+    """Keyword arguments of `create_async_engine` for the pool and asyncpg
+
+    Args:
+        db_config (DatabaseConfig): database settings
+
+    Returns:
+        dict: pool sizing and the `connect_args` of asyncpg
+    """
+    connect_args = {
+        "statement_cache_size": db_config.statement_cache_size,
+        "prepared_statement_cache_size": db_config.prepared_statement_cache_size,
+        "command_timeout": db_config.command_timeout,
+        "server_settings": {"application_name": db_config.application_name},
+    }
+    if db_config.pgbouncer:
+        # в режиме transaction pooling соседний запрос может попасть на другой backend
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": db_config.pool_size,
+        "max_overflow": db_config.max_overflow,
+        "pool_timeout": db_config.pool_timeout,
+        "pool_recycle": db_config.pool_recycle,
+        "pool_pre_ping": db_config.pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def pool_stats(pool) -> dict:
+    """Connections of a queue pool, for sizing it against `max_connections`"""
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # overflow() starts at -pool_size while the pool is filling up
+        "overflow": max(pool.overflow(), 0),
+        "timeout": pool.timeout(),
+    }
+
+
+engine = create_async_engine(DB_URL, echo=False, **engine_options(config.db))
 
 A_Session = async_sessionmaker(
     bind=engine,
@@ -25,8 +79,10 @@ A_Session = async_sessionmaker(
 )
 
 
-async def get_db():
+async def get_db(request: Request):
     async with A_Session() as session:
+        # get_read_db этого же запроса читает через основную базу
+        request.state.db_session = session
         try:
             yield session
         finally:
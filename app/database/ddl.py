@@ -0,0 +1,20 @@
+__all__ = ["PG_TRGM", "PHONE_DIGITS_FUNCTION"]
+
+from sqlalchemy import DDL, event
+
+from app.database.database import Base
+
+
+PG_TRGM = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+# array_to_string is STABLE, the wrapper is IMMUTABLE so it can be indexed.
+# Every number is reduced to its digits, "+7 999 765-43-21" -> "79997654321",
+# and the numbers are separated by spaces, so a search never matches across two.
+PHONE_DIGITS_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION phone_digits(phones text[]) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+$$ SELECT array_to_string(ARRAY(SELECT regexp_replace(p, '\D', '', 'g') FROM unnest(phones) p), ' ') $$
+"""
+
+event.listen(Base.metadata, "before_create", DDL(PG_TRGM))
+event.listen(Base.metadata, "before_create", DDL(PHONE_DIGITS_FUNCTION))
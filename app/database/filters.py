@@ -0,0 +1,202 @@
+__all__ = [
+    "InvalidFilterError",
+    "query_filters",
+    "compile_filters",
+    "compile_sort",
+    "keyset_after",
+]
+
+import enum
+from datetime import date, datetime
+from typing import Any, Mapping, Sequence
+
+from fastapi import Request
+from sqlalchemy import ARRAY, Enum as SQLEnum, and_, false, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import ColumnElement
+
+
+# query parameters of the list endpoints that are not filters
+RESERVED_PARAMS = frozenset({"limit", "cursor", "sort", "expand"})
+
+SCALAR_OPERATORS = {"eq", "ne", "in", "isnull"}
+RANGE_OPERATORS = {"gt", "gte", "lt", "lte"}
+ARRAY_OPERATORS = {"contains", "overlap", "isnull"}
+
+Order = list[tuple[InstrumentedAttribute, bool]]
+
+
+class InvalidFilterError(ValueError):
+    """Raised when a client filters or sorts by a field or value that is not allowed"""
+
+
+def query_filters(request: Request) -> dict[str, str]:
+    """FastAPI dependency with the filter parameters of a list request
+
+    Every query parameter except limit, cursor, sort and expand is a filter
+    `field__operator=value`, e.g. `revenue__gte=1000` or `department=Бухгалтерия`.
+    """
+    return {k: v for k, v in request.query_params.items() if k not in RESERVED_PARAMS}
+
+
+def _column(column: InstrumentedAttribute):
+    return column.property.columns[0]
+
+
+def _operators(column: InstrumentedAttribute) -> set[str]:
+    column_type = _column(column).type
+    if isinstance(column_type, ARRAY):
+        return ARRAY_OPERATORS
+    if isinstance(column_type, SQLEnum):
+        return SCALAR_OPERATORS
+    if column_type.python_type in (int, float, datetime, date):
+        return SCALAR_OPERATORS | RANGE_OPERATORS
+    return SCALAR_OPERATORS
+
+
+def _parse_scalar(column_type, name: str, raw: Any) -> Any:
+    if isinstance(column_type, SQLEnum) and column_type.enum_class is not None:
+        enum_class: type[enum.Enum] = column_type.enum_class
+        if isinstance(raw, enum_class):
+            return raw
+        # the API shows enum values, the names are accepted as well
+        for member in enum_class:
+            if raw in (member.value, member.name):
+                return member
+        raise InvalidFilterError(f"Invalid value of {name}: {raw}")
+    if not isinstance(raw, str):
+        return raw
+    python_type = column_type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(raw)
+        if python_type is date:
+            return date.fromisoformat(raw)
+        return python_type(raw)
+    except ValueError as e:
+        raise InvalidFilterError(f"Invalid value of {name}: {raw}") from e
+
+
+def _parse_list(column_type, name: str, raw: Any) -> list[Any]:
+    values = raw.split(",") if isinstance(raw, str) else list(raw)
+    return [_parse_scalar(column_type, name, v) for v in values]
+
+
+def compile_filters(
+    columns: Mapping[str, InstrumentedAttribute],
+    params: Mapping[str, Any],
+) -> list[ColumnElement]:
+    """Turns `field__operator=value` parameters into WHERE clauses
+
+    Operators of scalar columns: eq (default), ne, in (comma separated values),
+    isnull (true/false), numbers and dates also gt, gte, lt, lte.
+    Array columns support contains (@>), overlap (&&) and isnull.
+
+    Args:
+        columns (Mapping[str, InstrumentedAttribute]): whitelisted columns by field name
+        params (Mapping[str, Any]): filters from the request
+
+    Raises:
+        InvalidFilterError: unknown field, operator or malformed value
+
+    Returns:
+        list[ColumnElement]: conditions to AND together
+    """
+    conditions = []
+    for key, raw in params.items():
+        name, _, operator = key.partition("__")
+        operator = operator or "eq"
+        column = columns.get(name)
+        if column is None:
+            raise InvalidFilterError(f"Filtering by {name} is not allowed")
+        if operator not in _operators(column):
+            raise InvalidFilterError(f"Operator {operator} is not supported by {name}")
+
+        column_type = _column(column).type
+        if operator == "isnull":
+            if str(raw).lower() not in ("true", "false"):
+                raise InvalidFilterError(f"Invalid value of {key}: {raw}")
+            is_null = str(raw).lower() == "true"
+            conditions.append(column.is_(None) if is_null else column.is_not(None))
+        elif operator in ("contains", "overlap"):
+            values = _parse_list(column_type.item_type, name, raw)
+            conditions.append(
+                column.contains(values) if operator == "contains" else column.overlap(values)
+            )
+        elif operator == "in":
+            conditions.append(column.in_(_parse_list(column_type, name, raw)))
+        else:
+            value = _parse_scalar(column_type, name, raw)
+            conditions.append({
+                "eq": column.__eq__,
+                "ne": column.__ne__,
+                "gt": column.__gt__,
+                "gte": column.__ge__,
+                "lt": column.__lt__,
+                "lte": column.__le__,
+            }[operator](value))
+    return conditions
+
+
+def compile_sort(
+    columns: Mapping[str, InstrumentedAttribute],
+    sort: str | None,
+    keyset: Sequence[InstrumentedAttribute],
+    descending: bool = False,
+) -> Order:
+    """Parses `sort=-revenue,created_at` into the order of a keyset page
+
+    Args:
+        columns (Mapping[str, InstrumentedAttribute]): sortable columns by field name
+        sort (str | None): comma separated fields, `-` marks descending order
+        keyset (Sequence[InstrumentedAttribute]): unique columns appended to
+    make the order total, they follow the direction of the last sort field
+        descending (bool): direction of the keyset when nothing is sorted
+
+    Raises:
+        InvalidFilterError: the field is not sortable
+
+    Returns:
+        list[tuple[InstrumentedAttribute, bool]]: columns with the descending flag
+    """
+    order: Order = []
+    for field in filter(None, (sort or "").split(",")):
+        descending = field.startswith("-")
+        name = field.lstrip("-+")
+        column = columns.get(name)
+        if column is None:
+            raise InvalidFilterError(f"Sorting by {name} is not allowed")
+        order.append((column, descending))
+    descending = order[-1][1] if order else descending
+    used = {column.key for column, _ in order}
+    order.extend((column, descending) for column in keyset if column.key not in used)
+    return order
+
+
+def keyset_after(order: Order, values: Sequence[Any]) -> ColumnElement:
+    """Condition selecting the rows that follow `values` in `order`
+
+    NULLs are placed the way Postgres does by default, last in ascending
+    and first in descending order, so the btree indexes stay usable.
+    Orders of one direction over NOT NULL columns compile to a row
+    comparison, which Postgres turns into an index range.
+    """
+    directions = {descending for _, descending in order}
+    if len(directions) == 1 and not any(_column(c).nullable for c, _ in order):
+        row, after = tuple_(*(c for c, _ in order)), tuple_(*values)
+        return row < after if directions.pop() else row > after
+
+    clauses, equal = [], []
+    for (column, descending), value in zip(order, values):
+        nullable = _column(column).nullable
+        if value is None:
+            step = column.is_not(None) if descending else None
+        elif descending:
+            step = column < value
+        else:
+            step = or_(column > value, column.is_(None)) if nullable else column > value
+        if step is not None:
+            clauses.append(and_(*equal, step))
+        equal.append(column.is_(None) if value is None else column == value)
+    return or_(*clauses) if clauses else false()
+
@@ -0,0 +1,115 @@
+__all__ = ["DataLoader", "Loaders", "get_loaders"]
+
+import asyncio
+from typing import Hashable, Iterable
+
+from fastapi import Depends
+from sqlalchemy import ARRAY, any_, bindparam, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Base, get_read_db
+
+
+class DataLoader:
+    """Batches the lookups of one model by primary key
+
+    Keys requested in one event loop tick are resolved by a single
+    `SELECT ... WHERE id = ANY(:ids)`, the results are kept for the rest of
+    the request, so every row is selected once however often it is needed.
+
+        Args:
+            loaders (Loaders): registry of the request, owns the session
+            model (Base): SQLAlchemy model
+            fields (Iterable[str]): attributes selected, all columns if empty
+    """
+
+    def __init__(self, loaders: "Loaders", model: type[Base], fields: Iterable[str] = ()):
+        self.loaders = loaders
+        self.model = model
+        fields = set(fields)
+        self.columns = [
+            getattr(model, attr.key)
+            for attr in inspect(model).column_attrs
+            if not fields or attr.key in fields
+        ]
+        self.key = inspect(model).primary_key[0]
+        self.batches = 0
+        self._cache: dict[Hashable, asyncio.Future] = {}
+        self._pending: list[Hashable] = []
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        """Future of the row with the primary key, None if it does not exist"""
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if key is None:
+                future.set_result(None)
+                return future
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        return future
+
+    def load_many(self, keys: Iterable[Hashable]) -> asyncio.Future:
+        """Future of the rows in the order of the keys, the keys are queued at once"""
+        return asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        self.loaders.track(asyncio.ensure_future(self._fetch(keys)))
+
+    async def _fetch(self, keys: list[Hashable]) -> None:
+        ids = bindparam("ids", keys, type_=ARRAY(self.key.type))
+        try:
+            async with self.loaders.lock:
+                result = await self.loaders.session_db.execute(
+                    select(*self.columns).where(self.key == any_(ids))
+                )
+            rows = {row[self.key.key]: row for row in result.mappings()}
+        except Exception as e:
+            for key in keys:
+                # следующий запрос ключа повторит выборку
+                self._cache.pop(key).set_exception(e)
+            return
+        self.batches += 1
+        for key in keys:
+            row = rows.get(key)
+            self._cache[key].set_result(dict(row) if row is not None else None)
+
+
+class Loaders:
+    """Data loaders of one request sharing its session
+
+    The session runs one statement at a time, so the batches of different
+    models wait for each other on `lock`.
+
+        Args:
+            session_db (AsyncSession): The SQLAlchemy asynchronous session.
+    """
+
+    def __init__(self, session_db: AsyncSession):
+        self.session_db = session_db
+        self.lock = asyncio.Lock()
+        self._loaders: dict[tuple, DataLoader] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def of(self, model: type[Base], fields: Iterable[str] = ()) -> DataLoader:
+        key = (model, frozenset(fields))
+        loader = self._loaders.get(key)
+        if loader is None:
+            loader = self._loaders[key] = DataLoader(self, model, fields)
+        return loader
+
+    def track(self, task: asyncio.Task) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @property
+    def batches(self) -> int:
+        return sum(loader.batches for loader in self._loaders.values())
+
+
+def get_loaders(session_db: AsyncSession = Depends(get_read_db)) -> Loaders:
+    """FastAPI dependency, one `Loaders` per request on the read session"""
+    return Loaders(session_db)
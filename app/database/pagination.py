@@ -0,0 +1,63 @@
+__all__ = ["InvalidCursorError", "encode_cursor", "decode_cursor"]
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import Column
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded"""
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, column: Column) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Packs the keyset values of the last row into an opaque string
+
+    Args:
+        values (Sequence[Any]): values of the cursor columns of the last row
+
+    Returns:
+        str: url-safe cursor
+    """
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Column]) -> list[Any]:
+    """Unpacks a cursor produced by `encode_cursor`
+
+    Args:
+        cursor (str): opaque cursor from the client
+        columns (Sequence[Column]): cursor columns, used to restore value types
+
+    Raises:
+        InvalidCursorError: the cursor is malformed or does not match the columns
+
+    Returns:
+        list[Any]: keyset values in the order of `columns`
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+        return [_from_json(v, c) for v, c in zip(values, columns)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,126 @@
+__all__ = ["ReplicaRouter", "create_replica_engine", "replicas", "get_read_db"]
+
+import asyncio
+import itertools
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.config import config, setup_log
+from app.core.detector import detector
+from app.core.metrics import instrument_engine
+from app.database.database import A_Session, engine, engine_options, pool_stats
+
+
+log = setup_log(__name__)
+
+
+class ReplicaRouter:
+    """Round-robin over the healthy read replicas
+
+    Every `check_interval` seconds each replica runs `SELECT 1`, a replica
+    that fails is skipped until it answers again. Without a healthy
+    replica reads go to the primary.
+
+        Args:
+            engines (list[AsyncEngine]): engines of the replicas
+            check_interval (float): seconds between health checks
+            timeout (float): seconds a replica has to answer a check
+    """
+
+    def __init__(self, engines: list[AsyncEngine], check_interval: float, timeout: float = 2.0):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.healthy: list[AsyncEngine] = list(engines)
+        self._counter = itertools.count()
+        self._task: asyncio.Task | None = None
+
+    def pick(self) -> AsyncEngine | None:
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def _ping(self, replica: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with replica.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            log.warning(f"Replica {replica.url.host}:{replica.url.port}/{replica.url.database} is unavailable: {e}")
+            return False
+
+    async def check(self) -> list[AsyncEngine]:
+        results = await asyncio.gather(*(self._ping(replica) for replica in self.engines))
+        self.healthy = [replica for replica, ok in zip(self.engines, results) if ok]
+        return self.healthy
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self) -> None:
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.engines:
+            await replica.dispose()
+
+    def serves(self, session_db: AsyncSession) -> bool:
+        """The session reads from a replica, its results may lag behind the primary"""
+        return session_db.bind in self.engines
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "url": replica.url.render_as_string(hide_password=True),
+                "healthy": replica in self.healthy,
+                "pool": pool_stats(replica.pool),
+            }
+            for replica in self.engines
+        ]
+
+
+def create_replica_engine(url: str) -> AsyncEngine:
+    """Engine of a replica, its statements are measured like the ones of the primary"""
+    replica = create_async_engine(url, echo=False, **engine_options(config.db))
+    if config.metrics.enabled:
+        instrument_engine(replica)
+    if detector.enabled:
+        detector.instrument(replica)
+    return replica
+
+
+replicas = ReplicaRouter(
+    [create_replica_engine(url) for url in config.db.replica_urls],
+    check_interval=config.db.replica_check_interval,
+)
+
+
+async def get_read_db(request: Request):
+    """Session for read-only routes, bound to a replica when one is healthy
+
+    A request that already opened a primary session with `get_db` reads
+    through it, so it sees its own writes.
+    """
+    primary = getattr(request.state, "db_session", None)
+    if primary is not None:
+        yield primary
+        return
+    async with A_Session(bind=replicas.pick() or engine) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,170 @@
+__all__ = [
+    "manager_stats_query",
+    "department_stats_query",
+    "manager_stats",
+    "department_stats",
+    "create_view_ddl",
+    "drop_view_ddl",
+    "RollupRefresher",
+    "rollups",
+]
+
+import asyncio
+
+from sqlalchemy import DDL, Select, event, func, select, table, column, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import config, setup_log
+from app.database.database import Base, engine
+from app.models import Company, Contact, User
+
+
+log = setup_log(__name__)
+
+
+def _companies_per_user():
+    return (
+        select(
+            Company.user_id,
+            func.count().label("companies"),
+            func.sum(Company.revenue).label("total_revenue"),
+        )
+        .group_by(Company.user_id)
+        .subquery("companies_per_user")
+    )
+
+
+def _contacts_per_user():
+    return (
+        select(Contact.user_id, func.count().label("contacts"))
+        .group_by(Contact.user_id)
+        .subquery("contacts_per_user")
+    )
+
+
+def _manager_stats_query() -> Select:
+    companies, contacts = _companies_per_user(), _contacts_per_user()
+    return (
+        select(
+            User.id.label("user_id"),
+            User.username,
+            func.coalesce(companies.c.companies, 0).label("companies"),
+            func.coalesce(companies.c.total_revenue, 0).label("total_revenue"),
+            func.coalesce(contacts.c.contacts, 0).label("contacts"),
+        )
+        .outerjoin(companies, companies.c.user_id == User.id)
+        .outerjoin(contacts, contacts.c.user_id == User.id)
+    )
+
+
+manager_stats_query = _manager_stats_query()
+department_stats_query = (
+    select(Contact.department, func.count().label("contacts"))
+    .group_by(Contact.department)
+)
+
+
+def _view(name: str, query: Select):
+    """Table handle of a materialized view with the columns of its query"""
+    return table(name, *(column(c.name, c.type) for c in query.selected_columns))
+
+
+manager_stats = _view("manager_stats", manager_stats_query)
+department_stats = _view("department_stats", department_stats_query)
+
+# view -> (query, unique key for REFRESH CONCURRENTLY, tables it reads)
+VIEWS = {
+    "manager_stats": (manager_stats_query, "user_id", ("users", "companies", "contacts")),
+    "department_stats": (department_stats_query, "department", ("contacts",)),
+}
+
+
+def create_view_ddl(name: str) -> list[str]:
+    """CREATE statements of the materialized view and its unique index"""
+    query, key, _ = VIEWS[name]
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return [
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {sql}",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{name}_{key} ON {name} ({key})",
+    ]
+
+
+def drop_view_ddl(name: str) -> str:
+    return f"DROP MATERIALIZED VIEW IF EXISTS {name}"
+
+
+for _name in VIEWS:
+    for _statement in create_view_ddl(_name):
+        event.listen(Base.metadata, "after_create", DDL(_statement))
+    event.listen(Base.metadata, "before_drop", DDL(drop_view_ddl(_name)))
+
+
+class RollupRefresher:
+    """Debounced refresh of the materialized rollups
+
+    Postgres can not refresh a materialized view incrementally, so writes
+    only mark the views that read the table as stale. `delay` seconds after
+    the first of them the stale views are rebuilt with
+    `REFRESH MATERIALIZED VIEW CONCURRENTLY`, so a burst of writes costs one
+    refresh and readers are never blocked.
+
+        Args:
+            engine (AsyncEngine): engine the views are refreshed with
+            delay (float): seconds to wait for more writes before a refresh
+            enabled (bool): read the views and refresh them on writes
+    """
+
+    def __init__(self, engine: AsyncEngine, delay: float, enabled: bool):
+        self.engine = engine
+        self.delay = delay
+        self.enabled = enabled
+        self.refreshes = 0
+        self._stale: set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, tablename: str) -> None:
+        """Marks the views reading `tablename` as stale"""
+        if not self.enabled:
+            return
+        stale = {name for name, (_, _, tables) in VIEWS.items() if tablename in tables}
+        if not stale:
+            return
+        self._stale |= stale
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def refresh(self, names) -> None:
+        async with self.engine.connect() as connection:
+            for name in names:
+                await connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+            await connection.commit()
+        self.refreshes += 1
+
+    async def _run(self) -> None:
+        while self._stale:
+            await asyncio.sleep(self.delay)
+            names, self._stale = sorted(self._stale), set()
+            try:
+                await self.refresh(names)
+            except Exception as e:
+                log.error(f"Refresh of {', '.join(names)} failed: {e}")
+
+    async def flush(self) -> None:
+        """Waits until the scheduled refresh is done"""
+        if self._task is not None:
+            await self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rollups = RollupRefresher(
+    engine, delay=config.stats.refresh_delay, enabled=config.stats.materialized
+)
@@ -1,6 +1,7 @@
 from .contacts import *
 from .companies import *
 from .users import *
+from .jobs import *
 
 __all__ = [
     "User",
@@ -8,4 +9,5 @@ __all__ = [
     "CompanyComment",
     "Contact",
     "ContactComment",
+    "Job",
 ]
\ No newline at end of file
@@ -2,9 +2,9 @@ __all__ = ["Company", "CompanyComment"]
 
 from typing import Optional
 
-from sqlalchemy import Integer, String, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Computed, Index, Integer, String, ForeignKey, Enum as SQLEnum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import ARRAY, TEXT
+from sqlalchemy.dialects.postgresql import ARRAY, TEXT, TSVECTOR
 
 from app.constants import AreaActivityEnum
 from app.database import Base, BaseComment
@@ -12,22 +12,50 @@ from app.database import Base, BaseComment
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        Index("ix_companies_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_companies_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_companies_inn_trgm", "inn",
+            postgresql_using="gin", postgresql_ops={"inn": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_companies_phone_digits_trgm", text("phone_digits(phone) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+        Index("ix_companies_area_activity", "area_activity", postgresql_using="gin"),
+        Index("ix_companies_created_at_id", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     inn: Mapped[str] = mapped_column(String(12), unique=True, index=True)
     name: Mapped[str] = mapped_column(String(128))
     email: Mapped[list[str]] = mapped_column(ARRAY(TEXT), default=list)
     phone: Mapped[list[str]] = mapped_column(ARRAY(TEXT), default=list)
-    revenue: Mapped[Optional[int]] = mapped_column(Integer, default=None)
+    revenue: Mapped[Optional[int]] = mapped_column(Integer, default=None, index=True)
     area_activity: Mapped[Optional[list[AreaActivityEnum]]] = mapped_column(
         ARRAY(SQLEnum(AreaActivityEnum, name="area_activity_enum")),
         default=None,
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(inn, ''))",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+    # хеш данных последней синхронизации, null после ручного изменения
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), default=None)
     user_id: Mapped[Optional[int]] = mapped_column(
         Integer,
         ForeignKey(
             "users.id",
             ondelete="SET NULL",
         ),
+        index=True,
     )
     user: Mapped["User"] = relationship(
         "User",
@@ -40,7 +68,7 @@ class Company(Base):
     comments: Mapped[list["CompanyComment"]] = relationship(
         "CompanyComment",
         back_populates="company",
-        order_by="desc(CompanyComment.created_at)",
+        order_by="[desc(CompanyComment.created_at), desc(CompanyComment.id)]",
     )
 
 
@@ -57,3 +85,11 @@ class CompanyComment(BaseComment):
         "Company",
         back_populates="comments",
     )
+
+
+Index(
+    "ix_company_comments_company_id_created_at",
+    CompanyComment.company_id,
+    CompanyComment.created_at.desc(),
+    CompanyComment.id.desc(),
+)
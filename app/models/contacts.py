@@ -2,9 +2,9 @@ __all__ = ["Contact", "ContactComment"]
 
 from typing import Optional
 
-from sqlalchemy import Integer, String, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Computed, Index, Integer, String, ForeignKey, Enum as SQLEnum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import ARRAY, TEXT
+from sqlalchemy.dialects.postgresql import ARRAY, TEXT, TSVECTOR
 
 from app.constants import CompanyPostEnum, DepartmentEnum
 from app.database import Base, BaseComment
@@ -12,6 +12,26 @@ from app.database import Base, BaseComment
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_contacts_last_name_trgm", "last_name",
+            postgresql_using="gin", postgresql_ops={"last_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_first_name_trgm", "first_name",
+            postgresql_using="gin", postgresql_ops={"first_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_phone_digits_trgm", text("phone_digits(phone) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+    )
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True)
     first_name: Mapped[str]
@@ -26,12 +46,24 @@ class Contact(Base):
     department: Mapped[Optional[DepartmentEnum]] = mapped_column(
         SQLEnum(DepartmentEnum, name="department_enum"),
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', coalesce(last_name, '') || ' ' || coalesce(first_name, '')"
+            " || ' ' || coalesce(middle_name, '') || ' ' || coalesce(email, ''))",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+    # хеш данных последней синхронизации, null после ручного изменения
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), default=None)
     user_id: Mapped[Optional[int]] = mapped_column(
         Integer,
         ForeignKey(
             "users.id",
             ondelete="SET NULL",
         ),
+        index=True,
     )
     user: Mapped["User"] = relationship(
         "User",
@@ -43,6 +75,7 @@ class Contact(Base):
             "companies.id",
             ondelete="SET NULL",
         ),
+        index=True,
     )
     company: Mapped[Optional["Company"]] = relationship(
         "Company",
@@ -51,7 +84,7 @@ class Contact(Base):
     comments: Mapped[list["ContactComment"]] = relationship(
         "ContactComment",
         back_populates="contact",
-        order_by="desc(ContactComment.created_at)",
+        order_by="[desc(ContactComment.created_at), desc(ContactComment.id)]",
     )
 
 
@@ -68,3 +101,11 @@ class ContactComment(BaseComment):
         "Contact",
         back_populates="comments",
     )
+
+
+Index(
+    "ix_contact_comments_contact_id_created_at",
+    ContactComment.contact_id,
+    ContactComment.created_at.desc(),
+    ContactComment.id.desc(),
+)
@@ -0,0 +1,37 @@
+__all__ = ["Job"]
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Float, Index, Integer, String, Text, Enum as SQLEnum, func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.constants import JobStatusEnum
+from app.database import Base
+
+
+class Job(Base):
+    """Queued background job, see `app.core.jobs.JobRunner`"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # выборка очереди: status = PENDING AND run_after <= now() ORDER BY run_after, id
+        Index("ix_jobs_status_run_after_id", "status", "run_after", "id"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64))
+    status: Mapped[JobStatusEnum] = mapped_column(
+        SQLEnum(JobStatusEnum, name="job_status_enum"),
+        default=JobStatusEnum.PENDING,
+    )
+    payload: Mapped[dict] = mapped_column(JSONB, default=dict)
+    # промежуточные счётчики во время выполнения, затем результат
+    result: Mapped[Optional[dict]] = mapped_column(JSONB)
+    progress: Mapped[float] = mapped_column(Float, default=0.0)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    run_after: Mapped[datetime] = mapped_column(server_default=func.now())
+    locked_by: Mapped[Optional[str]] = mapped_column(String(128))
+    locked_at: Mapped[Optional[datetime]]
+    finished_at: Mapped[Optional[datetime]]
@@ -1,9 +1,21 @@
 from .companies import router as companies_router
 from .contacts import router as contacts_router
 from .users import router as users_router
+from .system import router as system_router
+from .search import router as search_router
+from .stats import router as stats_router
+from .metrics import router as metrics_router
+from .imports import router as imports_router
+from .jobs import router as jobs_router
 
 __all__ = [
     "companies_router",
     "contacts_router",
     "users_router",
+    "system_router",
+    "search_router",
+    "stats_router",
+    "metrics_router",
+    "imports_router",
+    "jobs_router",
 ]
\ No newline at end of file
@@ -1,22 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import Company
-from app.schemas import CompanyFullResponse, CompanyResponse, CompanyCreate, CompanyUpdate
-from app.database.dao import CompanyDAO
+from app.database import get_db, get_read_db
+from app.models import Company, CompanyComment, User
+from app.schemas import BulkCreateResponse, CompanyReassign, JobResponse, SyncResponse, CompanySync, Page, CompanyCommentCreate, CompanyCommentRead, CompanyFullResponse, CompanyResponse, CompanyExpandedResponse, CompanyCreate, CompanyUpdate
+from app.database.dao import CompanyCommentDAO, CompanyDAO
+from app.database.filters import InvalidFilterError, query_filters
+from app.database.loaders import Loaders, get_loaders
+from app.database.pagination import InvalidCursorError
+from app.constants import DEFAULT_PAGE_SIZE, MAX_BULK_SIZE, MAX_PAGE_SIZE, MAX_SYNC_SIZE, ExportFormatEnum
+from app.core.export import export_response
+from app.core.jobs import runner
+from app.core.responses import render
 
 router = APIRouter(prefix="/companies", tags=["companies/"])
 
-@router.get("/", summary="Gets all companies", response_model=list[CompanyResponse])
-async def get_companies(db_session: AsyncSession = Depends(get_db)):
-    return await CompanyDAO.get_all(db_session)
+@router.get(
+    "/",
+    summary="Gets all companies",
+    response_model=Page[CompanyExpandedResponse],
+    response_model_exclude_unset=True,
+)
+async def get_companies(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Optional[str] = Query(
+        None,
+        description="Поля сортировки через запятую, '-' перед полем для убывания: "
+        + ", ".join(CompanyDAO.sort_fields),
+    ),
+    expand: Optional[str] = Query(None, description="Связи через запятую: user"),
+    filters: dict[str, str] = Depends(query_filters),
+    db_session: AsyncSession = Depends(get_read_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    """Filters: `revenue`, `user_id`, `area_activity`, `created_at`,
+    e.g. `?user_id=7&revenue__gt=1000000&sort=-revenue`
+    """
+    try:
+        items, next_cursor = await CompanyDAO.get_page(db_session, limit, cursor, filters, sort)
+        if expand:
+            items = await CompanyDAO.expand(items, expand.split(","), loaders)
+    except (InvalidCursorError, InvalidFilterError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
+
+@router.get("/export", summary="Export all companies as NDJSON or CSV")
+async def export_companies(
+    format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    fields = [c.key for c in CompanyDAO.columns_of(CompanyResponse.model_fields)]
+    return export_response(
+        CompanyDAO.stream_rows(fields, db_session), fields, format, "companies"
+    )
+
 
 @router.get("/{company_id}", summary="Gets detail company's info", response_model=CompanyFullResponse)
-async def get_company_detail(company_id: int, db_session: AsyncSession = Depends(get_db)):
+async def get_company_detail(company_id: int, db_session: AsyncSession = Depends(get_read_db)):
     company = await CompanyDAO.get_details(company_id, db_session)
     if company:
-        return company
+        return render(company)
     raise HTTPException(
         status_code=404,
         detail="Company with ID {company_id} not found"
@@ -41,7 +90,69 @@ async def create_companies(contact_data: CompanyCreate, db: AsyncSession = Depen
                 "detail": result
             }
         )
-    
+
+
+@router.post(
+    "/bulk",
+    summary="Create many companies",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkCreateResponse[CompanyResponse],
+)
+async def create_companies_bulk(
+    data: list[CompanyCreate] = Body(..., max_length=MAX_BULK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await CompanyDAO.bulk_create(data, db)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    created, conflicts = result
+    return {"created": created, "conflicts": conflicts}
+
+
+@router.post(
+    "/sync",
+    summary="Create or update companies by INN",
+    response_model=SyncResponse,
+)
+async def sync_companies(
+    data: list[CompanySync] = Body(..., max_length=MAX_SYNC_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """Rows with a known INN update the record if their data changed since the last sync"""
+    result = await CompanyDAO.sync(data, db)
+    if "error" in result:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    return result
+
+
+@router.post(
+    "/reassign",
+    summary="Move all companies of a user to another user",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+)
+async def reassign_companies(data: CompanyReassign, db: AsyncSession = Depends(get_db)):
+    """Runs in the background in committed chunks, poll `/jobs/{id}` for the progress"""
+    if data.from_user_id == data.to_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Users must be different",
+        )
+    for user_id in (data.from_user_id, data.to_user_id):
+        if await db.get(User, user_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} not found",
+            )
+    return await runner.enqueue(db, "reassign_companies", data.model_dump())
+
+
 @router.delete("/{company_id}", summary="Delete company", status_code=status.HTTP_200_OK)
 async def delete_contact(company_id: int, db: AsyncSession = Depends(get_db)):
     result = await CompanyDAO.delete_record(company_id, db)
@@ -61,9 +172,84 @@ async def delete_contact(company_id: int, db: AsyncSession = Depends(get_db)):
     )
 async def update_contact(contact_id: int, data: CompanyUpdate, db: AsyncSession = Depends(get_db)):
     result = await CompanyDAO.update_record(contact_id, data, db)
-    if result:
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with id {contact_id} not found",
+        )
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    return result
+
+
+@router.get(
+    "/{company_id}/comments",
+    summary="Gets company's comments, the newest first",
+    response_model=Page[CompanyCommentRead],
+)
+async def get_company_comments(
+    company_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы или comments_next_cursor"),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await CompanyCommentDAO.get_page(
+            db_session, limit, cursor, {"company_id": company_id}
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
+
+
+@router.post(
+    "/comments",
+    summary="Create new company comment",
+    status_code=status.HTTP_201_CREATED,
+    response_model=CompanyCommentRead,
+)
+async def create_company_comment(data: CompanyCommentCreate, db: AsyncSession = Depends(get_db)):
+    result = await CompanyCommentDAO.create_new_record(data, db)
+    if isinstance(result, CompanyComment):
         return result
     raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="Error"
-    )
\ No newline at end of file
+        status_code=status.HTTP_409_CONFLICT,
+        detail=result,
+    )
+
+
+@router.post(
+    "/comments/bulk",
+    summary="Create many company comments",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkCreateResponse[CompanyCommentRead],
+)
+async def create_company_comments_bulk(
+    data: list[CompanyCommentCreate] = Body(..., max_length=MAX_BULK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await CompanyCommentDAO.bulk_create(data, db)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    created, conflicts = result
+    return {"created": created, "conflicts": conflicts}
+
+
+@router.delete("/comments/{comment_id}", summary="Delete company comment", status_code=status.HTTP_200_OK)
+async def delete_company_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
+    result = await CompanyCommentDAO.delete_record(comment_id, db)
+    if result:
+        return {"status": "success", "deleted_id": comment_id}
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Comment with id {comment_id} not found",
+    )
@@ -1,24 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
-from app.models import Contact
-from app.schemas import CompanyResponse, ContactCreate, ContactFullResponse, ContactUpdate, UserCreate, UserFullResponse, UserResponse, ContactResponse
-from app.database.dao import ContactDAO
+from app.database import get_db, get_read_db
+from app.models import Contact, ContactComment
+from app.schemas import BulkCreateResponse, SyncResponse, ContactSync, Page, CompanyResponse, ContactCommentCreate, ContactCommentRead, ContactCreate, ContactFullResponse, ContactUpdate, UserCreate, UserFullResponse, UserResponse, ContactResponse, ContactExpandedResponse
+from app.database.dao import ContactCommentDAO, ContactDAO
+from app.database.filters import InvalidFilterError, query_filters
+from app.database.loaders import Loaders, get_loaders
+from app.database.pagination import InvalidCursorError
+from app.constants import DEFAULT_PAGE_SIZE, MAX_BULK_SIZE, MAX_PAGE_SIZE, MAX_SYNC_SIZE, ExportFormatEnum
+from app.core.export import export_response
+from app.core.responses import render
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts/"])
 
-@router.get("/", summary="Gets all contacts", response_model=list[ContactResponse])
-async def get_contacts(db_session: AsyncSession = Depends(get_db)):
-    return await ContactDAO.get_all(db_session)
+@router.get(
+    "/",
+    summary="Gets all contacts",
+    response_model=Page[ContactExpandedResponse],
+    response_model_exclude_unset=True,
+)
+async def get_contacts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Optional[str] = Query(
+        None,
+        description="Поля сортировки через запятую, '-' перед полем для убывания: "
+        + ", ".join(ContactDAO.sort_fields),
+    ),
+    expand: Optional[str] = Query(None, description="Связи через запятую: user, company"),
+    filters: dict[str, str] = Depends(query_filters),
+    db_session: AsyncSession = Depends(get_read_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    """Filters: `user_id`, `company_id`, `post`, `department`, `created_at`,
+    e.g. `?company_id=42&department=Отдел закупок&created_at__gte=2025-01-01`
+    """
+    try:
+        items, next_cursor = await ContactDAO.get_page(db_session, limit, cursor, filters, sort)
+        if expand:
+            items = await ContactDAO.expand(items, expand.split(","), loaders)
+    except (InvalidCursorError, InvalidFilterError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/export", summary="Export all contacts as NDJSON or CSV")
+async def export_contacts(
+    format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    fields = [c.key for c in ContactDAO.columns_of(ContactResponse.model_fields)]
+    return export_response(
+        ContactDAO.stream_rows(fields, db_session), fields, format, "contacts"
+    )
 
 
 @router.get("/{contact_id}", summary="Gets detail contact's info", response_model=ContactFullResponse)
-async def get_contact_detail(contact_id: int, db_session: AsyncSession = Depends(get_db)):
+async def get_contact_detail(contact_id: int, db_session: AsyncSession = Depends(get_read_db)):
     contact = await ContactDAO.get_details(contact_id, db_session)
     if contact:
-        return contact
+        return render(contact)
     raise HTTPException(
         status_code=404,
         detail="Contact with ID {contact_id} not found"
@@ -45,6 +93,45 @@ async def create_contact(contact_data: ContactCreate, db: AsyncSession = Depends
         )
 
 
+@router.post(
+    "/bulk",
+    summary="Create many contacts",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkCreateResponse[ContactResponse],
+)
+async def create_contacts_bulk(
+    data: list[ContactCreate] = Body(..., max_length=MAX_BULK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await ContactDAO.bulk_create(data, db)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    created, conflicts = result
+    return {"created": created, "conflicts": conflicts}
+
+
+@router.post(
+    "/sync",
+    summary="Create or update contacts by email",
+    response_model=SyncResponse,
+)
+async def sync_contacts(
+    data: list[ContactSync] = Body(..., max_length=MAX_SYNC_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """Rows with a known email update the record if their data changed since the last sync"""
+    result = await ContactDAO.sync(data, db)
+    if "error" in result:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    return result
+
+
 @router.patch(
         "/{contact_id}", 
         summary="Update contact", 
@@ -53,12 +140,17 @@ async def create_contact(contact_data: ContactCreate, db: AsyncSession = Depends
     )
 async def update_contact(contact_id: int, data: ContactUpdate, db: AsyncSession = Depends(get_db)):
     result = await ContactDAO.update_record(contact_id, data, db)
-    if result:
-        return result
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="Error"
-    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Contact with id {contact_id} not found",
+        )
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    return result
 
 
 @router.delete("/{contact_id}", summary="Delete contact", status_code=status.HTTP_200_OK)
@@ -69,11 +161,81 @@ async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Contact with id {contact_id} not found",
-    ) 
+    )
+
+
+@router.get(
+    "/{contact_id}/comments",
+    summary="Gets contact's comments, the newest first",
+    response_model=Page[ContactCommentRead],
+)
+async def get_contact_comments(
+    contact_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы или comments_next_cursor"),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await ContactCommentDAO.get_page(
+            db_session, limit, cursor, {"contact_id": contact_id}
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
+
+
+@router.post(
+    "/comments",
+    summary="Create new contact comment",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ContactCommentRead,
+)
+async def create_contact_comment(data: ContactCommentCreate, db: AsyncSession = Depends(get_db)):
+    result = await ContactCommentDAO.create_new_record(data, db)
+    if isinstance(result, ContactComment):
+        return result
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=result,
+    )
+
+
+@router.post(
+    "/comments/bulk",
+    summary="Create many contact comments",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkCreateResponse[ContactCommentRead],
+)
+async def create_contact_comments_bulk(
+    data: list[ContactCommentCreate] = Body(..., max_length=MAX_BULK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await ContactCommentDAO.bulk_create(data, db)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    created, conflicts = result
+    return {"created": created, "conflicts": conflicts}
+
+
+@router.delete("/comments/{comment_id}", summary="Delete contact comment", status_code=status.HTTP_200_OK)
+async def delete_contact_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
+    result = await ContactCommentDAO.delete_record(comment_id, db)
+    if result:
+        return {"status": "success", "deleted_id": comment_id}
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Comment with id {comment_id} not found",
+    )
 
 
 # @router.get("/{contact_id}/user", summary="Gets contact's user", response_model=UserFullResponse)
-# async def get_contact_user(contact_id: int, db_session: AsyncSession = Depends(get_db)):
+# async def get_contact_user(contact_id: int, db_session: AsyncSession = Depends(get_read_db)):
 #     user =  await ContactDAO.get_user(contact_id, db_session)
 #     if user:
 #         return user
@@ -84,7 +246,7 @@ async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
 
 
 # @router.get("/{contact_id}/company", summary="Gets contact's user", response_model=CompanyRead)
-# async def get_contact_company(contact_id: int, db_session: AsyncSession = Depends(get_db)):
+# async def get_contact_company(contact_id: int, db_session: AsyncSession = Depends(get_read_db)):
 #     company =  await ContactDAO.get_company(contact_id, db_session)
 #     if company:
 #         return company
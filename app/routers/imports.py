@@ -0,0 +1,41 @@
+import os
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import ImportKindEnum
+from app.core.imports import importer
+from app.database import get_db
+from app.schemas import JobResponse
+
+
+router = APIRouter(prefix="/imports", tags=["imports/"])
+
+
+@router.post(
+    "/{kind}",
+    summary="Import contacts or companies from CSV",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+)
+async def create_import(
+    kind: ImportKindEnum,
+    file: UploadFile = File(..., description="CSV в UTF-8 с заголовком"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Columns are the fields of the create schema, lists are separated by `;`
+    as in the CSV export. Poll `/jobs/{id}` for the progress.
+    """
+    return await importer.submit(db, kind, file)
+
+
+@router.get("/{job_id}/rejects", summary="Rejected rows of the import as CSV")
+async def get_import_rejects(job_id: int):
+    path = importer.rejects_path(job_id)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Import {job_id} has no rejects yet",
+        )
+    return FileResponse(path, media_type="text/csv; charset=utf-8", filename=f"{job_id}.rejects.csv")
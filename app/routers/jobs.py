@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models import Job
+from app.schemas import JobResponse
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs/"])
+
+
+@router.get("/{job_id}", summary="Status and progress of a background job", response_model=JobResponse)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    # the primary, a replica may lag behind the progress of the job
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {job_id} not found",
+        )
+    return job
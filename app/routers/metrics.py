@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+
+
+router = APIRouter(tags=["system/"])
+
+
+@router.get("/metrics", summary="Metrics in the Prometheus text format", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type=registry.content_type)
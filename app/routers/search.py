@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db
+from app.schemas import Page, SearchResult
+from app.database.dao import SearchDAO
+from app.database.pagination import InvalidCursorError
+from app.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.responses import render
+
+
+router = APIRouter(prefix="/search", tags=["search/"])
+
+
+@router.get("", summary="Search companies and contacts", response_model=Page[SearchResult])
+async def search(
+    q: str = Query(..., min_length=2, max_length=100, description="Часть названия, ИНН, ФИО, email или телефона"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await SearchDAO.search(q, db_session, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
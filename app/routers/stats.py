@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_read_db
+from app.schemas import DepartmentStats, JobResponse, ManagerStats
+from app.database.dao import StatsDAO
+from app.core.jobs import runner
+from app.core.responses import render
+
+
+router = APIRouter(prefix="/stats", tags=["stats/"])
+
+
+@router.get("/managers", summary="Companies, revenue and contacts per manager", response_model=list[ManagerStats])
+async def get_manager_stats(db_session: AsyncSession = Depends(get_read_db)):
+    return render(await StatsDAO.managers(db_session))
+
+
+@router.get("/departments", summary="Contacts per department", response_model=list[DepartmentStats])
+async def get_department_stats(db_session: AsyncSession = Depends(get_read_db)):
+    return render(await StatsDAO.departments(db_session))
+
+
+@router.post(
+    "/refresh",
+    summary="Rebuild the materialized rollups",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+)
+async def refresh_stats(db_session: AsyncSession = Depends(get_db)):
+    """For a refresh after bulk loads, writes through the API schedule their own"""
+    return await runner.enqueue(db_session, "refresh_stats")
@@ -0,0 +1,31 @@
+import time
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.database import get_db, pool_stats, replicas
+
+
+router = APIRouter(prefix="/system", tags=["system/"])
+
+
+@router.get("/cache", summary="Gets read cache statistics")
+async def get_cache_stats():
+    return cache.stats()
+
+
+@router.get("/health", summary="Checks the database and gets connection pool statistics")
+async def get_health(session_db: AsyncSession = Depends(get_db)):
+    start = time.perf_counter()
+    try:
+        await session_db.execute(text("SELECT 1"))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database is unavailable: {e}")
+    return {
+        "status": "ok",
+        "database_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": pool_stats(session_db.get_bind().engine.pool),
+        "replicas": replicas.stats(),
+    }
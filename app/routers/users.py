@@ -1,25 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
+from app.database import get_db, get_read_db
 from app.models import User
-from app.schemas import UserCreate, UserFullResponse, UserResponse, UserUpdate
+from app.schemas import BulkCreateResponse, CompanyResponse, ContactResponse, Page, UserCreate, UserFullResponse, UserResponse, UserUpdate
 from app.database.dao import UserDAO
+from app.database.filters import InvalidFilterError, query_filters
+from app.database.pagination import InvalidCursorError
+from app.constants import DEFAULT_PAGE_SIZE, MAX_BULK_SIZE, MAX_PAGE_SIZE, ExportFormatEnum
+from app.core.export import export_response
+from app.core.responses import render
 
 
 router = APIRouter(prefix="/users", tags=["users/"])
 
 
-@router.get("/", summary="Gets all users", response_model=list[UserResponse])
-async def get_users(db_session: AsyncSession = Depends(get_db)):
-    return await UserDAO.get_all(db_session)
+@router.get("/", summary="Gets all users", response_model=Page[UserResponse])
+async def get_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Optional[str] = Query(
+        None,
+        description="Поля сортировки через запятую, '-' перед полем для убывания: "
+        + ", ".join(UserDAO.sort_fields),
+    ),
+    filters: dict[str, str] = Depends(query_filters),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    """Filters: `post`, `created_at`, e.g. `?post=Руководитель отдела продаж`"""
+    try:
+        items, next_cursor = await UserDAO.get_page(db_session, limit, cursor, filters, sort)
+    except (InvalidCursorError, InvalidFilterError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/export", summary="Export all users as NDJSON or CSV")
+async def export_users(
+    format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    fields = [c.key for c in UserDAO.columns_of(UserResponse.model_fields)]
+    return export_response(
+        UserDAO.stream_rows(fields, db_session), fields, format, "users"
+    )
 
 
 @router.get("/{user_id}", summary="Gets detail user's info", response_model=UserFullResponse)
-async def get_user_info(user_id: int, db_session: AsyncSession = Depends(get_db)):
+async def get_user_info(user_id: int, db_session: AsyncSession = Depends(get_read_db)):
     user = await UserDAO.get_details(user_id, db_session)
     if user:
-        return user
+        return render(user)
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"User with ID {user_id} not found"
@@ -43,6 +79,26 @@ async def create_users(user_data: UserCreate, db: AsyncSession = Depends(get_db)
         )
 
 
+@router.post(
+    "/bulk",
+    summary="Create many users",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkCreateResponse[UserResponse],
+)
+async def create_users_bulk(
+    data: list[UserCreate] = Body(..., max_length=MAX_BULK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await UserDAO.bulk_create(data, db)
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    created, conflicts = result
+    return {"created": created, "conflicts": conflicts}
+
+
 @router.patch(
     "/{user_id}",
     summary="Update user",
@@ -51,12 +107,17 @@ async def create_users(user_data: UserCreate, db: AsyncSession = Depends(get_db)
 )
 async def update_user(user_id: int, data: UserUpdate, db: AsyncSession = Depends(get_db)):
     result = await UserDAO.update_record(user_id, data, db)
-    if result:
-        return result
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="Error"
-    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found",
+        )
+    if isinstance(result, dict):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=result,
+        )
+    return result
 
 
 @router.delete("/{user_id}", summary="Delete user", status_code=status.HTTP_200_OK)
@@ -70,11 +131,52 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
-# @router.get("/{user_id}/companies", summary="Gets all user's companies", response_model=list[CompanyRead])
-# async def get_users_companies(user_id: int, db_session: AsyncSession = Depends(get_db)):
-#     return await UserDAO.get_companies(user_id, db_session)
+
+@router.get(
+    "/{user_id}/companies",
+    summary="Gets user's companies",
+    response_model=Page[CompanyResponse],
+)
+async def get_users_companies(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Optional[str] = Query(None, description="Поля сортировки через запятую, '-' для убывания"),
+    filters: dict[str, str] = Depends(query_filters),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await UserDAO.get_companies(
+            user_id, db_session, limit, cursor, filters, sort
+        )
+    except (InvalidCursorError, InvalidFilterError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
 
 
-# @router.get("/{user_id}/contacts", summary="Gets all user's contacts", response_model=list[ContactFullResponse])
-# async def get_users_contacts(user_id: int, db_session: AsyncSession = Depends(get_db)):
-#     return await UserDAO.get_contacts(user_id, db_session)
+@router.get(
+    "/{user_id}/contacts",
+    summary="Gets user's contacts",
+    response_model=Page[ContactResponse],
+)
+async def get_users_contacts(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Optional[str] = Query(None, description="Поля сортировки через запятую, '-' для убывания"),
+    filters: dict[str, str] = Depends(query_filters),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        items, next_cursor = await UserDAO.get_contacts(
+            user_id, db_session, limit, cursor, filters, sort
+        )
+    except (InvalidCursorError, InvalidFilterError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    return render({"items": items, "next_cursor": next_cursor})
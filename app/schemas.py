@@ -2,6 +2,7 @@ __all__ = [
     "CompanyCreate",
     "CompanyUpdate",
     "CompanyResponse",
+    "CompanyExpandedResponse",
     "CompanyCommentCreate",
     "CompanyCommentUpdate",
     "CompanyCommentRead",
@@ -10,22 +11,113 @@ __all__ = [
     "ContactCreate",
     "ContactUpdate",
     "ContactFullResponse",
+    "ContactExpandedResponse",
     "ContactCommentCreate",
     "ContactCommentUpdate",
     "ContactCommentRead",
+    "Page",
+    "BulkConflict",
+    "BulkCreateResponse",
+    "SyncResponse",
+    "JobResponse",
+    "CompanyReassign",
+    "CompanySync",
+    "ContactSync",
+    "SearchResult",
+    "ManagerStats",
+    "DepartmentStats",
 ]
 
 from datetime import datetime
-from typing import List, Optional, ForwardRef
+from typing import Generic, List, Optional, ForwardRef, TypeVar
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
-from app.constants import AreaActivityEnum, CompanyPostEnum, DepartmentEnum, GenderEnum, UserPostEnum
+from app.constants import (
+    AreaActivityEnum,
+    CompanyPostEnum,
+    DepartmentEnum,
+    GenderEnum,
+    JobStatusEnum,
+    UserPostEnum,
+)
 
 
 CompanyCommentRead = ForwardRef("CompanyCommentRead")
 CompanyResponse = ForwardRef("CompanyRead")
 ContactCommentRead = ForwardRef("ContactCommentRead")
 
+ItemT = TypeVar("ItemT")
+
+
+class Page(BaseModel, Generic[ItemT]):
+    """One page of a keyset paginated list"""
+    items: List[ItemT] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы, null на последней")
+
+
+class BulkConflict(BaseModel):
+    """Row of a bulk request rejected by a unique constraint"""
+    index: int = Field(..., ge=0, description="Номер строки в запросе")
+    error: str = "duplicate_key"
+    detail: str
+
+
+class BulkCreateResponse(BaseModel, Generic[ItemT]):
+    created: List[ItemT] = Field(default_factory=list)
+    conflicts: List[BulkConflict] = Field(default_factory=list)
+
+
+class SyncResponse(BaseModel):
+    """Result of an upsert of the records keyed by INN or email"""
+    created: int = Field(0, description="Новые записи")
+    updated: int = Field(0, description="Записи с изменёнными данными")
+    unchanged: int = Field(0, description="Записи, данные которых не изменились")
+    duplicates: int = Field(
+        0, description="Повторы ключа в запросе, применена последняя строка")
+
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str = Field(..., description="Тип задачи", example="import")
+    status: JobStatusEnum
+    progress: float = Field(..., ge=0, le=1, description="Доля выполненной работы")
+    result: Optional[dict] = Field(None, description="Счётчики задачи, итог после завершения")
+    attempts: int = Field(..., description="Сделано попыток")
+    max_attempts: int
+    error: Optional[str] = Field(None, description="Ошибка последней попытки")
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class CompanyReassign(BaseModel):
+    from_user_id: int = Field(..., gt=0, description="Текущий ответственный")
+    to_user_id: int = Field(..., gt=0, description="Новый ответственный")
+
+
+class SearchResult(BaseModel):
+    kind: str = Field(..., description="company или contact", example="company")
+    id: int
+    title: str = Field(..., description="Название компании или ФИО контакта")
+    subtitle: Optional[str] = Field(None, description="ИНН компании или email контакта")
+    rank: float
+
+
+class ManagerStats(BaseModel):
+    user_id: int
+    username: str
+    companies: int = Field(..., description="Количество компаний")
+    total_revenue: int = Field(..., description="Суммарная выручка компаний")
+    contacts: int = Field(..., description="Количество контактов")
+
+
+class DepartmentStats(BaseModel):
+    department: Optional[DepartmentEnum] = Field(None, description="Подразделение, null если не указано")
+    contacts: int = Field(..., description="Количество контактов")
+
 
 class ContactBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -101,6 +193,17 @@ class ContactCreate(ContactBase):
     pass
 
 
+class ContactSync(ContactBase):
+    """Contact of the sync, identified by its email"""
+    email: EmailStr = Field(
+        ...,
+        min_length=3,
+        max_length=24,
+        description="Электронная почта, ключ синхронизации",
+        json_schema_extra={"example": "test@example.com"},
+    )
+
+
 class ContactUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -139,7 +242,17 @@ class ContactFullResponse(ContactResponse):
     company: Optional["CompanyResponse"] = Field(
         None, description="Компания контакта")
     comments: List["ContactCommentRead"] = Field(
-        default_factory=list, description="Комментарии к контакту")
+        default_factory=list, description="Последние комментарии к контакту")
+    comments_next_cursor: Optional[str] = Field(
+        None, description="Курсор следующих комментариев, null если загружены все")
+
+
+class ContactExpandedResponse(ContactResponse):
+    """List item, relations are present only if requested by `expand`"""
+    user: Optional["UserResponse"] = Field(
+        None, description="Ответственный пользователь, expand=user")
+    company: Optional["CompanyResponse"] = Field(
+        None, description="Компания контакта, expand=company")
 
 
 class BaseContactComment(BaseModel):
@@ -163,6 +276,7 @@ class ContactCommentUpdate(BaseContactComment):
 
 class ContactCommentRead(BaseContactComment):
     id: int = Field(..., gt=0, description="ID комментария")
+    contact_id: int = Field(..., gt=0, description="ID контакта")
     created_at: datetime = Field(..., description="Дата создания")
     updated_at: datetime = Field(..., description="Дата последнего обнволения")
 
@@ -206,6 +320,10 @@ class UserFullResponse(UserResponse):
     """Response full schema with relations"""
     contacts: List["ContactResponse"] = Field(default_factory=list)
     companies: List["CompanyResponse"] = Field(default_factory=list)
+    companies_next_cursor: Optional[str] = Field(
+        None, description="Курсор /api/users/{id}/companies для следующих компаний, null если загружены все")
+    contacts_next_cursor: Optional[str] = Field(
+        None, description="Курсор /api/users/{id}/contacts для следующих контактов, null если загружены все")
 
 
 class CompanyBase(BaseModel):
@@ -225,6 +343,11 @@ class CompanyCreate(CompanyBase):
     pass
 
 
+class CompanySync(CompanyBase):
+    """Company of the sync, identified by its INN"""
+    pass
+
+
 class CompanyUpdate(BaseModel):
     inn: Optional[str] = Field(
         None,
@@ -258,14 +381,21 @@ class CompanyResponse(CompanyBase):
     updated_at: datetime
 
 
+class CompanyExpandedResponse(CompanyResponse):
+    """List item, relations are present only if requested by `expand`"""
+    user: Optional["UserResponse"] = Field(
+        None, description="Ответственный пользователь, expand=user")
+
+
 class CompanyFullResponse(CompanyResponse):
     user: Optional["UserResponse"] = None
     comments: List["CompanyCommentRead"] = Field(default_factory=list)
+    comments_next_cursor: Optional[str] = None
 
 
 class CompanyCommentCreate(BaseModel):
-    text: str
-    contact_id: int
+    text: str = Field(..., min_length=1, max_length=256, description="Текст комментария")
+    company_id: int = Field(..., gt=0, description="ID компании")
 
 
 class CompanyCommentUpdate(BaseModel):
@@ -276,7 +406,6 @@ class CompanyCommentRead(BaseModel):
     id: int
     text: str
     company_id: int
-    company: Optional["CompanyResponse"] = None
     created_at: datetime
     updated_at: datetime
 
@@ -0,0 +1,219 @@
+"""Throughput and latency of every router under concurrent clients.
+
+Runs the ASGI app in-process against the database from `.env`, seeded
+with `python -m benchmarks.seed`. Every scenario is driven by `--clients`
+concurrent clients for `--duration` seconds. Writes JSON with the
+requests per second and the p50/p95/p99 latency of every scenario, and
+with `--baseline` fails when a scenario regressed by more than
+`--threshold` percent, see `benchmarks.compare`.
+
+    python -m benchmarks.seed --scale 100k --reset
+    python -m benchmarks.bench_api --duration 10 --clients 20 --output after.json
+    python -m benchmarks.bench_api --baseline before.json --threshold 15
+
+Set CACHE_MAXSIZE=0 to measure the database instead of the read cache.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+
+from main import app
+from app.config import config
+from app.database.database import engine
+from app.models import Company, Contact, User
+from benchmarks.compare import compare, print_comparison
+from benchmarks.seed import LAST_NAMES, WORDS
+
+
+@dataclass
+class Scenario:
+    name: str
+    # (rng, max ids per table) -> (method, url, json body)
+    request: Callable[[random.Random, dict[str, int]], tuple[str, str, dict | None]]
+    heavy: bool = False
+
+
+def get(url: Callable[[random.Random, dict[str, int]], str]):
+    return lambda rng, ids: ("GET", url(rng, ids), None)
+
+
+SCENARIOS = [
+    Scenario("users.list", get(lambda rng, ids: "/api/users/?limit=50")),
+    Scenario("users.detail", get(lambda rng, ids: f"/api/users/{rng.randint(1, ids['users'])}")),
+    Scenario("users.companies", get(lambda rng, ids: f"/api/users/{rng.randint(1, ids['users'])}/companies")),
+    Scenario("users.contacts", get(lambda rng, ids: f"/api/users/{rng.randint(1, ids['users'])}/contacts")),
+    Scenario("users.export", get(lambda rng, ids: "/api/users/export"), heavy=True),
+    Scenario("contacts.list", get(lambda rng, ids: "/api/contacts/?limit=50")),
+    Scenario("contacts.list_filtered", get(lambda rng, ids: "/api/contacts/?department=Бухгалтерия&sort=-created_at")),
+    Scenario("contacts.list_expanded", get(lambda rng, ids: "/api/contacts/?limit=50&expand=user,company")),
+    Scenario("contacts.detail", get(lambda rng, ids: f"/api/contacts/{rng.randint(1, ids['contacts'])}")),
+    Scenario("contacts.comments", get(lambda rng, ids: f"/api/contacts/{rng.randint(1, ids['contacts'])}/comments")),
+    Scenario("contacts.export", get(lambda rng, ids: "/api/contacts/export"), heavy=True),
+    Scenario("companies.list", get(lambda rng, ids: "/api/companies/?limit=50")),
+    Scenario("companies.list_sorted", get(lambda rng, ids: "/api/companies/?sort=-revenue&revenue__gt=1000000")),
+    Scenario("companies.list_expanded", get(lambda rng, ids: "/api/companies/?limit=50&expand=user")),
+    Scenario("companies.detail", get(lambda rng, ids: f"/api/companies/{rng.randint(1, ids['companies'])}")),
+    Scenario("companies.comments", get(lambda rng, ids: f"/api/companies/{rng.randint(1, ids['companies'])}/comments")),
+    Scenario("companies.export", get(lambda rng, ids: "/api/companies/export"), heavy=True),
+    Scenario("search", get(lambda rng, ids: f"/api/search?q={rng.choice(LAST_NAMES + WORDS)}")),
+    Scenario("stats.managers", get(lambda rng, ids: "/api/stats/managers")),
+    Scenario("stats.departments", get(lambda rng, ids: "/api/stats/departments")),
+    Scenario("system.health", get(lambda rng, ids: "/api/system/health")),
+    Scenario("system.cache", get(lambda rng, ids: "/api/system/cache")),
+    Scenario("metrics", get(lambda rng, ids: "/metrics")),
+    Scenario("contacts.comment_create", lambda rng, ids: (
+        "POST", "/api/contacts/comments",
+        {"text": "Перезвонить", "contact_id": rng.randint(1, ids["contacts"])},
+    )),
+    Scenario("companies.comment_create", lambda rng, ids: (
+        "POST", "/api/companies/comments",
+        {"text": "Отправили КП", "company_id": rng.randint(1, ids["companies"])},
+    )),
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def table_sizes() -> dict[str, int]:
+    async with engine.connect() as connection:
+        sizes = {
+            model.__tablename__: await connection.scalar(select(func.max(model.id))) or 0
+            for model in (User, Company, Contact)
+        }
+    if not all(sizes.values()):
+        raise SystemExit("The database is empty, run python -m benchmarks.seed first")
+    return sizes
+
+
+async def client_loop(
+    client: AsyncClient,
+    scenario: Scenario,
+    ids: dict[str, int],
+    rng: random.Random,
+    stop: asyncio.Event,
+    latencies: list[float],
+    errors: list[int],
+):
+    while not stop.is_set():
+        method, url, body = scenario.request(rng, ids)
+        started = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+        # routes without I/O never suspend in-process, let the timer stop the run
+        await asyncio.sleep(0)
+
+
+async def run_scenario(
+    client: AsyncClient, scenario: Scenario, ids: dict[str, int], duration: float, clients: int, seed: int
+) -> dict:
+    # warm up the route, the pool and the cache
+    method, url, body = scenario.request(random.Random(seed), ids)
+    await client.request(method, url, json=body)
+
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    errors: list[int] = []
+    tasks = [
+        asyncio.create_task(client_loop(client, scenario, ids, random.Random(seed + i), stop, latencies, errors))
+        for i in range(clients)
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+async def main(args) -> int:
+    scenarios = [
+        s for s in SCENARIOS
+        if (args.heavy or not s.heavy) and (not args.only or any(s.name.startswith(p) for p in args.only))
+    ]
+    ids = await table_sizes()
+    results = {}
+    print(f"{'scenario':<28}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    async with app.router.lifespan_context(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for scenario in scenarios:
+                result = await run_scenario(client, scenario, ids, args.duration, args.clients, args.seed)
+                results[scenario.name] = result
+                print(
+                    f"{scenario.name:<28}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+                    f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                )
+    await engine.dispose()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "rows": ids,
+            "clients": args.clients,
+            "duration": args.duration,
+            "cache_maxsize": config.cache.maxsize,
+            "fast_serialization": config.api.fast_serialization,
+        },
+        "scenarios": results,
+    }
+    output = args.output or f"bench-{report['meta']['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows)
+        return 1 if any(row["regressed"] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="scenario name prefixes, e.g. contacts search")
+    parser.add_argument("--heavy", action="store_true", help="include the exports of whole tables")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON report, bench-<commit>.json by default")
+    parser.add_argument("--baseline", help="JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
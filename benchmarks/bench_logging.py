@@ -0,0 +1,101 @@
+"""Event loop blocking caused by logging under load.
+
+Coroutines log as fast as they can while a probe measures how late
+`asyncio.sleep` wakes up. Compares the handlers attached directly to the
+logger (the old `setup_log`) with the `QueueHandler` and the listener thread.
+Records go to a rotating file in a temporary directory and to /dev/null.
+
+    python -m benchmarks.bench_logging --duration 5 --loggers 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+
+from app.config.logger import TEXT_FORMAT
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def handlers(directory: str) -> list[logging.Handler]:
+    formatter = logging.Formatter(TEXT_FORMAT)
+    file_handler = RotatingFileHandler(
+        os.path.join(directory, "bench.log"), maxBytes=1_000_000, backupCount=5, encoding="utf-8"
+    )
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+async def probe(stop: asyncio.Event, lags: list[float], interval: float = 0.001):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def spam(logger: logging.Logger, stop: asyncio.Event, counter: list[int]):
+    while not stop.is_set():
+        for i in range(10):
+            logger.debug("Updating Company id=%s with values: %s", i, {"name": "ООО Рога и Копыта"})
+        counter[0] += 10
+        await asyncio.sleep(0)
+
+
+async def run_mode(queued: bool, duration: float, loggers: int) -> tuple[list[float], int]:
+    logger = logging.getLogger(f"bench.{'queue' if queued else 'direct'}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    with tempfile.TemporaryDirectory() as directory:
+        targets = handlers(directory)
+        listener = None
+        if queued:
+            records = SimpleQueue()
+            logger.addHandler(QueueHandler(records))
+            listener = QueueListener(records, *targets)
+            listener.start()
+        else:
+            for handler in targets:
+                logger.addHandler(handler)
+
+        stop = asyncio.Event()
+        lags, counter = [], [0]
+        tasks = [asyncio.create_task(probe(stop, lags))]
+        tasks += [asyncio.create_task(spam(logger, stop, counter)) for _ in range(loggers)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+        if listener:
+            listener.stop()
+        for handler in logger.handlers + targets:
+            handler.close()
+        logger.handlers.clear()
+    return lags, counter[0]
+
+
+async def main(duration: float, loggers: int):
+    print(f"{'mode':<16}{'records':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for name, queued in (("direct handlers", False), ("queue handler", True)):
+        lags, records = await run_mode(queued, duration, loggers)
+        print(
+            f"{name:<16}{records:>10}{statistics.median(lags):>12.2f}"
+            f"{percentile(lags, 0.99):>12.2f}{max(lags):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--loggers", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.duration, args.loggers))
@@ -0,0 +1,78 @@
+"""Latency of concurrent GET requests while passwords are being hashed.
+
+Runs the ASGI app in-process against the database from `.env` and
+compares three modes: no hashing, hashing on the event loop (the old
+`UserDAO.create_new_record` behaviour) and hashing in `hash_executor`.
+
+    python -m benchmarks.bench_password_hashing --duration 5 --clients 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core.security import get_password_hash, get_password_hash_async
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def hash_blocking(stop: asyncio.Event):
+    while not stop.is_set():
+        get_password_hash("benchmark-password")
+        await asyncio.sleep(0)
+
+
+async def hash_in_executor(stop: asyncio.Event):
+    while not stop.is_set():
+        await get_password_hash_async("benchmark-password")
+
+
+async def get_client(client: AsyncClient, stop: asyncio.Event, latencies: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/users/", params={"limit": 10})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run_mode(hasher, duration: float, clients: int, hashers: int) -> list[float]:
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        tasks = [asyncio.create_task(get_client(client, stop, latencies)) for _ in range(clients)]
+        if hasher:
+            tasks += [asyncio.create_task(hasher(stop)) for _ in range(hashers)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return latencies
+
+
+async def main(duration: float, clients: int, hashers: int):
+    modes = {
+        "no hashing": None,
+        "hashing on event loop": hash_blocking,
+        "hashing in executor": hash_in_executor,
+    }
+    print(f"{'mode':<24}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, hasher in modes.items():
+        latencies = await run_mode(hasher, duration, clients, hashers)
+        print(
+            f"{name:<24}{len(latencies):>10}"
+            f"{statistics.median(latencies):>10.1f}{percentile(latencies, 0.99):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--hashers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.duration, args.clients, args.hashers))
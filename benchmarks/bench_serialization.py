@@ -0,0 +1,93 @@
+"""Rendering cost of a contacts list page: current path vs fast serialization.
+
+No database is needed, rows are generated in memory. Compares
+- ORM instances validated by `response_model=Page[ContactResponse]`
+  and written by JSONResponse (the path before API_FAST_SERIALIZATION)
+- schema dumps validated by `response_model` (the cached default path)
+- plain row dicts written by ORJSONResponse (API_FAST_SERIALIZATION=true)
+
+    python -m benchmarks.bench_serialization --rows 200 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from httpx import AsyncClient, ASGITransport
+
+from app.constants import CompanyPostEnum, DepartmentEnum
+from app.models import Contact
+from app.schemas import ContactResponse, Page
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now()
+    return [
+        {
+            "id": i,
+            "first_name": f"Иван{i}",
+            "middle_name": "Сергеевич",
+            "last_name": "Сергеев",
+            "email": f"contact{i}@example.com",
+            "phone": ["+79991234567", "89007564312"],
+            "post": CompanyPostEnum.DIRECTOR,
+            "department": DepartmentEnum.PURCHASE,
+            "user_id": 1,
+            "company_id": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def make_app(rows: list[dict]) -> FastAPI:
+    orm_rows = [Contact(**row) for row in rows]
+    dumped_rows = [ContactResponse.model_validate(row).model_dump(mode="json") for row in rows]
+    app = FastAPI()
+
+    @app.get("/orm", response_model=Page[ContactResponse])
+    async def orm_page():
+        return {"items": orm_rows, "next_cursor": None}
+
+    @app.get("/dumped", response_model=Page[ContactResponse])
+    async def dumped_page():
+        return {"items": dumped_rows, "next_cursor": None}
+
+    @app.get("/fast")
+    async def fast_page():
+        return ORJSONResponse({"items": rows, "next_cursor": None})
+
+    return app
+
+
+async def measure(client: AsyncClient, path: str, requests: int) -> list[float]:
+    await client.get(path)
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(rows: int, requests: int):
+    app = make_app(make_rows(rows))
+    print(f"{'path':<10}{'mean ms':>10}{'p99 ms':>10}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for path in ("/orm", "/dumped", "/fast"):
+            timings = sorted(await measure(client, path, requests))
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"{path:<10}{statistics.mean(timings):>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests))
@@ -0,0 +1,71 @@
+"""Regression gate for two reports of `benchmarks.bench_api`.
+
+A scenario regressed when its p95 latency grew or its throughput dropped
+by more than the threshold. Latencies below `--min-ms` are noise and never
+count as regressions. Exits with 1 if any scenario regressed.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def _change(old: float, new: float) -> float:
+    """Change in percent, positive when the value grew"""
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0, min_ms: float = 1.0) -> list[dict]:
+    """Scenarios present in both reports with their changes
+
+    Args:
+        baseline (dict): report of the reference commit
+        current (dict): report of the commit under test
+        threshold (float): allowed regression in percent
+        min_ms (float): p95 below which latency changes are ignored
+
+    Returns:
+        list[dict]: scenario, rps and p95 changes in percent, regressed flag
+    """
+    rows = []
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        rps_change = _change(old["rps"], new["rps"])
+        p95_change = _change(old["p95_ms"], new["p95_ms"])
+        slower = p95_change > threshold and new["p95_ms"] >= min_ms
+        rows.append({
+            "scenario": name,
+            "rps_change": round(rps_change, 1),
+            "p95_change": round(p95_change, 1),
+            "new_errors": new["errors"] > old["errors"],
+            "regressed": slower or rps_change < -threshold or new["errors"] > old["errors"],
+        })
+    return rows
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(f"{'scenario':<28}{'rps %':>10}{'p95 %':>10}  status")
+    for row in rows:
+        status = "REGRESSED" if row["regressed"] else "ok"
+        if row["new_errors"]:
+            status += " (errors)"
+        print(f"{row['scenario']:<28}{row['rps_change']:>+10.1f}{row['p95_change']:>+10.1f}  {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="p95 below which latency is noise")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.min_ms)
+    print_comparison(rows)
+    sys.exit(1 if any(row["regressed"] for row in rows) else 0)
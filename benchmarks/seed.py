@@ -0,0 +1,187 @@
+"""Synthetic CRM data for the benchmarks.
+
+Fills the database from `.env` with users, companies, contacts and their
+comments. The scale is the number of contacts, the other tables are
+derived from it. Rows are generated from a fixed seed, so two runs at the
+same scale produce the same data.
+
+    python -m benchmarks.seed --scale 100k --reset
+    python -m benchmarks.seed --scale 10k --create   # empty database, no alembic
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import CompanyPostEnum, DepartmentEnum, GenderEnum, UserPostEnum
+from app.core.security import get_password_hash
+from app.database import A_Session, Base
+from app.database.database import engine
+from app.database.views import VIEWS
+from app.models import Company, CompanyComment, Contact, ContactComment, User
+
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CHUNK_SIZE = 5_000
+
+FIRST_NAMES = ["Иван", "Пётр", "Анна", "Мария", "Сергей", "Ольга", "Алексей", "Елена", "Дмитрий", "Наталья"]
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Волков", "Соколов", "Лебедев", "Козлов"]
+MIDDLE_NAMES = ["Сергеевич", "Иванович", "Петрович", "Алексеевич", None]
+WORDS = ["Рога", "Копыта", "Север", "Вектор", "Альфа", "Техно", "Строй", "Торг", "Логистик", "Сервис"]
+COMMENTS = ["Перезвонить", "Отправили КП", "Ждём оплату", "Встреча в офисе", "Запросили прайс"]
+
+# one hash for every user, bcrypt of thousands of passwords would take minutes
+PASSWORD_HASH = get_password_hash("benchmark")
+
+
+def parse_scale(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+
+def sizes(scale: int) -> dict[str, int]:
+    """Rows per table for `scale` contacts"""
+    return {
+        "users": max(10, scale // 1000),
+        "companies": max(10, scale // 10),
+        "contacts": scale,
+        "contact_comments": scale,
+        "company_comments": max(10, scale // 5),
+    }
+
+
+def _created_at(rng: random.Random, now: datetime) -> datetime:
+    return now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def users(rng: random.Random, count: int, now: datetime):
+    for i in range(1, count + 1):
+        created_at = _created_at(rng, now)
+        yield {
+            "username": f"manager{i}",
+            "password": "benchmark",
+            "hash_password": PASSWORD_HASH,
+            "first_name": rng.choice(FIRST_NAMES),
+            "middle_name": rng.choice(MIDDLE_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "gender": rng.choice(list(GenderEnum)),
+            "post": rng.choice(list(UserPostEnum)),
+            "email": f"m{i}@bench.example",
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def companies(rng: random.Random, count: int, user_count: int, now: datetime):
+    for i in range(1, count + 1):
+        created_at = _created_at(rng, now)
+        yield {
+            "inn": f"{7700000000 + i}",
+            "name": f"ООО {rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            "email": [f"info{i}@company.example"],
+            "phone": [f"+7999{i:07d}"],
+            "revenue": rng.choice([None, rng.randrange(100_000, 1_000_000_000)]),
+            "user_id": rng.randint(1, user_count),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def contacts(rng: random.Random, count: int, user_count: int, company_count: int, now: datetime):
+    for i in range(1, count + 1):
+        created_at = _created_at(rng, now)
+        yield {
+            "first_name": rng.choice(FIRST_NAMES),
+            "middle_name": rng.choice(MIDDLE_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "email": f"c{i}@bench.example",
+            "phone": [f"+7900{i:07d}"],
+            "post": rng.choice([None, *CompanyPostEnum]),
+            "department": rng.choice([None, *DepartmentEnum]),
+            "user_id": rng.randint(1, user_count),
+            "company_id": rng.choice([None, rng.randint(1, company_count)]),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def comments(rng: random.Random, count: int, parent_key: str, parent_count: int, now: datetime):
+    for _ in range(count):
+        created_at = _created_at(rng, now)
+        yield {
+            "text": rng.choice(COMMENTS),
+            parent_key: rng.randint(1, parent_count),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+async def insert_rows(session_db: AsyncSession, model, rows) -> int:
+    """ORM bulk insert, rows are keyed by the attributes (`User.gender`), not the columns"""
+    chunk, total = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            await session_db.execute(insert(model), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        await session_db.execute(insert(model), chunk)
+        total += len(chunk)
+    return total
+
+
+async def seed(scale: int, reset: bool = False, create: bool = False, random_seed: int = 42) -> dict[str, int]:
+    """Insert the synthetic rows, returns the number of rows per table"""
+    rng = random.Random(random_seed)
+    now = datetime.now()
+    counts = sizes(scale)
+    async with A_Session() as session_db:
+        connection = await session_db.connection()
+        if create:
+            await connection.run_sync(Base.metadata.create_all)
+        if reset:
+            await session_db.execute(text(
+                "TRUNCATE users, companies, contacts, contact_comments, company_comments "
+                "RESTART IDENTITY CASCADE"
+            ))
+        elif await session_db.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("The database is not empty, use --reset")
+
+        plan = [
+            (User, users(rng, counts["users"], now)),
+            (Company, companies(rng, counts["companies"], counts["users"], now)),
+            (Contact, contacts(rng, counts["contacts"], counts["users"], counts["companies"], now)),
+            (ContactComment, comments(rng, counts["contact_comments"], "contact_id", counts["contacts"], now)),
+            (CompanyComment, comments(rng, counts["company_comments"], "company_id", counts["companies"], now)),
+        ]
+        for model, rows in plan:
+            started = time.perf_counter()
+            total = await insert_rows(session_db, model, rows)
+            print(f"{model.__tablename__:<18}{total:>10} rows {time.perf_counter() - started:>8.1f} s")
+
+        for name in VIEWS:
+            await session_db.execute(text(f"REFRESH MATERIALIZED VIEW {name}"))
+        await session_db.commit()
+    async with engine.connect() as connection:
+        await connection.execute(text("ANALYZE"))
+    return counts
+
+
+async def main(scale: int, reset: bool, create: bool):
+    try:
+        await seed(scale, reset, create)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=parse_scale, default="10k", help="10k, 100k, 1m or a number of contacts")
+    parser.add_argument("--reset", action="store_true", help="truncate the tables first")
+    parser.add_argument("--create", action="store_true", help="create the tables without alembic")
+    args = parser.parse_args()
+    asyncio.run(main(args.scale, args.reset, args.create))
@@ -1,17 +1,63 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.config import config
+from app.core.cache import cache
+from app.core.detector import QueryDetectorMiddleware, detector
+from app.core.imports import importer
+from app.core.jobs import runner
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core import tasks  # noqa: F401, registers the job handlers
+from app.database import replicas
+from app.database.database import engine
+from app.database.views import rollups
+from app.routers import (companies_router, contacts_router, users_router, system_router, search_router, stats_router, metrics_router, imports_router, jobs_router)
+
 
-from app.routers import (companies_router, contacts_router, users_router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await cache.start()
+    await replicas.start()
+    await runner.start()
+    yield
+    await runner.stop()
+    await importer.stop()
+    await replicas.stop()
+    await rollups.stop()
+    await cache.stop()
 
-app = FastAPI()
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=(
+        ORJSONResponse if config.api.fast_serialization else JSONResponse
+    ),
+)
 
 main_router = APIRouter(prefix="/api")
 main_router.include_router(users_router)
 main_router.include_router(contacts_router)
 main_router.include_router(companies_router)
+main_router.include_router(search_router)
+main_router.include_router(stats_router)
+main_router.include_router(system_router)
+main_router.include_router(imports_router)
+main_router.include_router(jobs_router)
 
 app.include_router(main_router)
 
+if config.metrics.enabled:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+if detector.enabled:
+    detector.instrument(engine)
+    app.add_middleware(QueryDetectorMiddleware, detector=detector)
+
 
 if __name__ == "__main__":
     uvicorn.run(app="main:app", reload=True)
@@ -1,18 +1,32 @@
-import asyncio
+import hashlib
+import os
+
 import asyncpg
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import pytest_asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
 from httpx import AsyncClient, ASGITransport
 from typing import AsyncGenerator
 
 from main import app
-from app.database import Base, get_db
+from app.constants import DETAIL_COLLECTION_LIMIT, GenderEnum
+from app.database import Base, get_db, get_read_db
+from app.database.ddl import PG_TRGM, PHONE_DIGITS_FUNCTION
+from app.database.views import VIEWS, create_view_ddl
 from app.config import setup_log
+from app.core.cache import cache
+from app.core.jobs import runner
+from app.models import Company, CompanyComment, Contact, User
+from tests.utils import truncate_all
 
 
 log = setup_log(__name__)
 
+pytest_plugins = ["tests.plugins.query_budget"]
+
 
 class TestDBConfig(BaseSettings):
     model_config = SettingsConfigDict(
@@ -35,60 +49,92 @@ class TestDBConfig(BaseSettings):
     def get_test_db_name(self):
         return f"{self.name}"
 
+    @property
+    def get_admin_dsn(self):
+        return f"postgres://{self.user}:{self.password}@{self.host}:{self.port}/postgres"
+
 
 test_db_config = TestDBConfig()
 
-TEST_DB_NAME = test_db_config.get_test_db_name
+# every pytest-xdist worker (gw0, gw1, ...) gets its own database
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "")
+TEMPLATE_DB_NAME = f"{test_db_config.get_test_db_name}_template"
+TEST_DB_NAME = "_".join(filter(None, [test_db_config.get_test_db_name, XDIST_WORKER]))
 TEST_DB_BASE_URL = test_db_config.get_test_db_base_url
 TEST_DB_URL = f"{TEST_DB_BASE_URL}{TEST_DB_NAME}"
 
+# serializes the template build and the clones of the workers
+TEMPLATE_LOCK_ID = 7_310_022
 
-@pytest_asyncio.fixture(scope="session")
-async def event_loop():
-    """Create an instance of the default event loop for each test case."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
 
+def schema_fingerprint() -> str:
+    """Hash of the DDL of the models, the template is rebuilt when it changes"""
+    dialect = postgresql.dialect()
+    statements = [PG_TRGM, PHONE_DIGITS_FUNCTION]
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(str(CreateIndex(index).compile(dialect=dialect)))
+    for name in VIEWS:
+        statements.extend(create_view_ddl(name))
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()
 
-@pytest_asyncio.fixture(scope="session", autouse=True)
-async def prepare_database(event_loop):
-    log.debug(f"Start prepare_database")
-    """Prepare test database and clean up afterwards."""
-    # Create test database
-    conn = await asyncpg.connect(
-        f"postgres://{test_db_config.user}:{test_db_config.password}@{test_db_config.host}:{test_db_config.port}/postgres"
+
+async def drop_database(conn: asyncpg.Connection, name: str) -> None:
+    await conn.execute(
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = $1", name
     )
+    await conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+
+
+async def build_template(conn: asyncpg.Connection) -> None:
+    """Creates the schema once in the template database, unless it is up to date"""
+    fingerprint = schema_fingerprint()
+    current = await conn.fetchval(
+        "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = $1",
+        TEMPLATE_DB_NAME,
+    )
+    if current == fingerprint:
+        return
+    log.debug(f"Build template database {TEMPLATE_DB_NAME}")
+    await drop_database(conn, TEMPLATE_DB_NAME)
+    await conn.execute(f'CREATE DATABASE "{TEMPLATE_DB_NAME}"')
+    engine = create_async_engine(f"{TEST_DB_BASE_URL}{TEMPLATE_DB_NAME}", poolclass=NullPool)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+    finally:
+        await engine.dispose()
+    await conn.execute(f"COMMENT ON DATABASE \"{TEMPLATE_DB_NAME}\" IS '{fingerprint}'")
+
+
+@pytest_asyncio.fixture(scope="session", autouse=True)
+async def prepare_database():
+    """Clone the test database of the worker from the template"""
+    log.debug(f"Start prepare_database {TEST_DB_NAME}")
+    conn = await asyncpg.connect(test_db_config.get_admin_dsn)
     try:
-        await conn.execute(f"CREATE DATABASE {TEST_DB_NAME}")
-    except asyncpg.DuplicateDatabaseError:
-        pass
+        await conn.execute("SELECT pg_advisory_lock($1)", TEMPLATE_LOCK_ID)
+        await build_template(conn)
+        await drop_database(conn, TEST_DB_NAME)
+        await conn.execute(f'CREATE DATABASE "{TEST_DB_NAME}" TEMPLATE "{TEMPLATE_DB_NAME}"')
     finally:
-        log.debug(f"Close conn")
         await conn.close()
 
     yield
 
-    conn = await asyncpg.connect(
-        f"postgres://{test_db_config.user}:{test_db_config.password}@{test_db_config.host}:{test_db_config.port}/postgres"
-    )
+    conn = await asyncpg.connect(test_db_config.get_admin_dsn)
     try:
-        await conn.execute(f"""
-            SELECT pg_terminate_backend(pg_stat_activity.pid)
-            FROM pg_stat_activity
-            WHERE pg_stat_activity.datname = '{TEST_DB_NAME}'
-        """)
-        await conn.execute(f"DROP DATABASE {TEST_DB_NAME}")
+        await drop_database(conn, TEST_DB_NAME)
     finally:
         await conn.close()
 
 
-@pytest_asyncio.fixture(scope="function")
+@pytest_asyncio.fixture(scope="session")
 async def engine():
     log.debug(f"Start engine")
     engine = create_async_engine(
         TEST_DB_URL,
-        pool_pre_ping=True,
         echo=False,
         pool_size=10,
         max_overflow=20
@@ -97,24 +143,48 @@ async def engine():
     await engine.dispose()
 
 
-@pytest_asyncio.fixture()
-async def db_session(engine):
-    log.debug(f"Start db_session")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
-
-    async_session = async_sessionmaker(
-        bind=engine,
-        autoflush=False,
-        expire_on_commit=False
+async def _restart_identities(connection) -> None:
+    """Ids start from 1 in every test, ALTER SEQUENCE is rolled back with the transaction"""
+    sequences = await connection.exec_driver_sql(
+        "SELECT sequencename FROM pg_sequences WHERE schemaname = 'public'"
     )
+    for (name,) in sequences.all():
+        await connection.exec_driver_sql(f'ALTER SEQUENCE "{name}" RESTART')
+
 
-    async with async_session() as session:
+@pytest_asyncio.fixture()
+async def db_session(request, engine):
+    """Session of a test, everything it commits is rolled back afterwards
+
+    The session works inside a transaction of its own connection, its
+    commits only release SAVEPOINTs. Tests marked `commits` need the data
+    visible to other connections, they commit for real and the tables
+    are truncated afterwards.
+    """
+    log.debug(f"Start db_session")
+    if request.node.get_closest_marker("commits"):
+        session = AsyncSession(bind=engine, autoflush=False, expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await truncate_all(engine)
+        return
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        await _restart_identities(connection)
+        session = AsyncSession(
+            bind=connection,
+            join_transaction_mode="create_savepoint",
+            autoflush=False,
+            expire_on_commit=False,
+        )
         try:
             yield session
         finally:
             await session.close()
+            await transaction.rollback()
 
 
 @pytest_asyncio.fixture
@@ -128,6 +198,8 @@ async def override_get_db(db_session):
             await db_session.close()
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
+    await cache.clear()
     yield
     app.dependency_overrides.clear()
 
@@ -141,3 +213,43 @@ async def async_client(override_get_db) -> AsyncGenerator[AsyncClient, None]:
         base_url="http://test"
     ) as client:
         yield client
+
+
+@pytest_asyncio.fixture
+async def company(db_session: AsyncSession) -> Company:
+    """Company of a user with comments and contacts, more comments than a detail shows"""
+    user = User(
+        username="ivanov",
+        password="pass123",
+        hash_password="hash",
+        first_name="Иван",
+        last_name="Иванов",
+        gender=GenderEnum.MALE,
+        email="ivanov@example.com",
+    )
+    company = Company(inn="1234567890", name="ООО Рога и Копыта", user=user)
+    db_session.add_all([user, company])
+    db_session.add_all(
+        CompanyComment(text=f"Комментарий {i}", company=company)
+        for i in range(DETAIL_COLLECTION_LIMIT + 5)
+    )
+    db_session.add_all(
+        Contact(first_name=f"Контакт {i}", company=company, user=user)
+        for i in range(3)
+    )
+    await db_session.commit()
+    return company
+
+@pytest_asyncio.fixture
+async def job_runner(db_session, engine, monkeypatch):
+    """Workers of the job queue on the test database
+
+    They claim jobs on connections of their own, so the tests need the
+    `commits` marker. Stopped before `db_session` truncates the tables.
+    """
+    monkeypatch.setattr(runner, "engine", engine)
+    monkeypatch.setattr(runner, "poll_interval", 0.05)
+    monkeypatch.setattr(runner, "retry_delay", 0.01)
+    await runner.start()
+    yield runner
+    await runner.stop()
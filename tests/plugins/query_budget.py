@@ -0,0 +1,30 @@
+"""Query budgets of the endpoints
+
+    async def test_company_detail(async_client, query_budget):
+        with query_budget(2):
+            await async_client.get("/api/companies/1")
+
+The test fails with the repeated statement shapes when the block runs
+more statements than the budget, or one shape more than `max_repeats` times.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from app.core.detector import record_queries
+from tests.utils import is_savepoint
+
+
+@pytest.fixture
+def query_budget(engine):
+    @contextmanager
+    def budget(max_queries: int, max_repeats: int | None = None):
+        with record_queries(engine) as query_log:
+            yield query_log
+        query_log.statements[:] = [s for s in query_log.statements if not is_savepoint(s[0])]
+        if query_log.count > max_queries:
+            pytest.fail(f"Query budget {max_queries} exceeded: {query_log.report()}")
+        if max_repeats is not None and query_log.repeated(max_repeats + 1):
+            pytest.fail(f"Statement repeated more than {max_repeats} times: {query_log.report()}")
+
+    return budget
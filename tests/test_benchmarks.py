@@ -0,0 +1,20 @@
+from benchmarks.compare import compare
+
+
+def _report(rps: float, p95_ms: float, errors: int = 0) -> dict:
+    return {"scenarios": {"contacts.list": {"rps": rps, "p95_ms": p95_ms, "errors": errors}}}
+
+
+def test_regression_gate():
+    baseline = _report(rps=100, p95_ms=20)
+
+    assert not compare(baseline, _report(rps=95, p95_ms=21.5), threshold=10)[0]["regressed"]
+    assert compare(baseline, _report(rps=85, p95_ms=20), threshold=10)[0]["regressed"]
+    assert compare(baseline, _report(rps=100, p95_ms=25), threshold=10)[0]["regressed"]
+    assert compare(baseline, _report(rps=100, p95_ms=20, errors=3), threshold=10)[0]["regressed"]
+
+
+def test_fast_scenarios_are_not_noise_regressions():
+    rows = compare(_report(rps=1000, p95_ms=0.4), _report(rps=1000, p95_ms=0.6), threshold=10, min_ms=1.0)
+
+    assert not rows[0]["regressed"]
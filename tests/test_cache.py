@@ -0,0 +1,240 @@
+import asyncio
+import fnmatch
+
+import pytest
+
+from app.core.cache import RELEASE_LOCK, MemoryCacheBackend, RedisCacheBackend
+
+
+class FakeRedisServer:
+    """Shared state of the fake, every FakeRedis is one worker's connection"""
+
+    def __init__(self):
+        self.data: dict[str, bytes | set] = {}
+        self.subscribers: dict[str, list[asyncio.Queue]] = {}
+
+
+class FakePipeline:
+    def __init__(self, client: "FakeRedis"):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return command
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakePubSub:
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.server.subscribers.setdefault(channel, []).append(self.queue)
+
+    async def unsubscribe(self, channel):
+        self.server.subscribers[channel].remove(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis used by RedisCacheBackend"""
+
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.server.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.server.data:
+            return None
+        self.server.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.server.data.pop(k, None) is not None for k in keys)
+
+    async def eval(self, script, numkeys, *args):
+        # only the compare-and-delete of the lock is used
+        assert script == RELEASE_LOCK
+        (key,), (token,) = args[:numkeys], args[numkeys:]
+        if self.server.data.get(key) == token:
+            return await self.delete(key)
+        return 0
+
+    async def sadd(self, key, *members):
+        self.server.data.setdefault(key, set()).update(members)
+
+    async def smembers(self, key):
+        return set(self.server.data.get(key, set()))
+
+    async def expire(self, key, seconds):
+        return key in self.server.data
+
+    async def scan_iter(self, match):
+        for key in list(self.server.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def publish(self, channel, message):
+        for queue in self.server.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "data": message})
+
+    def pubsub(self):
+        return FakePubSub(self.server)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+async def workers():
+    server = FakeRedisServer()
+    backends = [
+        RedisCacheBackend(FakeRedis(server), MemoryCacheBackend(maxsize=100, ttl=60), ttl=60)
+        for _ in range(2)
+    ]
+    for backend in backends:
+        await backend.start()
+    await asyncio.sleep(0)
+    yield backends
+    for backend in backends:
+        await backend.stop()
+
+
+class TestCache:
+    @pytest.mark.asyncio
+    async def test_memory_lru_and_ttl(self):
+        cache = MemoryCacheBackend(maxsize=2, ttl=60)
+        await cache.set(("users", "details", 1), {"id": 1})
+        await cache.set(("users", "details", 2), {"id": 2})
+        await cache.get(("users", "details", 1))
+        await cache.set(("users", "details", 3), {"id": 3})
+
+        assert await cache.get(("users", "details", 2)) == (False, None)
+        assert await cache.get(("users", "details", 1)) == (True, {"id": 1})
+        assert cache.stats()["evictions"] == 1
+
+        cache.ttl = -1
+        await cache.set(("users", "page", 50, None), {"items": []})
+        assert await cache.get(("users", "page", 50, None)) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_single_flight(self):
+        cache = MemoryCacheBackend(maxsize=100, ttl=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        results = await asyncio.gather(
+            *(cache.get_or_set(("users", "details", 1), loader) for _ in range(10))
+        )
+
+        assert calls == 1
+        assert results == [{"id": 1}] * 10
+        assert cache.stats()["coalesced"] == 9
+
+    @pytest.mark.asyncio
+    async def test_load_invalidated_in_flight_is_not_stored(self):
+        cache = MemoryCacheBackend(maxsize=100, ttl=60)
+
+        async def loader():
+            # a write drops the namespace while the old rows are being read
+            await cache.delete_prefix(("users", "page"))
+            return {"items": [{"id": 1}]}
+
+        assert await cache.get_or_set(("users", "page", 50, None), loader) == {"items": [{"id": 1}]}
+        assert await cache.get(("users", "page", 50, None)) == (False, None)
+
+        await cache.get_or_set(("users", "page", 50, None), lambda: asyncio.sleep(0, {"items": []}))
+        assert await cache.get(("users", "page", 50, None)) == (True, {"items": []})
+
+    @pytest.mark.asyncio
+    async def test_redis_load_invalidated_by_another_worker(self, workers):
+        first, second = workers
+
+        async def loader():
+            await second.delete(("users", "details", 1))
+            await asyncio.sleep(0.01)
+            return {"id": 1, "username": "old"}
+
+        await first.get_or_set(("users", "details", 1), loader)
+
+        assert await first.get(("users", "details", 1)) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_redis_shares_values_between_workers(self, workers):
+        first, second = workers
+        await first.set(("users", "details", 1), {"id": 1, "username": "ivanov"})
+
+        assert await second.get(("users", "details", 1)) == (True, {"id": 1, "username": "ivanov"})
+
+    @pytest.mark.asyncio
+    async def test_redis_broadcasts_invalidations(self, workers):
+        first, second = workers
+        await first.set(("users", "details", 1), {"id": 1})
+        await first.set(("users", "page", 50, None), {"items": [{"id": 1}]})
+        # both workers now hold the keys in their local caches
+        assert (await second.get(("users", "details", 1)))[0]
+        assert (await second.get(("users", "page", 50, None)))[0]
+
+        await first.delete(("users", "details", 1))
+        await first.delete_prefix(("users", "page"))
+        await asyncio.sleep(0.01)
+
+        assert await second.local.get(("users", "details", 1)) == (False, None)
+        assert await second.local.get(("users", "page", 50, None)) == (False, None)
+        assert await second.get(("users", "page", 50, None)) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_redis_loads_cold_key_once(self, workers):
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"id": 1}
+
+        results = await asyncio.gather(
+            *(worker.get_or_set(("users", "details", 1), loader) for worker in workers * 5)
+        )
+
+        assert calls == 1
+        assert results == [{"id": 1}] * 10
+
+    @pytest.mark.asyncio
+    async def test_redis_keeps_lock_of_another_worker(self, workers):
+        first, _ = workers
+        lock = first._key(("lock", "users", "details", 1))
+
+        async def loader():
+            # the load outlived the lock, another worker took it over
+            first.client.server.data[lock] = "token-of-another-worker"
+            return {"id": 1}
+
+        await first.get_or_set(("users", "details", 1), loader)
+
+        assert first.client.server.data[lock] == "token-of-another-worker"
+        await first.get_or_set(("users", "details", 2), loader)
+        assert first._key(("lock", "users", "details", 2)) not in first.client.server.data
@@ -0,0 +1,85 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import DETAIL_COLLECTION_LIMIT
+from app.models import Company, CompanyComment, Contact
+
+
+@pytest.fixture
+async def company(db_session: AsyncSession) -> Company:
+    company = Company(inn="1234567890", name="ООО Рога и Копыта")
+    db_session.add(company)
+    db_session.add_all(
+        CompanyComment(text=f"Комментарий {i}", company=company)
+        for i in range(DETAIL_COLLECTION_LIMIT + 5)
+    )
+    await db_session.commit()
+    return company
+
+
+class TestCommentRouters:
+    @pytest.mark.asyncio
+    async def test_detail_embeds_latest_comments_with_cursor(
+        self, async_client: AsyncClient, company: Company
+    ):
+        response = await async_client.get(f"/api/companies/{company.id}")
+        data = response.json()
+        assert len(data["comments"]) == DETAIL_COLLECTION_LIMIT
+        assert data["comments_next_cursor"]
+
+        ids = [c["id"] for c in data["comments"]]
+        cursor = data["comments_next_cursor"]
+        while cursor:
+            response = await async_client.get(
+                f"/api/companies/{company.id}/comments", params={"cursor": cursor, "limit": 2}
+            )
+            assert response.status_code == 200
+            page = response.json()
+            ids.extend(c["id"] for c in page["items"])
+            cursor = page["next_cursor"]
+
+        # all comments with the same created_at, the id breaks the tie
+        assert ids == sorted(ids, reverse=True)
+        assert len(set(ids)) == DETAIL_COLLECTION_LIMIT + 5
+
+    @pytest.mark.asyncio
+    async def test_create_comment_invalidates_detail(
+        self, async_client: AsyncClient, company: Company
+    ):
+        response = await async_client.get(f"/api/companies/{company.id}")
+        assert response.json()["comments"][0]["text"] == f"Комментарий {DETAIL_COLLECTION_LIMIT + 4}"
+
+        response = await async_client.post(
+            "/api/companies/comments", json={"text": "Новый", "company_id": company.id}
+        )
+        assert response.status_code == 201
+
+        response = await async_client.get(f"/api/companies/{company.id}")
+        assert response.json()["comments"][0]["text"] == "Новый"
+        response = await async_client.get(f"/api/companies/{company.id}/comments", params={"limit": 1})
+        assert response.json()["items"][0]["text"] == "Новый"
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_contact_comments(
+        self, async_client: AsyncClient, db_session: AsyncSession
+    ):
+        contact = Contact(first_name="Иван")
+        db_session.add(contact)
+        await db_session.commit()
+
+        response = await async_client.post(
+            "/api/contacts/comments/bulk",
+            json=[{"text": f"Звонок {i}", "contact_id": contact.id} for i in range(3)],
+        )
+        assert response.status_code == 201
+        assert len(response.json()["created"]) == 3
+
+        response = await async_client.get(f"/api/contacts/{contact.id}")
+        assert len(response.json()["comments"]) == 3
+        assert response.json()["comments_next_cursor"] is None
+
+        response = await async_client.post(
+            "/api/contacts/comments/bulk", json=[{"text": "Нет контакта", "contact_id": 999}]
+        )
+        assert response.status_code == 409
@@ -0,0 +1,211 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import DETAIL_COLLECTION_LIMIT, DepartmentEnum
+from app.models import Company, Contact
+from tests.utils import capture_queries
+
+
+class TestCompanyRouters:
+    @pytest.mark.asyncio
+    async def test_get_company_detail_queries(
+        self, async_client: AsyncClient, db_session: AsyncSession, company: Company
+    ):
+        db_session.expunge_all()
+
+        with capture_queries(db_session) as statements:
+            response = await async_client.get(f"/api/companies/{company.id}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["user"]["username"] == "ivanov"
+        assert len(data["comments"]) == DETAIL_COLLECTION_LIMIT
+        # company joined with its user + one limited query for comments
+        assert len(statements) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_user_detail_queries(
+        self, async_client: AsyncClient, db_session: AsyncSession, company: Company
+    ):
+        db_session.expunge_all()
+
+        with capture_queries(db_session) as statements:
+            response = await async_client.get(f"/api/users/{company.user_id}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["companies"]) == 1
+        assert len(data["contacts"]) == 3
+        # user + one query per collection of UserFullResponse
+        assert len(statements) == 3
+
+    @pytest.mark.asyncio
+    async def test_get_company_detail_not_found(self, async_client: AsyncClient):
+        response = await async_client.get("/api/companies/999")
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_contact_write_invalidates_user_detail(
+        self, async_client: AsyncClient, db_session: AsyncSession, company: Company
+    ):
+        response = await async_client.get(f"/api/users/{company.user_id}")
+        assert len(response.json()["contacts"]) == 3
+
+        with capture_queries(db_session) as statements:
+            response = await async_client.get(f"/api/users/{company.user_id}")
+        assert len(response.json()["contacts"]) == 3
+        assert statements == []
+
+        response = await async_client.post("/api/contacts/", json={
+            "first_name": "Новый",
+            "user_id": company.user_id,
+            "company_id": company.id,
+        })
+        assert response.status_code == 201
+
+        response = await async_client.get(f"/api/users/{company.user_id}")
+        assert len(response.json()["contacts"]) == 4
+
+        response = await async_client.get("/api/system/cache")
+        assert response.json()["hits"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_delete_company_invalidates_contact_pages(
+        self, async_client: AsyncClient, company: Company
+    ):
+        response = await async_client.get("/api/contacts/")
+        assert {item["company_id"] for item in response.json()["items"]} == {company.id}
+
+        response = await async_client.delete(f"/api/companies/{company.id}")
+        assert response.status_code == 200
+
+        # ON DELETE SET NULL changed the contacts, their cached page is stale
+        response = await async_client.get("/api/contacts/")
+        assert {item["company_id"] for item in response.json()["items"]} == {None}
+
+    @pytest.mark.asyncio
+    async def test_filter_and_sort_companies(
+        self, async_client: AsyncClient, db_session: AsyncSession, company: Company
+    ):
+        revenues = [500, None, 3000, 1000, None, 3000, 2000]
+        db_session.add_all(
+            Company(inn=f"77000000{i:02d}", name=f"Компания {i}", revenue=revenue, user_id=company.user_id)
+            for i, revenue in enumerate(revenues)
+        )
+        await db_session.commit()
+
+        found, cursor = [], None
+        while True:
+            params = {"revenue__gte": 1000, "user_id": company.user_id, "sort": "-revenue", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get("/api/companies/", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            found.extend(item["revenue"] for item in data["items"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert found == [3000, 3000, 2000, 1000]
+
+        # NULLs go last in ascending and first in descending order,
+        # none of them is lost between pages
+        ascending = [500, 1000, 2000, 3000, 3000, None, None, None]
+        for sort, expected in [("revenue", ascending), ("-revenue", ascending[::-1])]:
+            found, cursor = [], None
+            while True:
+                params = {"sort": sort, "limit": 3}
+                if cursor:
+                    params["cursor"] = cursor
+                data = (await async_client.get(f"/api/users/{company.user_id}/companies", params=params)).json()
+                found.extend(item["revenue"] for item in data["items"])
+                cursor = data["next_cursor"]
+                if cursor is None:
+                    break
+            assert found == expected
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"name": "ООО"},
+            {"revenue__contains": "1"},
+            {"revenue__gte": "много"},
+            {"sort": "name"},
+        ],
+    )
+    async def test_invalid_filter(self, async_client: AsyncClient, params):
+        response = await async_client.get("/api/companies/", params=params)
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_filter_contacts_of_company(
+        self, async_client: AsyncClient, db_session: AsyncSession, company: Company
+    ):
+        db_session.add(Contact(first_name="Закупщик", company=company, department=DepartmentEnum.PURCHASE))
+        await db_session.commit()
+
+        response = await async_client.get(
+            "/api/contacts/",
+            params={"company_id": company.id, "department": DepartmentEnum.PURCHASE.value},
+        )
+
+        assert response.status_code == 200
+        assert [c["first_name"] for c in response.json()["items"]] == ["Закупщик"]
+
+
+class TestSync:
+    @pytest.mark.asyncio
+    async def test_sync_companies(self, async_client: AsyncClient):
+        companies = [
+            {"inn": "1111111111", "name": "ООО Первая"},
+            {"inn": "2222222222", "name": "ООО Вторая"},
+            {"inn": "1111111111", "name": "ООО Первая новая"},
+        ]
+
+        response = await async_client.post("/api/companies/sync", json=companies)
+        assert response.status_code == 200
+        assert response.json() == {"created": 2, "updated": 0, "unchanged": 0, "duplicates": 1}
+
+        response = await async_client.post("/api/companies/sync", json=companies[1:])
+        assert response.json() == {"created": 0, "updated": 0, "unchanged": 2, "duplicates": 0}
+
+        companies[1]["revenue"] = 1000
+        response = await async_client.post("/api/companies/sync", json=companies[1:])
+        assert response.json() == {"created": 0, "updated": 1, "unchanged": 1, "duplicates": 0}
+
+        page = (await async_client.get("/api/companies/", params={"sort": "revenue"})).json()
+        assert [(c["name"], c["revenue"]) for c in page["items"]] == [
+            ("ООО Вторая", 1000), ("ООО Первая новая", None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sync_after_manual_update(self, async_client: AsyncClient, company: Company):
+        data = [{"inn": company.inn, "name": company.name}]
+        response = await async_client.post("/api/companies/sync", json=data)
+        assert response.json()["updated"] == 1
+
+        await async_client.patch(f"/api/companies/{company.id}", json={"name": "ООО Переименована"})
+        response = await async_client.post("/api/companies/sync", json=data)
+
+        # the ERP data wins over the change made in the CRM
+        assert response.json()["updated"] == 1
+        detail = (await async_client.get(f"/api/companies/{company.id}")).json()
+        assert detail["name"] == company.name
+
+    @pytest.mark.asyncio
+    async def test_sync_contacts(self, async_client: AsyncClient, company: Company):
+        contact = {"first_name": "Пётр", "email": "petrov@example.com", "company_id": company.id}
+
+        response = await async_client.post("/api/contacts/sync", json=[contact])
+        assert response.json()["created"] == 1
+
+        response = await async_client.post("/api/contacts/sync", json=[{**contact, "email": None}])
+        assert response.status_code == 422
+
+        response = await async_client.post("/api/contacts/sync", json=[{**contact, "user_id": 999}])
+        assert response.status_code == 409
+        assert response.json()["detail"]["error"] == "integrity_error"
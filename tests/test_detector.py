@@ -0,0 +1,91 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.detector import QueryBudgetExceeded, QueryDetector, statement_shape
+from app.models import Company
+from tests.utils import is_savepoint
+
+
+@pytest.fixture
+def instrument(engine):
+    """Attaches detectors to the session-wide engine for one test"""
+    detectors = []
+
+    def _instrument(detector: QueryDetector) -> QueryDetector:
+        detector.instrument(engine)
+        detectors.append(detector)
+        return detector
+
+    yield _instrument
+    for detector in detectors:
+        detector.uninstrument(engine)
+
+
+class TestQueryDetector:
+    def test_statement_shape(self):
+        assert statement_shape(
+            "SELECT * FROM companies\n WHERE id = $1::INTEGER AND user_id IN ($2::INTEGER, $3::INTEGER)"
+        ) == statement_shape(
+            "SELECT * FROM companies WHERE id = $1::INTEGER AND user_id IN ($2::INTEGER)"
+        ) == "SELECT * FROM companies WHERE id = ? AND user_id IN (?...)"
+
+    @pytest.mark.asyncio
+    async def test_raise_on_repeated_statement(self, instrument, db_session: AsyncSession, company):
+        detector = instrument(QueryDetector("raise", max_queries=100, max_repeats=2, slow_query_ms=10_000))
+
+        with detector.track("n+1"):
+            for _ in range(2):
+                await db_session.scalar(select(Company).where(Company.id == company.id))
+            with pytest.raises(QueryBudgetExceeded, match="3x the same statement"):
+                await db_session.scalar(select(Company).where(Company.id == company.id))
+
+    @pytest.mark.asyncio
+    async def test_warn_on_slow_statement(self, instrument, db_session: AsyncSession, monkeypatch):
+        detector = instrument(QueryDetector("warn", max_queries=1, max_repeats=5, slow_query_ms=50))
+        warnings = []
+        monkeypatch.setattr("app.core.detector.log.warning", warnings.append)
+
+        with detector.track("GET /slow") as query_log:
+            await db_session.execute(text("SELECT pg_sleep(0.1)"))
+            await db_session.execute(text("SELECT 1"))
+
+        # the session of the test opens a SAVEPOINT first
+        assert [s for s, _ in query_log.statements if not is_savepoint(s)] == ["SELECT pg_sleep(0.1)", "SELECT 1"]
+        assert warnings[0].startswith("Slow statement")
+        assert warnings[1].startswith(f"GET /slow: {query_log.count} statements, budget 1")
+
+    @pytest.mark.asyncio
+    async def test_raise_mode_logs_slow_statement_outside_request(
+        self, instrument, db_session: AsyncSession, monkeypatch
+    ):
+        detector = instrument(QueryDetector("raise", max_queries=100, max_repeats=5, slow_query_ms=50))
+        warnings = []
+        monkeypatch.setattr("app.core.detector.log.warning", warnings.append)
+
+        # e.g. the lifespan or a background job, nobody would handle the error
+        await db_session.execute(text("SELECT pg_sleep(0.1)"))
+        assert warnings[0].startswith("Slow statement")
+
+        with detector.track("GET /slow"):
+            with pytest.raises(QueryBudgetExceeded, match="Slow statement"):
+                await db_session.execute(text("SELECT pg_sleep(0.1)"))
+
+
+class TestQueryBudget:
+    @pytest.mark.asyncio
+    async def test_company_detail_budget(self, async_client: AsyncClient, query_budget, company):
+        with query_budget(2, max_repeats=1):
+            response = await async_client.get(f"/api/companies/{company.id}")
+        assert response.status_code == 200
+
+        # a cached detail costs nothing
+        with query_budget(0):
+            await async_client.get(f"/api/companies/{company.id}")
+
+    @pytest.mark.asyncio
+    async def test_budget_exceeded(self, async_client: AsyncClient, query_budget, company):
+        with pytest.raises(pytest.fail.Exception, match="Query budget 1 exceeded"):
+            with query_budget(1):
+                await async_client.get(f"/api/companies/{company.id}")
@@ -0,0 +1,125 @@
+import csv
+import io
+import os
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import CompanyPostEnum, GenderEnum, ImportKindEnum
+from app.core.imports import importer, validate_batch
+from app.models import Company, Contact, User
+from tests.utils import wait_for_job
+
+
+@pytest.fixture
+async def import_runner(job_runner, tmp_path, monkeypatch):
+    """Imports run by the job workers on the test database"""
+    monkeypatch.setattr(importer, "directory", str(tmp_path))
+    monkeypatch.setattr(importer, "batch_size", 2)
+    monkeypatch.setattr(importer, "workers", 1)
+    yield
+    await importer.stop()
+
+
+def to_csv(rows: list[list]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+class TestImports:
+    def test_validate_batch(self):
+        records, rejected = validate_batch(ImportKindEnum.CONTACTS, [
+            (2, {"first_name": "Иван", "email": "ivan@example.com", "phone": "+7900;+7901", "post": "Директор"}),
+            (3, {"first_name": "Ив", "email": "ivan"}),
+        ])
+
+        assert [record[0] for record in records] == [2]
+        # enums as stored by SQLAlchemy, lists split like the CSV export writes them
+        assert CompanyPostEnum.DIRECTOR.name in records[0]
+        assert ["+7900", "+7901"] in records[0]
+        assert rejected[0][0] == 3
+        assert "first_name" in rejected[0][1] and "email" in rejected[0][1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.commits
+    async def test_import_contacts(
+        self, async_client: AsyncClient, db_session: AsyncSession, import_runner
+    ):
+        user = User(
+            username="ivanov", password="pass123", hash_password="hash",
+            first_name="Иван", last_name="Иванов", gender=GenderEnum.MALE, email="ivanov@example.com",
+        )
+        db_session.add_all([user, Contact(first_name="Старый", email="old@example.com")])
+        await db_session.commit()
+        # cached before the import without contacts
+        assert (await async_client.get(f"/api/users/{user.id}")).json()["contacts"] == []
+        rows = [
+            ["first_name", "email", "phone", "department", "user_id"],
+            ["Пётр", "petr@example.com", "+7900;+7901", "Бухгалтерия", user.id],
+            ["Анна", "anna@example.com", "", "", ""],
+            ["Ан", "bad-email", "", "", ""],
+            ["Пётр", "petr@example.com", "", "", ""],
+            ["Старый", "old@example.com", "", "", ""],
+            ["Мария", "maria@example.com", "", "", 999],
+        ]
+
+        response = await async_client.post(
+            "/api/imports/contacts", files={"file": ("contacts.csv", to_csv(rows), "text/csv")}
+        )
+        assert response.status_code == 202
+        job = await wait_for_job(async_client, response.json()["id"])
+
+        assert job["status"] == "done", job["error"]
+        assert job["progress"] == 1.0
+        assert job["result"] == {"rows": 6, "imported": 2, "rejected": 4}
+        contacts = (await db_session.scalars(select(Contact).order_by(Contact.id))).all()
+        assert [(c.email, c.phone, c.user_id) for c in contacts[1:]] == [
+            ("petr@example.com", ["+7900", "+7901"], user.id),
+            ("anna@example.com", [], None),
+        ]
+
+        response = await async_client.get(f"/api/imports/{job['id']}/rejects")
+        rejects = list(csv.DictReader(io.StringIO(response.text)))
+        assert [(r["line"], r["email"]) for r in rejects] == [
+            ("4", "bad-email"),
+            ("5", "petr@example.com"),
+            ("6", "old@example.com"),
+            ("7", "maria@example.com"),
+        ]
+        assert rejects[1]["error"] == "Duplicate email in the file"
+        assert rejects[3]["error"] == "Unknown user_id"
+        detail = (await async_client.get(f"/api/users/{user.id}")).json()
+        assert [c["email"] for c in detail["contacts"]] == ["petr@example.com"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.commits
+    async def test_import_companies(
+        self, async_client: AsyncClient, db_session: AsyncSession, import_runner
+    ):
+        rows = [["inn", "name", "revenue"], ["1234567890", "ООО Рога", "1000"], ["1234567891", "ООО Копыта", ""]]
+
+        response = await async_client.post(
+            "/api/imports/companies", files={"file": ("companies.csv", to_csv(rows), "text/csv")}
+        )
+        job = await wait_for_job(async_client, response.json()["id"])
+
+        assert job["status"] == "done"
+        assert (job["result"]["imported"], job["result"]["rejected"]) == (2, 0)
+        companies = (await db_session.scalars(select(Company).order_by(Company.inn))).all()
+        assert [(c.name, c.revenue) for c in companies] == [("ООО Рога", 1000), ("ООО Копыта", None)]
+
+    @pytest.mark.asyncio
+    @pytest.mark.commits
+    async def test_missing_columns(self, async_client: AsyncClient, import_runner):
+        response = await async_client.post(
+            "/api/imports/contacts", files={"file": ("contacts.csv", to_csv([["email"], ["a@example.com"]]), "text/csv")}
+        )
+        job = await wait_for_job(async_client, response.json()["id"])
+
+        # a retry can not fix the file
+        assert (job["status"], job["attempts"]) == ("failed", 1)
+        assert job["error"] == "Missing columns: first_name"
+        assert os.listdir(importer.directory) == [f"{job['id']}.rejects.csv"]
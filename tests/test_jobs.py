@@ -0,0 +1,262 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import GenderEnum, JobStatusEnum
+from app.core.jobs import JobContext, PermanentJobError, runner
+from app.models import Company, Job, User
+from tests.utils import wait_for_job
+
+
+def make_user(username: str) -> User:
+    return User(
+        username=username, password="pass123", hash_password="hash",
+        first_name="Иван", last_name="Иванов", gender=GenderEnum.MALE, email=f"{username}@example.com",
+    )
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Registers test handlers for the duration of the test"""
+    def register(kind: str, handler):
+        monkeypatch.setitem(runner.handlers, kind, handler)
+    return register
+
+
+@pytest.mark.asyncio
+@pytest.mark.commits
+class TestJobRunner:
+    async def test_retry_until_success(
+        self, async_client: AsyncClient, db_session: AsyncSession, job_runner, handlers
+    ):
+        async def flaky(context: JobContext, fail: int) -> dict:
+            if context.attempt <= fail:
+                raise RuntimeError(f"attempt {context.attempt}")
+            await context.progress(0.5, step="half")
+            return {"attempt": context.attempt}
+
+        handlers("flaky", flaky)
+        job = await runner.enqueue(db_session, "flaky", {"fail": 2})
+        job = await wait_for_job(async_client, job.id)
+
+        assert (job["status"], job["attempts"], job["progress"]) == ("done", 3, 1.0)
+        assert job["result"] == {"attempt": 3}
+        assert job["error"] is None
+
+    async def test_failures(
+        self, async_client: AsyncClient, db_session: AsyncSession, job_runner, handlers
+    ):
+        async def invalid(context: JobContext) -> None:
+            raise PermanentJobError("invalid input")
+
+        async def broken(context: JobContext) -> None:
+            raise RuntimeError("broken")
+
+        handlers("invalid", invalid)
+        handlers("broken", broken)
+        permanent = await runner.enqueue(db_session, "invalid")
+        exhausted = await runner.enqueue(db_session, "broken", max_attempts=2)
+
+        permanent = await wait_for_job(async_client, permanent.id)
+        exhausted = await wait_for_job(async_client, exhausted.id)
+
+        assert (permanent["status"], permanent["attempts"], permanent["error"]) == ("failed", 1, "invalid input")
+        assert (exhausted["status"], exhausted["attempts"], exhausted["error"]) == ("failed", 2, "broken")
+        assert exhausted["finished_at"] is not None
+        assert (await async_client.get("/api/jobs/999")).status_code == 404
+
+    async def test_stop_returns_running_job(
+        self, async_client: AsyncClient, db_session: AsyncSession, job_runner, handlers
+    ):
+        started = asyncio.Event()
+
+        async def endless(context: JobContext) -> None:
+            started.set()
+            await asyncio.Event().wait()
+
+        handlers("endless", endless)
+        job = await runner.enqueue(db_session, "endless")
+        await asyncio.wait_for(started.wait(), 10)
+        await runner.stop()
+
+        job = (await async_client.get(f"/api/jobs/{job.id}")).json()
+        # the interrupted attempt does not count
+        assert (job["status"], job["attempts"]) == ("pending", 0)
+
+    async def test_claim_skips_locked(self, db_session: AsyncSession, engine, handlers, monkeypatch):
+        async def noop(context: JobContext) -> None:
+            pass
+
+        monkeypatch.setattr(runner, "engine", engine)
+        handlers("noop", noop)
+        first = await runner.enqueue(db_session, "noop")
+        second = await runner.enqueue(db_session, "noop")
+        third = await runner.enqueue(db_session, "noop")
+
+        async with AsyncSession(engine) as other:
+            # another worker is in the middle of claiming the first job
+            await other.execute(select(Job).where(Job.id == first.id).with_for_update())
+            claimed = await asyncio.gather(runner._claim("a"), runner._claim("b"))
+            await other.rollback()
+
+        assert sorted(job.id for job in claimed) == [second.id, third.id]
+        assert {job.status for job in claimed} == {JobStatusEnum.RUNNING}
+        assert {job.locked_by for job in claimed} == {"a", "b"}
+        assert (await runner._claim("c")).id == first.id
+        assert await runner._claim("d") is None
+
+    async def test_reap_expired_lease(self, db_session: AsyncSession, engine, monkeypatch):
+        monkeypatch.setattr(runner, "engine", engine)
+        expired = func.now() - timedelta(seconds=runner.lease * 2)
+        jobs = [
+            Job(kind="noop", status=JobStatusEnum.RUNNING, attempts=1, max_attempts=3, locked_at=expired),
+            Job(kind="noop", status=JobStatusEnum.RUNNING, attempts=3, max_attempts=3, locked_at=expired),
+            Job(kind="noop", status=JobStatusEnum.RUNNING, attempts=1, max_attempts=3, locked_at=func.now()),
+        ]
+        db_session.add_all(jobs)
+        await db_session.commit()
+
+        assert await runner.reap() == 2
+
+        statuses = (await db_session.scalars(
+            select(Job.status).order_by(Job.id).execution_options(populate_existing=True)
+        )).all()
+        assert statuses == [JobStatusEnum.PENDING, JobStatusEnum.FAILED, JobStatusEnum.RUNNING]
+
+
+@pytest.mark.asyncio
+@pytest.mark.commits
+class TestBulkJobs:
+    async def test_reassign_companies(
+        self, async_client: AsyncClient, db_session: AsyncSession, job_runner
+    ):
+        source, target = make_user("source"), make_user("target")
+        db_session.add_all([source, target])
+        await db_session.flush()
+        db_session.add_all([
+            Company(name=f"ООО {i}", inn=f"12345678{i:02}", user_id=source.id, content_hash="hash")
+            for i in range(5)
+        ])
+        db_session.add(Company(name="ООО Чужая", inn="1234567899"))
+        await db_session.commit()
+        moved_id = (await db_session.scalars(select(Company.id).where(Company.user_id == source.id))).first()
+        # the detail is cached with the old owner
+        detail = (await async_client.get(f"/api/companies/{moved_id}")).json()
+        assert (detail["user_id"], detail["user"]["username"]) == (source.id, "source")
+
+        response = await async_client.post(
+            "/api/companies/reassign", json={"from_user_id": source.id, "to_user_id": target.id}
+        )
+        assert response.status_code == 202
+        job = await wait_for_job(async_client, response.json()["id"])
+
+        assert (job["status"], job["result"]) == ("done", {"moved": 5})
+        companies = (await db_session.execute(
+            select(Company.user_id, Company.content_hash).order_by(Company.inn)
+        )).all()
+        assert companies == [(target.id, None)] * 5 + [(None, None)]
+        detail = (await async_client.get(f"/api/companies/{moved_id}")).json()
+        assert (detail["user_id"], detail["user"]["username"]) == (target.id, "target")
+
+    async def test_reassign_validation(self, async_client: AsyncClient, db_session: AsyncSession):
+        user = make_user("source")
+        db_session.add(user)
+        await db_session.commit()
+
+        same = await async_client.post("/api/companies/reassign", json={"from_user_id": user.id, "to_user_id": user.id})
+        missing = await async_client.post("/api/companies/reassign", json={"from_user_id": user.id, "to_user_id": 999})
+
+        assert same.status_code == 400
+        assert missing.status_code == 404
+        assert (await db_session.scalars(select(Job))).all() == []
+
+    async def test_refresh_stats(self, async_client: AsyncClient, job_runner):
+        response = await async_client.post("/api/stats/refresh")
+        assert response.status_code == 202
+        job = await wait_for_job(async_client, response.json()["id"])
+
+        assert job["status"] == "done", job["error"]
+        assert job["result"] == {"views": ["manager_stats", "department_stats"]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.commits
+class TestJobRunnerFailures:
+    async def test_worker_survives_lost_outcome(
+        self, async_client: AsyncClient, db_session: AsyncSession, job_runner, handlers, monkeypatch
+    ):
+        async def noop(context: JobContext) -> dict:
+            return {"ok": True}
+
+        set_job = runner._set
+        failures = []
+
+        async def flaky_set(job_id: int, worker: str, **values):
+            if values.get("status") == JobStatusEnum.DONE and not failures:
+                failures.append(job_id)
+                raise ConnectionError("connection lost")
+            return await set_job(job_id, worker, **values)
+
+        monkeypatch.setattr(runner, "concurrency", 1)
+        await runner.stop()
+        await runner.start()
+        monkeypatch.setattr(runner, "_set", flaky_set)
+        handlers("noop", noop)
+        lost = await runner.enqueue(db_session, "noop")
+        job = await runner.enqueue(db_session, "noop")
+
+        job = await wait_for_job(async_client, job.id)
+
+        assert failures == [lost.id]
+        assert job["status"] == "done"
+        # left running, the reaper returns it after the lease
+        assert (await async_client.get(f"/api/jobs/{lost.id}")).json()["status"] == "running"
+
+    async def test_heartbeat_survives_errors(self, monkeypatch):
+        beats = []
+
+        async def flaky_set(job_id: int, worker: str, **values):
+            beats.append(job_id)
+            if len(beats) == 1:
+                raise ConnectionError("connection lost")
+            return True
+
+        monkeypatch.setattr(runner, "lease", 0.03)
+        monkeypatch.setattr(runner, "_set", flaky_set)
+        heartbeat = asyncio.create_task(runner._heartbeat(1, "a"))
+        await asyncio.sleep(0.1)
+
+        assert not heartbeat.done()
+        assert len(beats) >= 2
+        heartbeat.cancel()
+
+    async def test_reaped_worker_can_not_store_outcome(
+        self, db_session: AsyncSession, engine, handlers, monkeypatch
+    ):
+        async def noop(context: JobContext) -> dict:
+            await context.progress(0.5)
+            return {"worker": "a"}
+
+        monkeypatch.setattr(runner, "engine", engine)
+        monkeypatch.setattr(runner, "lease", 0.03)
+        handlers("noop", noop)
+        job = await runner.enqueue(db_session, "noop")
+        stale = await runner._claim("a")
+        # the lease of "a" expires, the job goes to "b"
+        await db_session.execute(
+            update(Job).where(Job.id == job.id).values(locked_at=func.now() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        assert await runner.reap() == 1
+        assert (await runner._claim("b")).id == job.id
+
+        await runner.run(stale)
+        heartbeat = asyncio.create_task(runner._heartbeat(job.id, "a"))
+        await asyncio.wait_for(heartbeat, 1)
+
+        job = await db_session.scalar(select(Job).where(Job.id == job.id).execution_options(populate_existing=True))
+        assert (job.status, job.locked_by, job.progress, job.result) == (JobStatusEnum.RUNNING, "b", 0.0, None)
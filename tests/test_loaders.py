@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import GenderEnum
+from app.database.dao import ContactDAO
+from app.database.loaders import Loaders
+from app.models import Company, Contact, User
+
+
+@pytest.fixture
+async def contacts(db_session: AsyncSession) -> list[Contact]:
+    users = [
+        User(
+            username=f"manager{i}",
+            password="pass123",
+            hash_password="hash",
+            first_name="Иван",
+            last_name=f"Менеджер {i}",
+            gender=GenderEnum.MALE,
+            email=f"manager{i}@example.com",
+        )
+        for i in range(3)
+    ]
+    companies = [
+        Company(inn=f"{1000000000 + i}", name=f"Компания {i}", user=users[i % 3])
+        for i in range(4)
+    ]
+    contacts = [
+        Contact(first_name=f"Контакт {i}", user=users[i % 3], company=companies[i % 4] if i % 5 else None)
+        for i in range(12)
+    ]
+    db_session.add_all([*users, *companies, *contacts])
+    await db_session.commit()
+    return contacts
+
+
+class TestExpand:
+    @pytest.mark.asyncio
+    async def test_expand_contacts_with_one_query_per_relation(
+        self, async_client: AsyncClient, query_budget, contacts
+    ):
+        # page + users + companies
+        with query_budget(3, max_repeats=1):
+            response = await async_client.get("/api/contacts/?expand=user,company&limit=50")
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert len(items) == 12
+        for item in items:
+            assert item["user"]["id"] == item["user_id"]
+            assert "hash_password" not in item["user"]
+            if item["company_id"] is None:
+                assert item["company"] is None
+            else:
+                assert item["company"]["id"] == item["company_id"]
+
+    @pytest.mark.asyncio
+    async def test_relations_are_absent_without_expand(self, async_client: AsyncClient, contacts):
+        response = await async_client.get("/api/companies/")
+
+        assert response.status_code == 200
+        assert "user" not in response.json()["items"][0]
+
+    @pytest.mark.asyncio
+    async def test_unknown_relation(self, async_client: AsyncClient, contacts):
+        response = await async_client.get("/api/companies/?expand=comments")
+
+        assert response.status_code == 400
+        assert "allowed: user" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_batches(db_session: AsyncSession, contacts):
+    loaders = Loaders(db_session)
+
+    users = await asyncio.gather(*(
+        ContactDAO.get_user(contact.id, db_session, loaders) for contact in contacts
+    ))
+
+    assert [user["id"] for user in users] == [contact.user_id for contact in contacts]
+    # contacts in one batch, their users in another
+    assert loaders.batches == 2
+
+    await ContactDAO.get_user(contacts[0].id, db_session, loaders)
+    assert loaders.batches == 2
@@ -0,0 +1,49 @@
+import io
+import logging
+import queue
+from logging.handlers import QueueListener
+
+import orjson
+
+from app.config.app_config import LogConfig
+from app.config.logger import JsonFormatter, RecordQueueHandler, setup_log
+
+
+def test_setup_log_attaches_one_queue_handler():
+    setup_log("tests.logging")
+    log = setup_log("tests.logging", LogConfig(level="warning"))
+
+    assert [type(h) for h in log.handlers] == [RecordQueueHandler]
+    assert log.level == logging.WARNING
+
+
+def test_json_formatter():
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "Company %s", ("ООО",), None)
+
+    entry = orjson.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Company ООО"
+
+
+def test_json_exception_through_the_queue():
+    records, stream = queue.SimpleQueue(), io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    listener = QueueListener(records, handler)
+    log = logging.getLogger("tests.logging.exception")
+    log.propagate = False
+    log.addHandler(RecordQueueHandler(records))
+    listener.start()
+    try:
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            log.exception("Import %s failed", 7)
+    finally:
+        listener.stop()
+        log.handlers.clear()
+
+    entry = orjson.loads(stream.getvalue())
+    assert entry["message"] == "Import 7 failed"
+    assert "ZeroDivisionError" in entry["exc_info"]
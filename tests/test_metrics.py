@@ -0,0 +1,55 @@
+import re
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.metrics import Histogram, instrument_engine
+
+
+def sample(text: str, name: str, default: float | None = None, **labels: str) -> float:
+    """Value of the sample with exactly these labels in the exposition"""
+    rendered = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(rendered)}\}} (\S+)$", text, re.M)
+    if match is None and default is not None:
+        return default
+    assert match, f"{name}{{{rendered}}} not found"
+    return float(match.group(1))
+
+
+class TestMetrics:
+    def test_histogram_exposition(self):
+        histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, route="/a")
+
+        text = histogram.render()
+
+        assert "# TYPE latency_seconds histogram" in text
+        assert sample(text, "latency_seconds_bucket", route="/a", le="0.1") == 2
+        assert sample(text, "latency_seconds_bucket", route="/a", le="1") == 3
+        assert sample(text, "latency_seconds_bucket", route="/a", le="+Inf") == 4
+        assert sample(text, "latency_seconds_sum", route="/a") == pytest.approx(3.65)
+
+    @pytest.mark.asyncio
+    @pytest.mark.commits  # counts every statement, the SAVEPOINTs of the rollback would be included
+    async def test_requests_and_queries_per_route(self, async_client: AsyncClient, engine):
+        instrument_engine(engine)
+        route = "/api/companies/{company_id}"
+        before = await async_client.get("/metrics")
+        assert before.status_code == 200
+        assert before.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+        for _ in range(2):
+            response = await async_client.get("/api/companies/999")
+            assert response.status_code == 404
+
+        text = (await async_client.get("/metrics")).text
+        labels = {"method": "GET", "route": route}
+        # other tests may have requested the route already
+        requests = sample(before.text, "http_requests_total", 0, **labels, status="404")
+        queries = sample(before.text, "http_request_db_queries_sum", 0, **labels)
+        assert sample(text, "http_requests_total", **labels, status="404") == requests + 2
+        # a missing company costs one query, None is not cached
+        assert sample(text, "http_request_db_queries_sum", **labels) == queries + 2
+        assert sample(text, "http_requests_in_progress", method="GET") == 0
+        assert "db_pool_checkout_wait_seconds" in text
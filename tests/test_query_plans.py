@@ -0,0 +1,102 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database.dao import CompanyCommentDAO, CompanyDAO, ContactDAO, UserDAO
+from tests.utils import capture_queries, truncate_all
+
+
+USERS = 1_000
+COMPANIES = 20_000
+CONTACTS = 50_000
+COMMENTS = 100_000
+
+SEED = [
+    f"""
+    INSERT INTO users (username, password, hash_password, first_name, last_name, gender_enum, post, email)
+    SELECT 'user' || i, 'pass', 'hash', 'Иван', 'Иванов', 'MALE', 'SALES_MANAGER', 'user' || i || '@example.com'
+    FROM generate_series(1, {USERS}) i
+    """,
+    f"""
+    INSERT INTO companies (inn, name, email, phone, user_id)
+    SELECT lpad(i::text, 10, '0'), 'Компания ' || i, '{{}}', '{{}}', i % {USERS} + 1
+    FROM generate_series(1, {COMPANIES}) i
+    """,
+    f"""
+    INSERT INTO contacts (first_name, email, phone, user_id, company_id)
+    SELECT 'Контакт ' || i, 'contact' || i || '@example.com', '{{}}', i % {USERS} + 1, i % {COMPANIES} + 1
+    FROM generate_series(1, {CONTACTS}) i
+    """,
+    f"""
+    INSERT INTO company_comments (text, company_id)
+    SELECT 'Комментарий ' || i, i % {COMPANIES} + 1
+    FROM generate_series(1, {COMMENTS}) i
+    """,
+    f"""
+    INSERT INTO contact_comments (text, contact_id)
+    SELECT 'Комментарий ' || i, i % {CONTACTS} + 1
+    FROM generate_series(1, {COMMENTS}) i
+    """,
+]
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Relations read by a sequential scan anywhere in the plan tree"""
+    found = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+@pytest_asyncio.fixture(scope="module")
+async def seeded(engine: AsyncEngine):
+    """Committed once for the module, the tests only read it"""
+    async with engine.begin() as connection:
+        for statement in SEED:
+            await connection.execute(text(statement))
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql("ANALYZE")
+    yield
+    await truncate_all(engine)
+
+
+class TestQueryPlans:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "dao, call",
+        [
+            (CompanyDAO, lambda dao, s: dao._get_details(42, s)),
+            (ContactDAO, lambda dao, s: dao._get_details(42, s)),
+            (UserDAO, lambda dao, s: dao._get_details(42, s)),
+            (CompanyDAO, lambda dao, s: dao._get_page(s, 50, None)),
+            (CompanyDAO, lambda dao, s: dao._get_page(s, 50, None, {"user_id": 42})),
+            (ContactDAO, lambda dao, s: dao._get_page(s, 50, None, {"user_id": 42})),
+            (ContactDAO, lambda dao, s: dao._get_page(s, 50, None, {"company_id": 42, "department__isnull": "true"})),
+            (CompanyDAO, lambda dao, s: dao._get_page(s, 50, None, {"revenue__gte": 1000}, "-revenue")),
+            (CompanyCommentDAO, lambda dao, s: dao._get_page(s, 50, None, {"company_id": 42})),
+        ],
+        ids=[
+            "company-details",
+            "contact-details",
+            "user-details",
+            "company-page",
+            "user-companies",
+            "user-contacts",
+            "company-contacts",
+            "companies-by-revenue",
+            "company-comments",
+        ],
+    )
+    async def test_dao_queries_use_indexes(self, db_session: AsyncSession, seeded, dao, call):
+        with capture_queries(db_session) as statements:
+            await call(dao, db_session)
+        assert statements
+
+        connection = await db_session.connection()
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()[0]["Plan"]
+            assert seq_scans(plan) == [], statement
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.requests import Request
+
+from app.config import config
+from app.core import metrics
+from app.core.cache import cache
+from app.core.detector import detector
+from app.database import dao, routing
+from app.database.dao import CompanyDAO
+from app.database.routing import ReplicaRouter, create_replica_engine, get_read_db
+from app.models import Company
+from tests.conftest import TEST_DB_BASE_URL, TEST_DB_URL
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+async def _database(session_gen) -> str:
+    session = await anext(session_gen)
+    name = (await session.execute(text("SELECT current_database()"))).scalar_one()
+    await session_gen.aclose()
+    return name
+
+
+@pytest.fixture
+async def router(engine):
+    # две настоящие базы в роли реплик и одна недоступная
+    router = ReplicaRouter(
+        [
+            create_async_engine(TEST_DB_URL),
+            create_async_engine(f"{TEST_DB_BASE_URL}postgres"),
+            create_async_engine(TEST_DB_URL.replace(":5432/", ":1/")),
+        ],
+        check_interval=60,
+    )
+    yield router
+    await router.stop()
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_healthy_replicas(router, monkeypatch):
+    monkeypatch.setattr(routing, "replicas", router)
+
+    healthy = await router.check()
+
+    assert len(healthy) == 2
+    names = [await _database(get_read_db(_request())) for _ in range(4)]
+    assert sorted(names[:2]) == sorted(names[2:]) == sorted(["postgres", TEST_DB_URL.rsplit("/", 1)[1]])
+    assert [r["healthy"] for r in router.stats()] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_primary(router, monkeypatch):
+    monkeypatch.setattr(routing, "replicas", router)
+    router.healthy = []
+
+    session_gen = get_read_db(_request())
+    session = await anext(session_gen)
+
+    assert session.get_bind() is routing.engine.sync_engine
+    await session_gen.aclose()
+
+
+@pytest.mark.asyncio
+async def test_request_with_primary_session_reads_own_writes(router, monkeypatch, db_session):
+    monkeypatch.setattr(routing, "replicas", router)
+    request = _request()
+    request.state.db_session = db_session
+
+    session_gen = get_read_db(request)
+
+    assert await anext(session_gen) is db_session
+    await session_gen.aclose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.commits
+async def test_replica_reads_are_not_cached(router, monkeypatch, db_session):
+    monkeypatch.setattr(dao, "replicas", router)
+    await cache.clear()
+    company = Company(inn="1234567890", name="ООО Рога и Копыта")
+    db_session.add(company)
+    await db_session.commit()
+    key = ("companies", "details", company.id)
+
+    async with AsyncSession(router.engines[0]) as replica_session:
+        assert (await CompanyDAO.get_details(company.id, replica_session))["name"] == "ООО Рога и Копыта"
+    assert await cache.get(key) == (False, None)
+
+    await CompanyDAO.get_details(company.id, db_session)
+    assert (await cache.get(key))[0]
+    await cache.clear()
+
+
+def test_replica_engines_are_instrumented(monkeypatch):
+    monkeypatch.setattr(config.metrics, "enabled", True)
+    monkeypatch.setattr(detector, "mode", "warn")
+
+    replica = create_replica_engine(TEST_DB_URL)
+
+    assert event.contains(replica.sync_engine, "after_cursor_execute", metrics._after_cursor_execute)
+    assert event.contains(replica.sync_engine, "after_cursor_execute", detector._after_cursor_execute)
+    detector.uninstrument(replica)
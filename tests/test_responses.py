@@ -0,0 +1,44 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.constants import GenderEnum
+from app.models import Company, Contact, User
+from app.schemas import CompanyResponse, ContactResponse, UserResponse
+
+
+@pytest.fixture
+def fast_serialization(monkeypatch):
+    monkeypatch.setattr(config.api, "fast_serialization", True)
+
+
+class TestFastSerialization:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "url, params, schema",
+        [
+            ("/api/users/", {"sort": "-created_at"}, UserResponse),
+            ("/api/companies/", {"sort": "-revenue"}, CompanyResponse),
+            ("/api/contacts/", {}, ContactResponse),
+        ],
+    )
+    async def test_page_items_have_schema_keys(
+        self, async_client: AsyncClient, db_session: AsyncSession, fast_serialization, url, params, schema
+    ):
+        for i in range(3):
+            user = User(
+                username=f"user{i}", password="pass123", hash_password="hash",
+                first_name="Иван", last_name="Иванов", gender=GenderEnum.MALE, email=f"user{i}@example.com",
+            )
+            company = Company(inn=f"123456789{i}", name=f"ООО {i}", revenue=i, user=user)
+            db_session.add_all([user, company, Contact(first_name="Пётр", company=company, user=user)])
+        await db_session.commit()
+
+        response = await async_client.get(url, params={"limit": 2, **params})
+
+        assert response.status_code == 200
+        page = response.json()
+        assert page["next_cursor"] is not None
+        # rows go out without the response_model, the keyset columns must not leak
+        assert [set(item) for item in page["items"]] == [set(schema.model_fields)] * 2
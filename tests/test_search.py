@@ -0,0 +1,61 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Company, Contact
+
+
+@pytest.fixture
+async def records(db_session: AsyncSession):
+    horns = Company(inn="7701234567", name="ООО Рога и Копыта", phone=["+7 (495) 123-45-67"])
+    db_session.add_all([
+        horns,
+        Company(inn="7809876543", name="АО Северный ветер"),
+        Contact(first_name="Иван", last_name="Петров", email="petrov@horns.ru",
+                phone=["+7 999 765-43-21"], company=horns),
+        Contact(first_name="Мария", last_name="Петровская", email="maria@wind.ru"),
+    ])
+    await db_session.commit()
+
+
+class TestSearchRouters:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "q, expected",
+        [
+            ("копыт", [("company", "ООО Рога и Копыта")]),
+            ("770123", [("company", "ООО Рога и Копыта")]),
+            ("петров", [("contact", "Петров Иван"), ("contact", "Петровская Мария")]),
+            ("wind.ru", [("contact", "Петровская Мария")]),
+            ("765-43", [("contact", "Петров Иван")]),
+            ("123 45", [("company", "ООО Рога и Копыта")]),
+            # the full number, however it is formatted
+            ("79997654321", [("contact", "Петров Иван")]),
+            ("+7 (495) 123-45-67", [("company", "ООО Рога и Копыта")]),
+        ],
+    )
+    async def test_search(self, async_client: AsyncClient, records, q, expected):
+        response = await async_client.get("/api/search", params={"q": q})
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert [(item["kind"], item["title"]) for item in items] == expected
+
+    @pytest.mark.asyncio
+    async def test_search_pagination(self, async_client: AsyncClient, records):
+        found = []
+        cursor = None
+        while True:
+            params = {"q": "петров", "limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get("/api/search", params=params)
+            page = response.json()
+            found.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        response = await async_client.get("/api/search", params={"q": "петров"})
+        assert found == [item["id"] for item in response.json()["items"]]
+        assert len(found) == 2
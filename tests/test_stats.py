@@ -0,0 +1,103 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import DepartmentEnum, GenderEnum
+from app.database.views import rollups
+from app.models import Company, Contact, User
+from tests.utils import capture_queries
+
+
+@pytest.fixture
+async def users(db_session: AsyncSession) -> list[User]:
+    users = [
+        User(
+            username=f"manager{i}",
+            password="pass123",
+            hash_password="hash",
+            first_name="Иван",
+            last_name="Иванов",
+            gender=GenderEnum.MALE,
+            email=f"manager{i}@example.com",
+        )
+        for i in range(2)
+    ]
+    first, _ = users
+    db_session.add_all(users)
+    db_session.add_all([
+        Company(inn="1000000001", name="Альфа", revenue=100, user=first),
+        Company(inn="1000000002", name="Бета", revenue=250, user=first),
+        Company(inn="1000000003", name="Гамма", user=first),
+        Contact(first_name="Закупщик", user=first, department=DepartmentEnum.PURCHASE),
+        Contact(first_name="Бухгалтер", user=first, department=DepartmentEnum.ACCOUNTING),
+        Contact(first_name="Без отдела", department=None),
+    ])
+    await db_session.commit()
+    return users
+
+
+@pytest.fixture
+async def materialized(engine, db_session: AsyncSession, users):
+    connection = await db_session.connection()
+    for name in ("manager_stats", "department_stats"):
+        await connection.exec_driver_sql(f"REFRESH MATERIALIZED VIEW {name}")
+    await db_session.commit()
+    rollups.engine, rollups.delay, rollups.enabled = engine, 0.5, True
+    rollups.refreshes = 0
+    yield rollups
+    await rollups.stop()
+    rollups.enabled = False
+
+
+class TestStatsRouters:
+    @pytest.mark.asyncio
+    async def test_manager_stats(self, async_client: AsyncClient, users: list[User]):
+        response = await async_client.get("/api/stats/managers")
+
+        assert response.status_code == 200
+        assert [
+            (row["username"], row["companies"], row["total_revenue"], row["contacts"])
+            for row in response.json()
+        ] == [("manager0", 3, 350, 2), ("manager1", 0, 0, 0)]
+
+    @pytest.mark.asyncio
+    async def test_department_stats(self, async_client: AsyncClient, users: list[User]):
+        response = await async_client.get("/api/stats/departments")
+
+        assert response.status_code == 200
+        assert {row["department"]: row["contacts"] for row in response.json()} == {
+            DepartmentEnum.PURCHASE.value: 1,
+            DepartmentEnum.ACCOUNTING.value: 1,
+            None: 1,
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.commits
+    async def test_materialized_stats_refresh_after_write(
+        self, async_client: AsyncClient, db_session: AsyncSession, users: list[User], materialized
+    ):
+        with capture_queries(db_session) as statements:
+            response = await async_client.get("/api/stats/managers")
+        assert response.json()[1]["companies"] == 0
+        assert len(statements) == 1
+        assert "manager_stats" in statements[0][0]
+
+        for i in range(3):
+            response = await async_client.post("/api/companies/", json={
+                "inn": f"200000000{i}",
+                "name": f"Компания {i}",
+                "revenue": 1000,
+                "user_id": users[1].id,
+            })
+            assert response.status_code == 201
+        response = await async_client.post("/api/contacts/", json={"first_name": "Новый"})
+        assert response.status_code == 201
+        await materialized.flush()
+
+        response = await async_client.get("/api/stats/managers")
+        assert response.json()[1]["companies"] == 3
+        assert response.json()[1]["total_revenue"] == 3000
+        response = await async_client.get("/api/stats/departments")
+        assert {row["department"]: row["contacts"] for row in response.json()}[None] == 2
+        # the burst of writes is coalesced into one refresh
+        assert materialized.refreshes == 1
@@ -0,0 +1,28 @@
+import pytest
+from httpx import AsyncClient
+
+from app.config import config
+from app.database import engine_options
+
+
+@pytest.mark.asyncio
+async def test_health_reports_pool(async_client: AsyncClient):
+    response = await async_client.get("/api/system/health")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["pool"]["checked_out"] >= 1
+    assert body["pool"]["size"] >= body["pool"]["checked_in"]
+
+
+def test_pgbouncer_disables_prepared_statement_reuse():
+    db_config = config.db.model_copy(update={"pgbouncer": True, "pool_size": 3})
+
+    options = engine_options(db_config)
+
+    assert options["pool_size"] == 3
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    name_func = options["connect_args"]["prepared_statement_name_func"]
+    assert name_func() != name_func()
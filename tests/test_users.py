@@ -1,11 +1,14 @@
+import csv
+import json
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_password_hash, verify_password
-from app.models import User
-from app.constants import GenderEnum, UserPostEnum
+from app.models import Company, Contact, User
+from app.constants import DETAIL_COLLECTION_LIMIT, GenderEnum, UserPostEnum
 
 
 class TestUserRouters:
@@ -55,3 +58,150 @@ class TestUserRouters:
         response = await async_client.post("/api/users/", json=user_data)
 
         assert response.status_code == expected_status
+
+    @pytest.mark.asyncio
+    async def test_get_users_pagination(self, async_client: AsyncClient):
+        for i in range(5):
+            response = await async_client.post("/api/users/", json={
+                "username": f"user{i}",
+                "password": "pass123",
+                "first_name": "Иван",
+                "last_name": "Иванов",
+                "gender": GenderEnum.MALE,
+                "email": f"user{i}@example.com",
+            })
+            assert response.status_code == 201
+
+        usernames = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get("/api/users/", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page["items"]) <= 2
+            usernames.extend(user["username"] for user in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert usernames == [f"user{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_get_users_invalid_cursor(self, async_client: AsyncClient):
+        response = await async_client.get("/api/users/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    async def test_export_users(self, async_client: AsyncClient, export_format):
+        for i in range(3):
+            response = await async_client.post("/api/users/", json={
+                "username": f"user{i}",
+                "password": "pass123",
+                "first_name": "Иван",
+                "last_name": "Иванов",
+                "gender": GenderEnum.MALE,
+                "email": f"user{i}@example.com",
+            })
+            assert response.status_code == 201
+
+        response = await async_client.get("/api/users/export", params={"format": export_format})
+
+        assert response.status_code == 200
+        lines = response.text.strip().splitlines()
+        if export_format == "ndjson":
+            rows = [json.loads(line) for line in lines]
+            assert [row["username"] for row in rows] == ["user0", "user1", "user2"]
+            assert all("password" not in row for row in rows)
+            assert rows[0]["gender"] == GenderEnum.MALE.value
+        else:
+            rows = list(csv.DictReader(lines))
+            assert [row["username"] for row in rows] == ["user0", "user1", "user2"]
+            assert "hash_password" not in rows[0]
+
+    @pytest.mark.asyncio
+    async def test_create_users_bulk(self, async_client: AsyncClient):
+        users = [
+            {
+                "username": username,
+                "password": "pass123",
+                "first_name": "Иван",
+                "last_name": "Иванов",
+                "gender": GenderEnum.MALE,
+                "email": f"{username}@example.com",
+            }
+            for username in ("ivanov", "petrov", "ivanov", "sidorov")
+        ]
+
+        response = await async_client.post("/api/users/bulk", json=users)
+
+        assert response.status_code == 201
+        result = response.json()
+        assert [user["username"] for user in result["created"]] == ["ivanov", "petrov", "sidorov"]
+        assert [conflict["index"] for conflict in result["conflicts"]] == [2]
+
+        response = await async_client.post("/api/users/bulk", json=users[:1])
+        assert response.json()["created"] == []
+        assert response.json()["conflicts"][0]["error"] == "duplicate_key"
+
+    @pytest.mark.asyncio
+    async def test_update_user(self, async_client: AsyncClient):
+        for username in ("ivanov", "petrov"):
+            response = await async_client.post("/api/users/", json={
+                "username": username,
+                "password": "pass123",
+                "first_name": "Иван",
+                "last_name": "Иванов",
+                "gender": GenderEnum.MALE,
+                "email": f"{username}@example.com",
+            })
+            assert response.status_code == 201
+        user_id = response.json()["id"]
+
+        response = await async_client.patch(f"/api/users/{user_id}", json={"first_name": "Петр"})
+        assert response.status_code == 200
+        assert response.json()["first_name"] == "Петр"
+
+        response = await async_client.get(f"/api/users/{user_id}")
+        assert response.json()["first_name"] == "Петр"
+
+        response = await async_client.patch(f"/api/users/{user_id}", json={"username": "ivanov"})
+        assert response.status_code == 409
+
+        response = await async_client.patch("/api/users/999", json={"first_name": "Петр"})
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_get_user_collections_cursor(self, async_client: AsyncClient, db_session: AsyncSession):
+        user = User(
+            username="ivanov", password="pass123", hash_password="hash",
+            first_name="Иван", last_name="Иванов", gender=GenderEnum.MALE, email="ivanov@example.com",
+        )
+        db_session.add(user)
+        db_session.add_all([
+            Company(inn=f"1234{i:06}", name=f"ООО {i}", user=user) for i in range(DETAIL_COLLECTION_LIMIT + 5)
+        ])
+        db_session.add_all([Contact(first_name="Пётр", user=user) for _ in range(3)])
+        await db_session.commit()
+
+        response = await async_client.get(f"/api/users/{user.id}")
+        data = response.json()
+        assert len(data["companies"]) == DETAIL_COLLECTION_LIMIT
+        assert (len(data["contacts"]), data["contacts_next_cursor"]) == (3, None)
+
+        ids = [c["id"] for c in data["companies"]]
+        cursor = data["companies_next_cursor"]
+        while cursor:
+            response = await async_client.get(
+                f"/api/users/{user.id}/companies", params={"cursor": cursor, "limit": 2}
+            )
+            assert response.status_code == 200
+            page = response.json()
+            ids.extend(c["id"] for c in page["items"])
+            cursor = page["next_cursor"]
+
+        assert ids == sorted(set(ids))
+        assert len(ids) == DETAIL_COLLECTION_LIMIT + 5
@@ -0,0 +1,54 @@
+import asyncio
+import re
+from contextlib import contextmanager
+
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database import Base
+from app.database.views import VIEWS
+
+
+# savepoints of the rolled back test transaction, see the db_session fixture
+SAVEPOINT_STATEMENT = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.IGNORECASE)
+
+
+def is_savepoint(statement: str) -> bool:
+    return bool(SAVEPOINT_STATEMENT.match(statement))
+
+
+@contextmanager
+def capture_queries(db_session: AsyncSession):
+    """Collects (statement, parameters) of every query sent by the session engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if not is_savepoint(statement):
+            statements.append((statement, parameters))
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def truncate_all(engine: AsyncEngine) -> None:
+    """Removes the committed rows of every table and restarts the ids"""
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        for name in VIEWS:
+            await connection.exec_driver_sql(f"REFRESH MATERIALIZED VIEW {name}")
+
+
+async def wait_for_job(async_client: AsyncClient, job_id: int) -> dict:
+    """Polls `/api/jobs/{id}` until the job is done or failed"""
+    async with asyncio.timeout(30):
+        while True:
+            job = (await async_client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] in ("done", "failed"):
+                return job
+            await asyncio.sleep(0.05)